@@ -1,7 +1,7 @@
 import logging
 from typing import List, Optional
 from Utils.log_decorator import log           # si ton fichier utils est à la racine du projet
-from DAO.DBConnector import DBConnection
+from DAO.DBConnector import DBConnection, execute_prepared
 from ObjetMetier.Collaboration import Collaboration
 from Utils.Singleton import Singleton
 
@@ -71,7 +71,7 @@ class CollaborationDAO(metaclass=Singleton):
             La collaboration trouvée, ou None si absente.
         """
         try:
-            with DBConnection().connection as connection:
+            with DBConnection(readonly=True, use_replica=False).connection as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
                         """
@@ -178,7 +178,7 @@ class CollaborationDAO(metaclass=Singleton):
         """
         collaborations = []
         try:
-            with DBConnection().connection as connection:
+            with DBConnection(readonly=True).connection as connection:
                 with connection.cursor() as cursor:
                     cursor.execute("SELECT * FROM collaboration ORDER BY id_conversation, id_user;")
                     res = cursor.fetchall()
@@ -203,7 +203,7 @@ class CollaborationDAO(metaclass=Singleton):
         """Retourne toutes les collaborations d’une conversation donnée."""
         collaborations = []
         try:
-            with DBConnection().connection as connection:
+            with DBConnection(readonly=True).connection as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
                         """
@@ -235,7 +235,7 @@ class CollaborationDAO(metaclass=Singleton):
         """Retourne toutes les collaborations d’un utilisateur donné."""
         collaborations = []
         try:
-            with DBConnection().connection as connection:
+            with DBConnection(readonly=True).connection as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
                         """
@@ -266,11 +266,13 @@ class CollaborationDAO(metaclass=Singleton):
     def find_by_conversation_and_user(self, id_conversation: int, id_user: int) -> Optional[Collaboration]:
         """Retourne la collaboration d’un utilisateur spécifique dans une conversation."""
         try:
-            with DBConnection().connection as connection:
+            with DBConnection(readonly=True, use_replica=False).connection as connection:
                 with connection.cursor() as cursor:
-                    cursor.execute(
+                    execute_prepared(
+                        cursor,
                         """
-                        SELECT * FROM collaboration
+                        SELECT id_collaboration, id_conversation, id_user, role
+                          FROM collaboration
                          WHERE id_conversation = %(id_conversation)s
                            AND id_user = %(id_user)s;
                         """,
@@ -345,7 +347,7 @@ class CollaborationDAO(metaclass=Singleton):
     def count_by_conversation(self, id_conversation: int) -> int:
         """Compte le nombre de collaborateurs dans une conversation."""
         try:
-            with DBConnection().connection as connection:
+            with DBConnection(readonly=True).connection as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
                         """
@@ -361,3 +363,24 @@ class CollaborationDAO(metaclass=Singleton):
         except Exception as e:
             logging.error(f"Erreur lors du comptage des collaborateurs de la conversation {id_conversation} : {e}")
             return 0
+
+    @log
+    def count_conversations_by_user(self, id_user: int) -> int:
+        """Nombre de conversations distinctes d'un utilisateur (parcours d'index sur (id_user, id_conversation))."""
+        try:
+            with DBConnection(readonly=True).connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        """
+                        SELECT COUNT(DISTINCT id_conversation) AS total
+                          FROM collaboration
+                         WHERE id_user = %(id_user)s;
+                        """,
+                        {"id_user": id_user},
+                    )
+                    res = cursor.fetchone()
+                    return res["total"] if res and "total" in res else 0
+
+        except Exception as e:
+            logging.error(f"Erreur lors du comptage des conversations de l'utilisateur {id_user} : {e}")
+            raise
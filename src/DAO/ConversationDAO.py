@@ -1,11 +1,11 @@
 import logging
 from uuid import uuid4
-from datetime import datetime, date
 from typing import List, Optional, Dict, Any
 
-from DAO.DBConnector import DBConnection
+from DAO.DBConnector import DBConnection, execute_prepared
 from ObjetMetier.Conversation import Conversation
 from Utils.Singleton import Singleton
+from Utils.date_range import DateLike, day_bounds, range_bounds
 from Utils.log_decorator import log
 
 
@@ -36,7 +36,7 @@ class ConversationDAO(metaclass=Singleton):
     def _fetch_many(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Conversation]:
         """Exécute une requête SELECT et renvoie une liste d'objets Conversation."""
         conversations: List[Conversation] = []
-        with DBConnection().connection as connection:
+        with DBConnection(readonly=True).connection as connection:
             with connection.cursor() as cursor:
                 cursor.execute(query, params or {})
                 rows = cursor.fetchall() or []
@@ -59,10 +59,10 @@ class ConversationDAO(metaclass=Singleton):
             raise
 
     def _exists(self, query: str, params: Dict[str, Any]) -> bool:
-        """Retourne True si la requête renvoie au moins une ligne."""
-        with DBConnection().connection as connection:
+        """Retourne True si la requête renvoie au moins une ligne (requête préparée : contrôles d'accès fréquents)."""
+        with DBConnection(readonly=True, use_replica=False).connection as connection:
             with connection.cursor() as cursor:
-                cursor.execute(query, params)
+                execute_prepared(cursor, query, params)
                 return cursor.fetchone() is not None
 
     # ------------------------------------------------------------------ #
@@ -117,14 +117,16 @@ class ConversationDAO(metaclass=Singleton):
 
     @log
     def get_by_id(self, conversation_id: int) -> Optional[Conversation]:
+        # colonnes explicites : requête préparée, un « SELECT * » casserait après ALTER TABLE
         query = """
-            SELECT *
+            SELECT id_conversation, titre, created_at, settings_conversation,
+                   token_viewer, token_writter, is_active
               FROM conversation
              WHERE id_conversation = %(id_conversation)s;
         """
-        with DBConnection().connection as connection:
+        with DBConnection(readonly=True, use_replica=False).connection as connection:
             with connection.cursor() as cursor:
-                cursor.execute(query, {"id_conversation": conversation_id})
+                execute_prepared(cursor, query, {"id_conversation": conversation_id})
                 row = cursor.fetchone()
         return self._row_to_conversation(row)
 
@@ -145,18 +147,30 @@ class ConversationDAO(metaclass=Singleton):
         return self._fetch_many(query, {"user_id": user_id})
 
     @log
-    def get_conversations_by_date(self, user_id: int, target_date: datetime) -> List[Conversation]:
-        """Renvoie les conversations d'un utilisateur à une date donnée (DATE(created_at) = target_date)."""
+    def get_conversations_by_date(self, user_id: int, target_date: DateLike) -> List[Conversation]:
+        """Renvoie les conversations d'un utilisateur créées le jour de target_date (fuseau de la date ou de l'application)."""
+        start, end = day_bounds(target_date)
+        return self.get_conversations_by_date_range(user_id, start, end)
+
+    @log
+    def get_conversations_by_date_range(
+        self, user_id: int, start: DateLike, end: DateLike
+    ) -> List[Conversation]:
+        """
+        Renvoie les conversations d'un utilisateur créées dans [start, end[
+        (prédicat par plage sur created_at : index idx_conversation_created_at).
+        """
+        start, end = range_bounds(start, end)
         query = """
             SELECT c.*
               FROM conversation c
               JOIN collaboration col ON col.id_conversation = c.id_conversation
              WHERE col.id_user = %(user_id)s
-               AND DATE(c.created_at) = %(target_date)s
+               AND c.created_at >= %(start)s
+               AND c.created_at < %(end)s
              ORDER BY c.created_at DESC;
         """
-        day: date = target_date.date()
-        return self._fetch_many(query, {"user_id": user_id, "target_date": day})
+        return self._fetch_many(query, {"user_id": user_id, "start": start, "end": end})
 
     @log
     def search_conversations_by_title(self, user_id: int, title: str) -> List[Conversation]:
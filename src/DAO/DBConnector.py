@@ -1,26 +1,46 @@
 
+import atexit
+import hashlib
 import os
+import re
+import threading
+import time
+import weakref
+from collections import deque
 from contextlib import contextmanager
+from contextvars import ContextVar
 from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
 from urllib.parse import urlparse
 
-from psycopg2.pool import SimpleConnectionPool
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
 from psycopg2.extras import RealDictConnection
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def _current_db_url() -> str:
+def _current_db_url(replica: bool = False) -> str:
     """
     Retourne l'URL de connexion à utiliser maintenant.
     - En tests (pytest définit PYTEST_CURRENT_TEST) -> DATABASE_URL_TEST si dispo,
       sinon on dérive depuis DATABASE_URL en remplaçant le nom de la DB par 'test_db'.
     - Sinon -> DATABASE_URL.
+    - ``replica=True`` -> DATABASE_URL_REPLICA (DATABASE_URL_REPLICA_TEST en tests)
+      si elle est définie, sinon l'URL principale ci-dessus.
     """
     db_url = os.getenv("DATABASE_URL")
     if not db_url:
         raise RuntimeError("DATABASE_URL manquant dans .env / l'environnement")
 
+    if replica:
+        replica_url = os.getenv(
+            "DATABASE_URL_REPLICA_TEST" if os.getenv("PYTEST_CURRENT_TEST") else "DATABASE_URL_REPLICA"
+        )
+        if replica_url:
+            return replica_url
+
     if os.getenv("PYTEST_CURRENT_TEST"):
         test_url = os.getenv("DATABASE_URL_TEST")
         if not test_url:
@@ -33,18 +53,378 @@ def _current_db_url() -> str:
     return db_url
 
 
-@lru_cache(maxsize=4)
-def _get_pool(dsn: str) -> SimpleConnectionPool:
+class PoolTimeout(PoolError):
+    """Aucune connexion libérée avant l'expiration du délai d'attente."""
+
+
+class ConnectionPool:
+    """
+    Pool de connexions thread-safe (remplace SimpleConnectionPool, non thread-safe).
+
+    - getconn() bloque tant que ``maxconn`` connexions sont empruntées, au plus
+      ``acquire_timeout`` secondes (puis PoolTimeout) ;
+    - à l'emprunt, une connexion fermée est écartée, et une connexion restée
+      inactive plus de ``ping_after`` secondes est vérifiée par un ``SELECT 1`` ;
+    - les connexions inactives depuis plus de ``idle_timeout`` secondes sont
+      fermées (au-delà de ``minconn``) ;
+    - stats() expose les métriques : attente, connexions empruntées, emprunts/s.
+    ``session`` (ex. ``{"readonly": True, "autocommit": True}``) est appliqué
+    une fois à chaque nouvelle connexion (conn.set_session).
+    """
+
+    RATE_WINDOW = 60.0
+
+    def __init__(
+        self,
+        dsn: str,
+        minconn: int = 1,
+        maxconn: int = 10,
+        *,
+        acquire_timeout: Optional[float] = 30.0,
+        idle_timeout: Optional[float] = 300.0,
+        ping_after: Optional[float] = 30.0,
+        session: Optional[Dict[str, Any]] = None,
+        **connect_kwargs: Any,
+    ) -> None:
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Bornes du pool invalides (0 <= minconn <= maxconn, maxconn >= 1)")
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.acquire_timeout = acquire_timeout
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+        self.session = dict(session or {})
+        self._connect_kwargs = connect_kwargs
+        self._cond = threading.Condition()
+        self._idle: Deque[Tuple[Any, float]] = deque()  # (conn, rendue_a)
+        self._in_use: Dict[int, Any] = {}
+        self._size = 0
+        self._closed = False
+        # métriques
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._recent: Deque[float] = deque()
+
+    # ------------------------------------------------------------------
+    # Connexions
+    # ------------------------------------------------------------------
+    def _connect(self):
+        return psycopg2.connect(self.dsn, **self._connect_kwargs)
+
+    def _new_connection(self):
+        conn = self._connect()
+        if self.session:
+            try:
+                conn.set_session(**self.session)
+            except Exception:
+                self._close_quietly(conn)
+                raise
+        return conn
+
+    def _is_healthy(self, conn, idle_for: float) -> bool:
+        if conn.closed:
+            return False
+        if self.ping_after is None or idle_for < self.ping_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def getconn(self, timeout: Optional[float] = None):
+        """Emprunte une connexion (bloquant, au plus ``timeout`` / ``acquire_timeout`` secondes)."""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("Pool fermé")
+                if self._idle:
+                    conn, since = self._idle.pop()  # LIFO : la plus récemment utilisée
+                    self._in_use[id(conn)] = conn
+                    break
+                if self._size < self.maxconn:
+                    self._size += 1
+                    conn = None
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"Aucune connexion disponible après {timeout:.1f}s")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        if conn is not None and not self._is_healthy(conn, time.monotonic() - since):
+            self._close_quietly(conn)
+            with self._cond:
+                del self._in_use[id(conn)]
+                self._discarded += 1
+            conn = None  # la place est conservée : on en ouvre une neuve
+        if conn is None:
+            try:
+                conn = self._new_connection()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._in_use[id(conn)] = conn
+
+        waited = time.monotonic() - started
+        with self._cond:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            now = time.monotonic()
+            self._recent.append(now)
+            while self._recent and now - self._recent[0] > self.RATE_WINDOW:
+                self._recent.popleft()
+        return conn
+
+    def putconn(self, conn, close: bool = False) -> None:
+        """Rend une connexion au pool (fermée si ``close`` ou si elle est inutilisable)."""
+        with self._cond:
+            if self._in_use.pop(id(conn), None) is None:
+                raise PoolError("Connexion inconnue de ce pool")
+        if not close and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                close = True
+        with self._cond:
+            if close or conn.closed or self._closed:
+                self._size -= 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        self.reap_idle()
+
+    def reap_idle(self) -> int:
+        """Ferme les connexions inactives depuis plus de ``idle_timeout`` (au-delà de ``minconn``)."""
+        if self.idle_timeout is None:
+            return 0
+        now = time.monotonic()
+        reaped: List[Any] = []
+        with self._cond:
+            # les plus anciennes sont en tête de file
+            while self._idle and self._size > self.minconn and now - self._idle[0][1] > self.idle_timeout:
+                conn, _ = self._idle.popleft()
+                self._size -= 1
+                reaped.append(conn)
+        for conn in reaped:
+            self._close_quietly(conn)
+        return len(reaped)
+
+    def closeall(self) -> None:
+        """Ferme toutes les connexions (y compris empruntées) ; le pool devient inutilisable."""
+        with self._cond:
+            self._closed = True
+            conns = [c for c, _ in self._idle] + list(self._in_use.values())
+            self._idle.clear()
+            self._in_use.clear()
+            self._size = 0
+            self._cond.notify_all()
+        for conn in conns:
+            self._close_quietly(conn)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    # ------------------------------------------------------------------
+    # Métriques
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            recent = sum(1 for t in self._recent if now - t <= self.RATE_WINDOW)
+            return {
+                "size": self._size,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "maxconn": self.maxconn,
+                "checkouts": self._checkouts,
+                "checkouts_per_sec": recent / self.RATE_WINDOW,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "wait_total_s": self._wait_total,
+                "wait_avg_s": self._wait_total / self._checkouts if self._checkouts else 0.0,
+                "wait_max_s": self._wait_max,
+            }
+
+
+def _env_float(name: str, default: Optional[float]) -> Optional[float]:
+    raw = os.getenv(name)
+    if raw is None or raw == "":
+        return default
+    value = float(raw)
+    return None if value <= 0 else value
+
+
+_pools: Dict[Tuple[str, bool], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(dsn: str, readonly: bool = False) -> ConnectionPool:
+    """
+    Crée (une fois) et mémorise un pool par (DSN, mode) (registre consulté par close_pool).
+    Les connexions du pool lecture seule sont en ``readonly`` + ``autocommit`` :
+    pas de BEGIN/COMMIT autour des SELECT, et toute écriture est refusée par le serveur.
+    """
+    key = (dsn, readonly)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.closed:
+            pool = ConnectionPool(
+                dsn,
+                minconn=int(os.getenv("DB_POOL_MIN", "1")),
+                maxconn=int(os.getenv("DB_POOL_MAX", "10")),
+                acquire_timeout=_env_float("DB_POOL_TIMEOUT", 30.0),
+                idle_timeout=_env_float("DB_POOL_IDLE_TIMEOUT", 300.0),
+                ping_after=_env_float("DB_POOL_PING_AFTER", 30.0),
+                session={"readonly": True, "autocommit": True} if readonly else None,
+                connect_timeout=10,
+                connection_factory=RealDictConnection,
+            )
+            _pools[key] = pool
+        return pool
+
+
+class UnitOfWorkAborted(RuntimeError):
+    """Une requête de l'unité de travail a échoué (ou un DAO a demandé un rollback) : rien n'est validé."""
+
+
+class UnitOfWork:
+    """
+    Transaction ambiante partagée par les DAO (voir unit_of_work()).
+    La connexion n'est empruntée qu'au premier accès d'un DAO.
+    """
+
+    def __init__(self) -> None:
+        self._pool: Optional[ConnectionPool] = None
+        self._conn = None
+        self.rollback_only = False
+
+    @property
+    def active(self) -> bool:
+        return self._conn is not None
+
+    def _acquire(self):
+        if self._conn is None:
+            pool = _get_pool(_current_db_url())
+            conn = pool.getconn()
+            try:
+                conn.autocommit = False
+            except BaseException:
+                pool.putconn(conn)
+                raise
+            self._pool, self._conn = pool, conn
+        return self._conn
+
+    def _finish(self, ok: bool) -> None:
+        conn, pool = self._conn, self._pool
+        if conn is None:
+            return
+        self._conn = self._pool = None
+        try:
+            failed = self.rollback_only or (
+                conn.get_transaction_status() == extensions.TRANSACTION_STATUS_INERROR
+            )
+            if ok and not failed:
+                conn.commit()
+                return
+            conn.rollback()
+            if ok:
+                # sinon PostgreSQL transformerait silencieusement le COMMIT en ROLLBACK
+                raise UnitOfWorkAborted("Unité de travail annulée : une requête a échoué")
+        finally:
+            pool.putconn(conn)
+
+
+class _JoinedConnection:
     """
-    Crée (une fois) et met en cache un pool par DSN.
+    Connexion de l'unité de travail prêtée à un DAO : commit/rollback sont
+    différés à la fin de l'unité de travail, autocommit n'est pas modifiable.
     """
-    return SimpleConnectionPool(
-        minconn=1,
-        maxconn=int(os.getenv("DB_POOL_MAX", "10")),
-        dsn=dsn,
-        connect_timeout=10,
-        connection_factory=RealDictConnection,
-    )
+
+    __slots__ = ("_uow",)
+
+    def __init__(self, uow: UnitOfWork) -> None:
+        object.__setattr__(self, "_uow", uow)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._uow._acquire(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name == "autocommit":
+            return
+        setattr(self._uow._acquire(), name, value)
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        self._uow.rollback_only = True
+
+
+_current_uow: ContextVar[Optional[UnitOfWork]] = ContextVar("db_unit_of_work", default=None)
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Regroupe plusieurs appels DAO sur une seule connexion et un seul COMMIT :
+
+        with unit_of_work():
+            conversation_dao.create(...)
+            collab_dao.create(...)
+
+    Les DBConnection ouvertes dans le bloc (même thread / même tâche asyncio)
+    rejoignent la transaction ambiante. Un bloc imbriqué rejoint le bloc
+    englobant ; s'il échoue, l'unité englobante est annulée même si
+    l'appelant intercepte l'exception. Exception -> ROLLBACK de l'ensemble.
+    """
+    current = _current_uow.get()
+    if current is not None:
+        try:
+            yield current
+        except BaseException:
+            current.rollback_only = True
+            raise
+        return
+    uow = UnitOfWork()
+    token = _current_uow.set(uow)
+    try:
+        yield uow
+    except BaseException:
+        _current_uow.reset(token)
+        uow._finish(ok=False)
+        raise
+    _current_uow.reset(token)
+    uow._finish(ok=True)
 
 
 class DBConnection:
@@ -54,31 +434,141 @@ class DBConnection:
             with connection.cursor() as cursor:
                 cursor.execute("SELECT 1 AS ok;")
                 row = cursor.fetchone()  # {'ok': 1}
+
+    Lectures : ``DBConnection(readonly=True)`` emprunte une connexion lecture
+    seule en autocommit (pas de COMMIT), sur DATABASE_URL_REPLICA si elle est
+    définie. ``use_replica=False`` garde la lecture sur le primaire (lecture
+    qui doit voir une écriture qui vient d'être faite). Un appelant qui a
+    besoin d'une transaction (curseur nommé) peut passer ``autocommit`` à False :
+    elle reste en lecture seule et est validée en sortie.
+
+    Dans un bloc ``unit_of_work()``, la connexion de l'unité de travail est
+    réutilisée (lecture seule / réplica ignorés) et validée à la fin du bloc.
+    ``dedicated=True`` emprunte toujours une connexion propre au pool, même
+    dans un bloc : pour une lecture qui peut survivre au bloc (itérateur sur
+    curseur serveur) ; elle ne voit pas les écritures non validées du bloc.
     """
+
+    def __init__(self, readonly: bool = False, *, use_replica: Optional[bool] = None, dedicated: bool = False):
+        self.readonly = readonly
+        self.use_replica = readonly if use_replica is None else (readonly and use_replica)
+        self.dedicated = dedicated
+
     @property
     @contextmanager
     def connection(self):
-        dsn = _current_db_url()
-        pool = _get_pool(dsn)
+        uow = None if self.dedicated else _current_uow.get()
+        if uow is not None:
+            yield _JoinedConnection(uow)
+            return
+        dsn = _current_db_url(replica=self.use_replica)
+        pool = _get_pool(dsn, readonly=self.readonly)
         conn = pool.getconn()
         try:
-            conn.autocommit = False
+            conn.autocommit = self.readonly
             yield conn
-            conn.commit()
-        except Exception:
+            if not conn.autocommit:
+                conn.commit()
+        except BaseException:
+            # BaseException : couvre aussi GeneratorExit (itérateur fermé avant la fin)
             conn.rollback()
             raise
         finally:
             pool.putconn(conn)
 
 
-def close_pool():
+# ---------------------------------------------------------------------------
+# Requêtes préparées (PREPARE / EXECUTE), par connexion
+# ---------------------------------------------------------------------------
+_NAMED_PARAM = re.compile(r"%\((\w+)\)s")
+_prepared_by_conn: "weakref.WeakKeyDictionary[Any, Set[str]]" = weakref.WeakKeyDictionary()
+_prepared_lock = threading.Lock()
+
+
+@lru_cache(maxsize=256)
+def _to_prepared(query: str) -> Tuple[str, str, Tuple[str, ...]]:
+    """
+    Convertit une requête à paramètres nommés (%(x)s) en corps PREPARE ($1, $2…).
+    Retourne (nom, corps, ordre des paramètres) ; le nom dérive du texte de la requête.
+    """
+    order: List[str] = []
+
+    def _placeholder(match: "re.Match[str]") -> str:
+        key = match.group(1)
+        if key not in order:
+            order.append(key)
+        return f"${order.index(key) + 1}"
+
+    body = _NAMED_PARAM.sub(_placeholder, query.strip().rstrip(";")).replace("%%", "%")
+    name = "pq_" + hashlib.sha1(body.encode("utf-8")).hexdigest()[:16]
+    return name, body, tuple(order)
+
+
+def _prepared_enabled(conn) -> bool:
     """
-    Ferme tous les pools ouverts (utile en teardown de tests si besoin).
+    DB_PREPARED_STATEMENTS = 1 | 0 | auto (défaut).
+    En ``auto``, désactivé derrière PgBouncer en mode transaction (hôte « -pooler »
+    type Neon, ou port 6432) : les PREPARE SQL n'y survivent pas d'une requête à l'autre.
     """
-    # accéder au cache lru_cache pour fermer chaque pool
-    cache = _get_pool.cache_info()
-    if cache.hits or cache.misses:
-        # on ne peut pas lister via cache_info ; on force une petite astuce :
-        # wrap lru_cache avec un attribut pour stocker les instances
-        pass  # voir version ci-dessous si tu veux du cleanup strict
+    mode = os.getenv("DB_PREPARED_STATEMENTS", "auto").strip().lower()
+    if mode in ("0", "false", "off", "no"):
+        return False
+    if mode in ("1", "true", "on", "yes"):
+        return True
+    dsn = getattr(conn, "dsn", "")
+    if not isinstance(dsn, str):
+        return True
+    try:
+        # parse_dsn accepte aussi bien « host=… port=… » que les URL postgresql://
+        params = extensions.parse_dsn(dsn)
+    except psycopg2.ProgrammingError:
+        params = {}
+    host = params.get("host", "")
+    port = str(params.get("port", "")).split(",")
+    return "-pooler" not in host and "6432" not in port
+
+
+def execute_prepared(cursor, query: str, params: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Exécute ``query`` (paramètres nommés) via une requête préparée côté serveur :
+    PREPARE au premier appel sur la connexion, puis EXECUTE (plan réutilisé).
+    Repli transparent sur cursor.execute si les requêtes préparées sont désactivées.
+    """
+    conn = getattr(cursor, "connection", None)
+    if conn is None or not _prepared_enabled(conn):
+        cursor.execute(query, params or {})
+        return
+    name, body, order = _to_prepared(query)
+    with _prepared_lock:
+        prepared = _prepared_by_conn.setdefault(conn, set())
+        known = name in prepared
+    if not known:
+        cursor.execute(f"PREPARE {name} AS {body}")
+        with _prepared_lock:
+            prepared.add(name)
+    if order:
+        args = ", ".join(f"%({key})s" for key in order)
+        cursor.execute(f"EXECUTE {name} ({args})", params)
+    else:
+        cursor.execute(f"EXECUTE {name}")
+
+
+def close_pool() -> None:
+    """
+    Ferme tous les pools ouverts (teardown de tests, arrêt de l'application).
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.closeall()
+
+
+def pool_stats(readonly: bool = False) -> Dict[str, Any]:
+    """Métriques du pool associé à l'URL courante (vide s'il n'a pas encore servi)."""
+    with _pools_lock:
+        pool = _pools.get((_current_db_url(replica=readonly), readonly))
+    return pool.stats() if pool else {}
+
+
+atexit.register(close_pool)
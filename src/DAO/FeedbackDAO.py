@@ -53,7 +53,7 @@ class FeedbackDAO:
              WHERE id_feedback = %(id_feedback)s;
         """
         try:
-            with DBConnection().connection as conn:
+            with DBConnection(readonly=True, use_replica=False).connection as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cur:
                     cur.execute(query, {"id_feedback": id_feedback})
                     row = cur.fetchone()
@@ -119,7 +119,7 @@ class FeedbackDAO:
              ORDER BY created_at ASC, id_feedback ASC;
         """
         try:
-            with DBConnection().connection as conn:
+            with DBConnection(readonly=True).connection as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cur:
                     cur.execute(query, {"m": message_id})
                     rows = cur.fetchall() or []
@@ -147,7 +147,7 @@ class FeedbackDAO:
              ORDER BY created_at ASC, id_feedback ASC;
         """
         try:
-            with DBConnection().connection as conn:
+            with DBConnection(readonly=True).connection as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cur:
                     cur.execute(query, {"u": user_id})
                     rows = cur.fetchall() or []
@@ -172,7 +172,7 @@ class FeedbackDAO:
         """Compte les likes d’un message."""
         query = "SELECT COUNT(*) AS n FROM feedback WHERE id_message = %(m)s AND is_like = TRUE;"
         try:
-            with DBConnection().connection as conn:
+            with DBConnection(readonly=True).connection as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cur:
                     cur.execute(query, {"m": message_id})
                     row = cur.fetchone()
@@ -185,7 +185,7 @@ class FeedbackDAO:
         """Compte les dislikes d’un message."""
         query = "SELECT COUNT(*) AS n FROM feedback WHERE id_message = %(m)s AND is_like = FALSE;"
         try:
-            with DBConnection().connection as conn:
+            with DBConnection(readonly=True).connection as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cur:
                     cur.execute(query, {"m": message_id})
                     row = cur.fetchone()
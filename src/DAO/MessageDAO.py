@@ -1,9 +1,14 @@
+import csv
+import io
 import logging
-from datetime import datetime, time
-from typing import List, Optional
-from psycopg2.extras import RealDictCursor
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from psycopg2.extensions import cursor as TupleCursor
+from psycopg2.extras import RealDictCursor, execute_values
 
-from DAO.DBConnector import DBConnection
+from DAO.DBConnector import DBConnection, execute_prepared
+from Utils.date_range import DateLike, day_bounds, range_bounds
 # Assurez-vous que l'importation de Message est correcte dans votre environnement
 try:
     from ObjetMetier.Message import Message
@@ -11,11 +16,50 @@ except Exception:
     from ObjetMetier.Message import Message
 
 
+# Colonnes lues pour construire un Message, dans l'ordre attendu par Message.from_row
+MESSAGE_COLUMNS = 'id_message, id_conversation, id_user, "timestamp", message, is_from_agent'
+
+# Requête plein texte : français (racinisation) OU simple (mot exact), syntaxe « web » tolérante
+FULLTEXT_TSQUERY = "(websearch_to_tsquery('french', %(kw)s) || websearch_to_tsquery('simple', %(kw)s))"
+# Conversations lisibles par %(user_id)s (semi-jointure sur collaboration, rôle filtré en SQL)
+AUTHORIZED_CONVERSATIONS = """id_conversation IN (
+            SELECT c.id_conversation FROM collaboration c
+            WHERE c.id_user = %(user_id)s AND c.role IN ('admin', 'writer', 'viewer'))"""
+# Curseurs keyset ("timestamp", id_message). La borne simple sur "timestamp" est
+# redondante mais permet l'élagage des partitions mensuelles (Database/partitions.py),
+# que la comparaison de lignes seule ne déclenche pas.
+KEYSET_BEFORE = '"timestamp" <= %(before_ts)s AND ("timestamp", id_message) < (%(before_ts)s, %(before_id)s)'
+KEYSET_AFTER = '"timestamp" >= %(after_ts)s AND ("timestamp", id_message) > (%(after_ts)s, %(after_id)s)'
+HEADLINE_OPTIONS = 'StartSel=**, StopSel=**, MaxWords=30, MinWords=10, MaxFragments=2, FragmentDelimiter=" … "'
+
+
 class MessageDAO:
     """DAO pour Message : CRUD + méthodes spécifiques aux conversations.
     Utilise la connexion partagée (DBConnection) et retourne des objets Message.
+    Les lectures passent par un curseur tuple (pas de dict par ligne) et
+    Message.from_row (pas de revalidation des lignes venant de la base).
+    Les méthodes iter_* lisent via un curseur serveur nommé, par paquets de
+    ``itersize`` lignes, pour garder une mémoire constante sur les gros volumes.
     """
 
+    DEFAULT_ITERSIZE = 2000
+
+    # --- Mapping ------------------------------------------------------------
+
+    @staticmethod
+    def _row_to_message(row: Any) -> Message:
+        """Convertit une ligne (tuple dans l'ordre de MESSAGE_COLUMNS, ou dict) en Message."""
+        if isinstance(row, dict):
+            return Message.from_row(
+                row["id_message"],
+                row["id_conversation"],
+                row["id_user"],
+                row["timestamp"],  # colonne SQL "timestamp"
+                row["message"],
+                row["is_from_agent"],
+            )
+        return Message.from_row(*row[:6])
+
     # --- CREATE -------------------------------------------------------------
 
     def create(self, message: Message) -> Message:
@@ -45,50 +89,115 @@ class MessageDAO:
             logging.error(f"Erreur création message: {e}")
             raise ValueError(f"Erreur création message: {e}") from e
 
+    def create_many(
+        self,
+        messages: List[Message],
+        *,
+        page_size: int = 1000,
+        use_copy: bool = False,
+    ) -> List[Message]:
+        """
+        Insère plusieurs messages dans une seule transaction et affecte les ids
+        aux objets (dans l'ordre de la liste).
+
+        - mode par défaut : INSERT multi-lignes (execute_values) avec
+          RETURNING id_message, par paquets de ``page_size`` lignes ;
+        - ``use_copy=True`` : chargement en masse par COPY FROM STDIN. Les ids
+          sont réservés au préalable sur la séquence (COPY ne sait pas faire
+          RETURNING).
+        """
+        if not messages:
+            return []
+        try:
+            with DBConnection().connection as conn:
+                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    if use_copy:
+                        ids = self._copy_messages(cursor, messages)
+                    else:
+                        ids = self._insert_messages_values(cursor, messages, page_size)
+            for message, id_message in zip(messages, ids):
+                message.id_message = id_message
+            return messages
+        except Exception as e:
+            logging.error(f"Erreur création messages (lot): {e}")
+            raise ValueError(f"Erreur création messages (lot): {e}") from e
+
+    def _insert_messages_values(self, cursor, messages: List[Message], page_size: int) -> List[int]:
+        """INSERT ... VALUES (...), (...) RETURNING id_message, un paquet à la fois."""
+        query = """
+        INSERT INTO message (id_conversation, id_user, "timestamp", message, is_from_agent)
+        VALUES %s
+        RETURNING id_message;
+        """
+        ids: List[int] = []
+        for start in range(0, len(messages), page_size):
+            batch = messages[start:start + page_size]
+            rows = [
+                (m.id_conversation, m.id_user, m.datetime, m.message, m.is_from_agent)
+                for m in batch
+            ]
+            returned = execute_values(cursor, query, rows, page_size=len(rows), fetch=True)
+            ids.extend(row["id_message"] for row in returned)
+        return ids
+
+    def _copy_messages(self, cursor, messages: List[Message]) -> List[int]:
+        """Réserve les ids sur la séquence puis charge les lignes par COPY (format CSV)."""
+        cursor.execute(
+            """
+            SELECT nextval(pg_get_serial_sequence('message', 'id_message')) AS id_message
+              FROM generate_series(1, %(n)s);
+            """,
+            {"n": len(messages)},
+        )
+        ids = [row["id_message"] for row in cursor.fetchall()]
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for id_message, m in zip(ids, messages):
+            writer.writerow([
+                id_message,
+                m.id_conversation,
+                m.id_user,  # None -> champ vide -> NULL
+                m.datetime.isoformat(),
+                m.message,
+                "t" if m.is_from_agent else "f",
+            ])
+        buffer.seek(0)
+        cursor.copy_expert(
+            'COPY message (id_message, id_conversation, id_user, "timestamp", message, is_from_agent) '
+            "FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (message))",
+            buffer,
+        )
+        return ids
+
     # --- READ ---------------------------------------------------------------
 
     def get_by_id(self, message_id: int) -> Optional[Message]:
         """Lit un message par son id."""
-        query = "SELECT * FROM message WHERE id_message = %(id_message)s;"
-        with DBConnection().connection as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                cursor.execute(query, {"id_message": message_id})
+        query = f"SELECT {MESSAGE_COLUMNS} FROM message WHERE id_message = %(id_message)s;"
+        with DBConnection(readonly=True, use_replica=False).connection as conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cursor:
+                execute_prepared(cursor, query, {"id_message": message_id})
                 row = cursor.fetchone()
                 if not row:
                     return None
-                return Message(
-                    id_message=row["id_message"],
-                    id_conversation=row["id_conversation"],
-                    id_user=row["id_user"],
-                    datetime=row["timestamp"],  # colonne SQL "timestamp"
-                    message=row["message"],
-                    is_from_agent=row["is_from_agent"],
-                )
+                return self._row_to_message(row)
 
     # --- LISTING ------------------------------------------------------------
 
     def get_messages_by_conversation(self, conversation_id: int) -> List[Message]:
         """Retourne tous les messages d'une conversation, ordonnés par date."""
-        query = """
-        SELECT * FROM message
+        query = f"""
+        SELECT {MESSAGE_COLUMNS} FROM message
         WHERE id_conversation = %(id_conversation)s
         ORDER BY "timestamp";
         """
         messages: List[Message] = []
-        with DBConnection().connection as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with DBConnection(readonly=True, use_replica=False).connection as conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cursor:
                 cursor.execute(query, {"id_conversation": conversation_id})
                 for row in cursor.fetchall() or []:
-                    messages.append(
-                        Message(
-                            id_message=row["id_message"],
-                            id_conversation=row["id_conversation"],
-                            id_user=row["id_user"],
-                            datetime=row["timestamp"],
-                            message=row["message"],
-                            is_from_agent=row["is_from_agent"],
-                        )
-                    )
+                    messages.append(self._row_to_message(row))
         return messages
 
     def get_messages_by_conversation_paginated(
@@ -96,64 +205,138 @@ class MessageDAO:
     ) -> List[Message]:
         """Retourne une page de messages d'une conversation (ordre récent d'abord)."""
         offset = max(0, (page - 1) * per_page)
-        query = """
-        SELECT * FROM message
+        query = f"""
+        SELECT {MESSAGE_COLUMNS} FROM message
         WHERE id_conversation = %(id_conversation)s
         ORDER BY "timestamp" DESC
         LIMIT %(limit)s OFFSET %(offset)s;
         """
         messages: List[Message] = []
-        with DBConnection().connection as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with DBConnection(readonly=True, use_replica=False).connection as conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cursor:
                 cursor.execute(
                     query,
                     {"id_conversation": conversation_id, "limit": per_page, "offset": offset},
                 )
                 for row in cursor.fetchall() or []:
-                    messages.append(
-                        Message(
-                            id_message=row["id_message"],
-                            id_conversation=row["id_conversation"],
-                            id_user=row["id_user"],
-                            datetime=row["timestamp"],
-                            message=row["message"],
-                            is_from_agent=row["is_from_agent"],
-                        )
-                    )
+                    messages.append(self._row_to_message(row))
+        return messages
+
+    def get_messages_by_conversation_keyset(
+        self,
+        conversation_id: int,
+        per_page: int,
+        before: Optional[Tuple[datetime, int]] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        *,
+        oldest_first: bool = False,
+    ) -> List[Message]:
+        """
+        Retourne une page de messages (ordre récent d'abord) par pagination "keyset".
+
+        Le curseur ``before`` est le couple ("timestamp", id_message) du dernier
+        message de la page précédente : seuls les messages strictement plus anciens
+        sont renvoyés. Contrairement à LIMIT/OFFSET, le coût d'une page ne dépend pas
+        de sa profondeur (index (id_conversation, "timestamp", id_message)) et les
+        messages insérés pendant le défilement ne décalent pas les pages suivantes.
+        ``after`` (exclusif) limite symétriquement la page aux messages plus récents.
+        ``oldest_first=True`` parcourt dans l'ordre chronologique : la page commence
+        juste après ``after``.
+        """
+        conditions = ["id_conversation = %(id_conversation)s"]
+        params = {"id_conversation": conversation_id, "limit": per_page}
+        if before is not None:
+            conditions.append(KEYSET_BEFORE)
+            params["before_ts"], params["before_id"] = before
+        if after is not None:
+            conditions.append(KEYSET_AFTER)
+            params["after_ts"], params["after_id"] = after
+        direction = "ASC" if oldest_first else "DESC"
+        query = f"""
+        SELECT {MESSAGE_COLUMNS} FROM message
+        WHERE {" AND ".join(conditions)}
+        ORDER BY "timestamp" {direction}, id_message {direction}
+        LIMIT %(limit)s;
+        """
+        messages: List[Message] = []
+        with DBConnection(readonly=True, use_replica=False).connection as conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cursor:
+                cursor.execute(query, params)
+                for row in cursor.fetchall() or []:
+                    messages.append(self._row_to_message(row))
         return messages
 
+    def get_last_messages_by_conversations(
+        self, conversation_ids: List[int], per_conversation: Optional[int] = None
+    ) -> Dict[int, List[Message]]:
+        """
+        Charge en une seule requête l'historique de plusieurs conversations :
+        les ``per_conversation`` derniers messages de chacune (tous si None),
+        regroupés par conversation et triés chronologiquement.
+        """
+        history: Dict[int, List[Message]] = {cid: [] for cid in conversation_ids}
+        if not conversation_ids:
+            return history
+
+        if per_conversation is None:
+            query = f"""
+            SELECT {MESSAGE_COLUMNS} FROM message
+            WHERE id_conversation IN %(ids)s
+            ORDER BY id_conversation, "timestamp", id_message;
+            """
+            params = {"ids": tuple(conversation_ids)}
+        else:
+            # Une sous-requête LIMIT par conversation : le parcours de
+            # idx_message_conv_ts_id s'arrête après ``per_conversation`` lignes
+            query = f"""
+            SELECT {MESSAGE_COLUMNS} FROM (
+                SELECT m.*
+                  FROM unnest(%(ids)s::bigint[]) AS c(id)
+                 CROSS JOIN LATERAL (
+                       SELECT * FROM message
+                        WHERE id_conversation = c.id
+                        ORDER BY "timestamp" DESC, id_message DESC
+                        LIMIT %(limit)s
+                 ) m
+            ) recent
+            ORDER BY id_conversation, "timestamp", id_message;
+            """
+            params = {"ids": list(conversation_ids), "limit": per_conversation}
+        with DBConnection(readonly=True, use_replica=False).connection as conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cursor:
+                cursor.execute(query, params)
+                for row in cursor.fetchall() or []:
+                    message = self._row_to_message(row)
+                    history.setdefault(message.id_conversation, []).append(message)
+        return history
+
     def count_messages_by_conversation(self, conversation_id: int) -> int:
-        """Compte le nombre de messages dans une conversation."""
-        query = "SELECT COUNT(*) AS n FROM message WHERE id_conversation = %(id_conversation)s;"
-        with DBConnection().connection as conn:
+        """Nombre de messages d'une conversation (compteur conversation_stats, O(1))."""
+        query = """
+        SELECT COALESCE(
+            (SELECT message_count FROM conversation_stats WHERE id_conversation = %(id_conversation)s), 0
+        ) AS n;
+        """
+        with DBConnection(readonly=True, use_replica=False).connection as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                cursor.execute(query, {"id_conversation": conversation_id})
+                execute_prepared(cursor, query, {"id_conversation": conversation_id})
                 row = cursor.fetchone()
                 return int(row["n"]) if row and "n" in row else 0
 
     def search_messages(self, conversation_id: int, keyword: str) -> List[Message]:
         """Recherche des messages contenant un mot-clé (ILIKE = insensible à la casse)."""
-        query = """
-        SELECT * FROM message
+        query = f"""
+        SELECT {MESSAGE_COLUMNS} FROM message
         WHERE id_conversation = %(id_conversation)s
           AND message ILIKE %(kw)s
         ORDER BY "timestamp" DESC;
         """
         messages: List[Message] = []
-        with DBConnection().connection as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with DBConnection(readonly=True).connection as conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cursor:
                 cursor.execute(query, {"id_conversation": conversation_id, "kw": f"%{keyword}%"})
                 for row in cursor.fetchall() or []:
-                    messages.append(
-                        Message(
-                            id_message=row["id_message"],
-                            id_conversation=row["id_conversation"],
-                            id_user=row["id_user"],
-                            datetime=row["timestamp"],
-                            message=row["message"],
-                            is_from_agent=row["is_from_agent"],
-                        )
-                    )
+                    messages.append(self._row_to_message(row))
         return messages
 
     # =========================================================================
@@ -177,32 +360,23 @@ class MessageDAO:
         if not conversation_ids:
             return []
 
-        query = """
-        SELECT * FROM message
+        query = f"""
+        SELECT {MESSAGE_COLUMNS} FROM message
         WHERE id_conversation IN %(ids)s
           AND message ILIKE %(kw)s
         ORDER BY "timestamp" DESC;
         """
         messages: List[Message] = []
         try:
-            with DBConnection().connection as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            with DBConnection(readonly=True).connection as conn:
+                with conn.cursor(cursor_factory=TupleCursor) as cursor:
                     # psycopg2 gère la conversion de tuple en liste pour la clause IN
                     cursor.execute(query, {
                         "ids": tuple(conversation_ids),
                         "kw": f"%{keyword}%"
                     })
                     for row in cursor.fetchall() or []:
-                        messages.append(
-                            Message(
-                                id_message=row["id_message"],
-                                id_conversation=row["id_conversation"],
-                                id_user=row["id_user"],
-                                datetime=row["timestamp"],
-                                message=row["message"],
-                                is_from_agent=row["is_from_agent"],
-                            )
-                        )
+                        messages.append(self._row_to_message(row))
             return messages
         except Exception as e:
             logging.error(f"Erreur recherche messages par mot-clé (multi-conv): {e}")
@@ -211,80 +385,319 @@ class MessageDAO:
     # =======================================================================
     # NOUVELLE MÉTHODE POUR SearchService : Recherche par date (multi-conv)
     # =======================================================================
-    def search_by_date(self, target_date: datetime, conversation_ids: List[int]) -> List[Message]:
+    def search_by_date(self, target_date: DateLike, conversation_ids: List[int]) -> List[Message]:
         """
-        Recherche des messages créés à une date donnée (journée entière),
-        limités aux conversations spécifiées.
+        Recherche des messages créés à une date donnée (journée entière dans le
+        fuseau de target_date, ou celui de l'application), limités aux conversations spécifiées.
         """
         if not conversation_ids:
             return []
 
-        # Définir le début et la fin de la journée pour la recherche
-        start_of_day = datetime.combine(target_date.date(), time.min)
-        end_of_day = datetime.combine(target_date.date(), time.max)
+        # Journée [début, lendemain[ avec fuseau : plage sur (id_conversation, "timestamp")
+        start_of_day, end_of_day = day_bounds(target_date)
 
-        query = """
-        SELECT * FROM message
+        query = f"""
+        SELECT {MESSAGE_COLUMNS} FROM message
         WHERE id_conversation IN %(ids)s
-          AND "timestamp" BETWEEN %(start)s AND %(end)s
+          AND "timestamp" >= %(start)s AND "timestamp" < %(end)s
         ORDER BY "timestamp" DESC;
         """
         messages: List[Message] = []
         try:
-            with DBConnection().connection as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            with DBConnection(readonly=True).connection as conn:
+                with conn.cursor(cursor_factory=TupleCursor) as cursor:
                     cursor.execute(query, {
                         "ids": tuple(conversation_ids),
                         "start": start_of_day,
                         "end": end_of_day
                     })
                     for row in cursor.fetchall() or []:
-                        messages.append(
-                            Message(
-                                id_message=row["id_message"],
-                                id_conversation=row["id_conversation"],
-                                id_user=row["id_user"],
-                                datetime=row["timestamp"],
-                                message=row["message"],
-                                is_from_agent=row["is_from_agent"],
-                            )
-                        )
+                        messages.append(self._row_to_message(row))
             return messages
         except Exception as e:
             logging.error(f"Erreur recherche messages par date (multi-conv): {e}")
             return []
 
 
+    # =======================================================================
+    # Recherche plein texte (colonne message_tsv + index GIN)
+    # =======================================================================
+    def search_fulltext(
+        self,
+        keyword: str,
+        conversation_ids: Optional[List[int]] = None,
+        limit: int = 50,
+        *,
+        user_id: Optional[int] = None,
+        before: Optional[Tuple[float, int]] = None,
+    ) -> List[Tuple[Message, float, str]]:
+        """
+        Recherche plein texte classée par pertinence (ts_rank), limitée aux
+        conversations données ou, avec ``user_id``, à celles qu'il peut lire.
+        Retourne des triplets (Message, score, extrait avec les termes trouvés entre **).
+        L'extrait (ts_headline, coûteux) n'est calculé que pour les ``limit`` meilleurs résultats.
+        Pages keyset : ``before`` = (score, id_message) du dernier résultat de la page précédente.
+        """
+        if not keyword.strip():
+            return []
+        if user_id is not None:
+            scope, params = AUTHORIZED_CONVERSATIONS, {"user_id": user_id}
+        elif conversation_ids:
+            scope, params = "id_conversation IN %(ids)s", {"ids": tuple(conversation_ids)}
+        else:
+            return []
+        if before is not None:
+            # ts_rank est un real : le score relu est recomparé en real, sans écart d'arrondi
+            scope += "\n              AND (ts_rank(message_tsv, q), id_message) < (%(before_rank)s::real, %(before_id)s)"
+            params["before_rank"], params["before_id"] = before
+
+        query = f"""
+        SELECT {MESSAGE_COLUMNS}, rank,
+               ts_headline('french', message, q, %(headline)s) AS snippet
+        FROM (
+            SELECT {MESSAGE_COLUMNS}, q, ts_rank(message_tsv, q) AS rank
+            FROM message, {FULLTEXT_TSQUERY} AS q
+            WHERE {scope}
+              AND message_tsv @@ q
+            ORDER BY rank DESC, id_message DESC
+            LIMIT %(limit)s
+        ) AS hits
+        ORDER BY rank DESC, id_message DESC;
+        """
+        hits: List[Tuple[Message, float, str]] = []
+        try:
+            with DBConnection(readonly=True).connection as conn:
+                with conn.cursor(cursor_factory=TupleCursor) as cursor:
+                    cursor.execute(query, {
+                        **params,
+                        "kw": keyword,
+                        "limit": limit,
+                        "headline": HEADLINE_OPTIONS,
+                    })
+                    for row in cursor.fetchall() or []:
+                        hits.append((self._row_to_message(row), float(row[6]), row[7]))
+            return hits
+        except Exception as e:
+            logging.error(f"Erreur recherche plein texte (multi-conv): {e}")
+            return []
+
+    # =======================================================================
+    # Recherches autorisées en une requête (droits vérifiés en SQL)
+    # =======================================================================
+    def _search_for_user(
+        self,
+        user_id: int,
+        condition: str,
+        params: Dict[str, Any],
+        limit: int,
+        before: Optional[Tuple[datetime, int]],
+    ) -> List[Message]:
+        """
+        Messages des conversations lisibles par ``user_id`` vérifiant ``condition``,
+        plus récents d'abord, par pages keyset de ``limit`` (``before`` = curseur
+        ("timestamp", id_message) du dernier message de la page précédente).
+        """
+        conditions = [AUTHORIZED_CONVERSATIONS, condition]
+        params = {**params, "user_id": user_id, "limit": limit}
+        if before is not None:
+            conditions.append(KEYSET_BEFORE)
+            params["before_ts"], params["before_id"] = before
+        where = "\n          AND ".join(conditions)
+        query = f"""
+        SELECT {MESSAGE_COLUMNS} FROM message
+        WHERE {where}
+        ORDER BY "timestamp" DESC, id_message DESC
+        LIMIT %(limit)s;
+        """
+        messages: List[Message] = []
+        try:
+            with DBConnection(readonly=True).connection as conn:
+                with conn.cursor(cursor_factory=TupleCursor) as cursor:
+                    cursor.execute(query, params)
+                    for row in cursor.fetchall() or []:
+                        messages.append(self._row_to_message(row))
+            return messages
+        except Exception as e:
+            logging.error(f"Erreur recherche messages (utilisateur {user_id}): {e}")
+            return []
+
+    def search_by_keyword_for_user(
+        self,
+        user_id: int,
+        keyword: str,
+        *,
+        limit: int = 50,
+        before: Optional[Tuple[datetime, int]] = None,
+        fulltext: bool = False,
+    ) -> List[Message]:
+        """Recherche par mot-clé (ILIKE, ou plein texte si ``fulltext``) dans les conversations de l'utilisateur."""
+        if not keyword.strip():
+            return []
+        if fulltext:
+            condition = f"message_tsv @@ {FULLTEXT_TSQUERY}"
+            params = {"kw": keyword}
+        else:
+            condition = "message ILIKE %(kw)s"
+            params = {"kw": f"%{keyword}%"}
+        return self._search_for_user(user_id, condition, params, limit, before)
+
+    def search_by_date_for_user(
+        self,
+        user_id: int,
+        target_date: DateLike,
+        *,
+        limit: int = 50,
+        before: Optional[Tuple[datetime, int]] = None,
+    ) -> List[Message]:
+        """Messages d'une journée (entière, fuseau de la date ou de l'application) dans les conversations de l'utilisateur."""
+        start, end = day_bounds(target_date)
+        return self.search_by_date_range_for_user(user_id, start, end, limit=limit, before=before)
+
+    def search_by_date_range_for_user(
+        self,
+        user_id: int,
+        start: DateLike,
+        end: DateLike,
+        *,
+        limit: int = 50,
+        before: Optional[Tuple[datetime, int]] = None,
+    ) -> List[Message]:
+        """Messages de la période [start, end[ dans les conversations de l'utilisateur."""
+        start, end = range_bounds(start, end)
+        return self._search_for_user(
+            user_id,
+            '"timestamp" >= %(start)s AND "timestamp" < %(end)s',
+            {"start": start, "end": end},
+            limit,
+            before,
+        )
+
     def get_messages_by_date_range(
         self, conversation_id: int, start_date: datetime, end_date: datetime
     ) -> List[Message]:
         """Récupère les messages dans une période donnée (inclusif)."""
-        query = """
-        SELECT * FROM message
+        query = f"""
+        SELECT {MESSAGE_COLUMNS} FROM message
         WHERE id_conversation = %(id_conversation)s
           AND "timestamp" BETWEEN %(start)s AND %(end)s
         ORDER BY "timestamp";
         """
         messages: List[Message] = []
-        with DBConnection().connection as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with DBConnection(readonly=True).connection as conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cursor:
                 cursor.execute(
                     query,
                     {"id_conversation": conversation_id, "start": start_date, "end": end_date},
                 )
                 for row in cursor.fetchall() or []:
-                    messages.append(
-                        Message(
-                            id_message=row["id_message"],
-                            id_conversation=row["id_conversation"],
-                            id_user=row["id_user"],
-                            datetime=row["timestamp"],
-                            message=row["message"],
-                            is_from_agent=row["is_from_agent"],
-                        )
-                    )
+                    messages.append(self._row_to_message(row))
         return messages
 
+    # --- LECTURE EN FLUX (curseur serveur) ----------------------------------
+
+    def _iter_query(self, query: str, params: Dict[str, Any], itersize: Optional[int]) -> Iterator[Message]:
+        """
+        Exécute ``query`` sur un curseur serveur nommé et produit les Message
+        au fil de l'eau (``itersize`` lignes rapatriées par aller-retour).
+        La connexion (lecture seule, réplica si configurée) reste empruntée
+        au pool tant que l'itérateur n'est pas épuisé ou fermé. Elle est
+        toujours dédiée, jamais celle d'un ``unit_of_work()`` en cours :
+        l'itérateur peut être consommé après la sortie du bloc, une fois la
+        connexion de l'unité rendue au pool.
+        """
+        size = int(itersize or self.DEFAULT_ITERSIZE)
+        if size < 1:
+            raise ValueError("itersize invalide")
+        with DBConnection(readonly=True, dedicated=True).connection as conn:
+            conn.autocommit = False  # un curseur nommé vit dans une transaction (lecture seule)
+            with conn.cursor(name=f"msg_iter_{uuid.uuid4().hex}", cursor_factory=TupleCursor) as cursor:
+                cursor.itersize = size
+                cursor.execute(query, params)
+                for row in cursor:
+                    yield self._row_to_message(row)
+
+    def iter_messages_by_conversation(
+        self, conversation_id: int, itersize: Optional[int] = None
+    ) -> Iterator[Message]:
+        """Itère sur les messages d'une conversation, ordonnés par date (flux)."""
+        query = f"""
+        SELECT {MESSAGE_COLUMNS} FROM message
+        WHERE id_conversation = %(id_conversation)s
+        ORDER BY "timestamp", id_message;
+        """
+        return self._iter_query(query, {"id_conversation": conversation_id}, itersize)
+
+    def iter_search_by_keyword(
+        self, keyword: str, conversation_ids: List[int], itersize: Optional[int] = None
+    ) -> Iterator[Message]:
+        """Variante en flux de search_by_keyword (plus récents d'abord)."""
+        if not conversation_ids:
+            return iter(())
+        query = f"""
+        SELECT {MESSAGE_COLUMNS} FROM message
+        WHERE id_conversation IN %(ids)s
+          AND message ILIKE %(kw)s
+        ORDER BY "timestamp" DESC;
+        """
+        return self._iter_query(
+            query, {"ids": tuple(conversation_ids), "kw": f"%{keyword}%"}, itersize
+        )
+
+    def iter_messages_by_date_range(
+        self,
+        conversation_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        itersize: Optional[int] = None,
+    ) -> Iterator[Message]:
+        """Variante en flux de get_messages_by_date_range (inclusif)."""
+        query = f"""
+        SELECT {MESSAGE_COLUMNS} FROM message
+        WHERE id_conversation = %(id_conversation)s
+          AND "timestamp" BETWEEN %(start)s AND %(end)s
+        ORDER BY "timestamp";
+        """
+        return self._iter_query(
+            query,
+            {"id_conversation": conversation_id, "start": start_date, "end": end_date},
+            itersize,
+        )
+
+    # --- EXPORT EN MASSE (COPY TO STDOUT) -----------------------------------
+
+    # Colonnes de l'export analytique, dans l'ordre de Utils.columnar.COPY_COLUMNS
+    # (horodatage en microsecondes depuis l'epoch UTC : pas d'analyse de date côté client)
+    COPY_EXPORT_COLUMNS = (
+        'id_message, id_conversation, id_user, (EXTRACT(EPOCH FROM "timestamp") * 1000000)::BIGINT, '
+        "is_from_agent, length(message)"
+    )
+
+    def copy_messages_out(
+        self,
+        out: Any,
+        *,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+        include_text: bool = False,
+        chunk_size: int = 1 << 20,
+    ) -> None:
+        """
+        Écrit les messages (tous, ou ceux de [start, end[) au format texte de
+        COPY dans ``out`` (objet avec ``write``), par blocs de ``chunk_size``
+        octets : rien n'est matérialisé côté Python. Non trié.
+        """
+        columns = self.COPY_EXPORT_COLUMNS + (", message" if include_text else "")
+        where, params = "", {}
+        if start is not None and end is not None:
+            params["start"], params["end"] = range_bounds(start, end)
+            where = 'WHERE "timestamp" >= %(start)s AND "timestamp" < %(end)s'
+        elif start is not None or end is not None:
+            raise ValueError("start et end vont ensemble")
+        with DBConnection(readonly=True).connection as conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cursor:
+                select = cursor.mogrify(f"SELECT {columns} FROM message {where}", params).decode()
+                cursor.copy_expert(f"COPY ({select}) TO STDOUT", out, size=chunk_size)
+
     # --- UPDATE / DELETE ----------------------------------------------------
 
     def update(self, message: Message) -> bool:
@@ -310,24 +723,202 @@ class MessageDAO:
                 return cursor.rowcount > 0
 
     def get_last_message(self, conversation_id: int) -> Optional[Message]:
-        """Récupère le dernier message d'une conversation."""
-        query = """
-        SELECT * FROM message
-        WHERE id_conversation = %(id_conversation)s
-        ORDER BY "timestamp" DESC
-        LIMIT 1;
+        """Récupère le dernier message d'une conversation (repéré par conversation_stats)."""
+        query = f"""
+        SELECT {MESSAGE_COLUMNS} FROM message
+        WHERE (id_conversation, "timestamp", id_message) = (
+            SELECT id_conversation, last_message_at, last_message_id
+              FROM conversation_stats
+             WHERE id_conversation = %(id_conversation)s);
         """
-        with DBConnection().connection as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with DBConnection(readonly=True, use_replica=False).connection as conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cursor:
                 cursor.execute(query, {"id_conversation": conversation_id})
                 row = cursor.fetchone()
                 if not row:
                     return None
-                return Message(
-                    id_message=row["id_message"],
-                    id_conversation=row["id_conversation"],
-                    id_user=row["id_user"],
-                    datetime=row["timestamp"],
-                    message=row["message"],
-                    is_from_agent=row["is_from_agent"],
-                )
+                return self._row_to_message(row)
+
+    # --- AGRÉGATS (statistiques calculées en SQL) ----------------------------
+
+    def _scalar(self, query: str, params: Dict[str, Any]) -> Any:
+        with DBConnection(readonly=True).connection as conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cursor:
+                cursor.execute(query, params)
+                row = cursor.fetchone()
+                return row[0] if row else None
+
+    def count_messages_by_user(self, user_id: int) -> int:
+        """Nombre de messages écrits par un utilisateur (index (id_user, id_conversation, "timestamp"))."""
+        query = "SELECT COUNT(*) FROM message WHERE id_user = %(id_user)s;"
+        return int(self._scalar(query, {"id_user": user_id}) or 0)
+
+    def count_messages_user_in_conversation(self, user_id: int, conversation_id: int) -> int:
+        """Nombre de messages d'un utilisateur dans une conversation."""
+        query = """
+        SELECT COUNT(*) FROM message
+        WHERE id_user = %(id_user)s AND id_conversation = %(id_conversation)s;
+        """
+        return int(self._scalar(query, {"id_user": user_id, "id_conversation": conversation_id}) or 0)
+
+    def count_conversations_by_user(self, user_id: int) -> int:
+        """Nombre de conversations distinctes dans lesquelles l'utilisateur a écrit."""
+        query = "SELECT COUNT(DISTINCT id_conversation) FROM message WHERE id_user = %(id_user)s;"
+        return int(self._scalar(query, {"id_user": user_id}) or 0)
+
+    def get_top_users_by_message_count(self, limit: int = 10) -> List[Tuple[int, int]]:
+        """(id_user, nombre de messages) des ``limit`` utilisateurs les plus actifs."""
+        query = """
+        SELECT id_user, COUNT(*) AS n
+        FROM message
+        WHERE id_user IS NOT NULL
+        GROUP BY id_user
+        ORDER BY n DESC, id_user
+        LIMIT %(limit)s;
+        """
+        with DBConnection(readonly=True).connection as conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cursor:
+                cursor.execute(query, {"limit": limit})
+                return [(int(uid), int(n)) for uid, n in cursor.fetchall() or []]
+
+    def get_average_message_length(self) -> float:
+        """Longueur moyenne des messages, en caractères (0 si aucun message)."""
+        query = "SELECT AVG(length(message)) FROM message;"
+        return float(self._scalar(query, {}) or 0.0)
+
+    def get_session_durations(
+        self,
+        user_id: int,
+        idle_threshold: timedelta,
+        conversation_id: Optional[int] = None,
+    ) -> Tuple[timedelta, Dict[int, timedelta]]:
+        """
+        Temps passé par un utilisateur, en une requête : (total, {id_conversation: durée}).
+        Une session regroupe les messages consécutifs (par conversation) espacés
+        d'au plus ``idle_threshold`` ; sa durée est la somme de ces écarts, donc
+        le temps passé est la somme des écarts LAG() <= seuil. ROLLUP ajoute la
+        ligne du total (id_conversation NULL), présente même sans message.
+        """
+        query = """
+        WITH gaps AS (
+            SELECT id_conversation,
+                   "timestamp" - LAG("timestamp") OVER (
+                       PARTITION BY id_conversation ORDER BY "timestamp") AS gap
+            FROM message
+            WHERE id_user = %(id_user)s
+              AND (%(id_conversation)s::BIGINT IS NULL OR id_conversation = %(id_conversation)s)
+        )
+        SELECT id_conversation,
+               COALESCE(SUM(gap) FILTER (WHERE gap <= %(idle)s), INTERVAL '0') AS duration
+        FROM gaps
+        GROUP BY ROLLUP (id_conversation)
+        ORDER BY id_conversation NULLS FIRST;
+        """
+        params = {"id_user": user_id, "id_conversation": conversation_id, "idle": idle_threshold}
+        total = timedelta(0)
+        per_conversation: Dict[int, timedelta] = {}
+        with DBConnection(readonly=True).connection as conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cursor:
+                cursor.execute(query, params)
+                for cid, duration in cursor.fetchall() or []:
+                    if cid is None:
+                        total = duration
+                    else:
+                        per_conversation[int(cid)] = duration
+        return total, per_conversation
+
+    # --- COMPTEURS PAR CONVERSATION (table conversation_stats) ---------------
+
+    def get_conversation_stats(self, conversation_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Compteurs d'une conversation : message_count, agent_message_count,
+        last_message_id, last_message_at. None si la conversation n'existe pas.
+        """
+        query = """
+        SELECT COALESCE(s.message_count, 0)       AS message_count,
+               COALESCE(s.agent_message_count, 0) AS agent_message_count,
+               s.last_message_id,
+               s.last_message_at
+          FROM conversation c
+          LEFT JOIN conversation_stats s ON s.id_conversation = c.id_conversation
+         WHERE c.id_conversation = %(id_conversation)s;
+        """
+        with DBConnection(readonly=True, use_replica=False).connection as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                execute_prepared(cursor, query, {"id_conversation": conversation_id})
+                row = cursor.fetchone()
+                return dict(row) if row else None
+
+    def reconcile_conversation_stats(self, batch_size: int = 1000) -> int:
+        """
+        Recalcule les compteurs à partir de la table message, par lots de
+        ``batch_size`` conversations (une transaction par lot), et corrige les
+        lignes qui ont dérivé. Retourne le nombre de conversations corrigées.
+
+        Les lignes du lot sont verrouillées avant le recalcul : une insertion
+        concurrente attend la fin du lot au lieu d'être écrasée par un total périmé.
+        """
+        lock = """
+        SELECT id_conversation FROM conversation_stats
+         WHERE id_conversation > %(after)s AND id_conversation <= %(upto)s
+         ORDER BY id_conversation
+           FOR UPDATE;
+        """
+        repair = """
+        WITH truth AS (
+            SELECT c.id_conversation, a.n, a.n_agent, l.id_message, l."timestamp"
+              FROM conversation c
+             CROSS JOIN LATERAL (
+                   SELECT COUNT(*) AS n, COUNT(*) FILTER (WHERE m.is_from_agent) AS n_agent
+                     FROM message m WHERE m.id_conversation = c.id_conversation) a
+              LEFT JOIN LATERAL (
+                   SELECT m.id_message, m."timestamp"
+                     FROM message m WHERE m.id_conversation = c.id_conversation
+                    ORDER BY m."timestamp" DESC, m.id_message DESC
+                    LIMIT 1) l ON TRUE
+             WHERE c.id_conversation > %(after)s AND c.id_conversation <= %(upto)s
+        ), drift AS (
+            SELECT t.*
+              FROM truth t
+              LEFT JOIN conversation_stats s ON s.id_conversation = t.id_conversation
+             WHERE CASE WHEN s.id_conversation IS NULL THEN t.n > 0
+                        ELSE (s.message_count, s.agent_message_count, s.last_message_id, s.last_message_at)
+                             IS DISTINCT FROM (t.n, t.n_agent, t.id_message, t."timestamp") END
+        )
+        INSERT INTO conversation_stats AS s
+               (id_conversation, message_count, agent_message_count, last_message_id, last_message_at, updated_at)
+        SELECT id_conversation, n, n_agent, id_message, "timestamp", NOW()
+          FROM drift
+         ORDER BY id_conversation
+        ON CONFLICT (id_conversation) DO UPDATE SET
+               message_count       = EXCLUDED.message_count,
+               agent_message_count = EXCLUDED.agent_message_count,
+               last_message_id     = EXCLUDED.last_message_id,
+               last_message_at     = EXCLUDED.last_message_at,
+               updated_at          = NOW()
+        RETURNING s.id_conversation;
+        """
+        next_batch = """
+        SELECT MAX(id_conversation) AS upto FROM (
+            SELECT id_conversation FROM conversation
+             WHERE id_conversation > %(after)s
+             ORDER BY id_conversation
+             LIMIT %(batch_size)s
+        ) b;
+        """
+        repaired, after = 0, 0
+        while True:
+            with DBConnection().connection as conn:
+                with conn.cursor(cursor_factory=TupleCursor) as cursor:
+                    cursor.execute(next_batch, {"after": after, "batch_size": batch_size})
+                    upto = cursor.fetchone()[0]
+                    if upto is None:
+                        return repaired
+                    bounds = {"after": after, "upto": upto}
+                    cursor.execute(lock, bounds)
+                    cursor.execute(repair, bounds)
+                    fixed = len(cursor.fetchall() or [])
+            if fixed:
+                logging.warning(f"conversation_stats : {fixed} conversation(s) corrigée(s) dans ]{after}, {upto}]")
+            repaired += fixed
+            after = upto
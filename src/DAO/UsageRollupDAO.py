@@ -0,0 +1,258 @@
+import logging
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from psycopg2.extensions import cursor as TupleCursor
+from psycopg2.extras import RealDictCursor
+
+from DAO.DBConnector import DBConnection
+from Utils.date_range import app_timezone
+
+# Clé (id_user, id_conversation, day) d'une ligne de usage_daily, passée en tableaux
+ROLLUP_KEYS = "unnest(%(users)s::BIGINT[], %(conversations)s::BIGINT[], %(days)s::DATE[]) AS k(id_user, id_conversation, day)"
+
+# Recalcul exact des clés données. Les messages de la veille à moins de
+# ``idle`` de minuit sont lus pour que LAG() voie l'écart qui traverse minuit ;
+# comme dans MessageDAO.get_session_durations, le temps de session est la
+# somme des écarts <= ``idle``, rattachés au jour du second message.
+RECOMPUTE_SQL = f"""
+INSERT INTO usage_daily (id_user, day, id_conversation, message_count, agent_message_count,
+                         human_message_count, char_count, session_time, refreshed_at)
+SELECT k.id_user, k.day, k.id_conversation,
+       COUNT(*) FILTER (WHERE w.in_day),
+       COUNT(*) FILTER (WHERE w.in_day AND w.is_from_agent),
+       COUNT(*) FILTER (WHERE w.in_day AND NOT w.is_from_agent),
+       COALESCE(SUM(w.len) FILTER (WHERE w.in_day), 0),
+       COALESCE(SUM(w.gap) FILTER (WHERE w.in_day AND w.gap <= %(idle)s), INTERVAL '0'),
+       NOW()
+  FROM {ROLLUP_KEYS}
+ CROSS JOIN LATERAL (
+       SELECT m."timestamp" >= (k.day::TIMESTAMP AT TIME ZONE %(tz)s) AS in_day,
+              m.is_from_agent,
+              length(m.message) AS len,
+              m."timestamp" - LAG(m."timestamp") OVER (ORDER BY m."timestamp") AS gap
+         FROM message m
+        WHERE m.id_conversation = k.id_conversation
+          AND (m.id_user = k.id_user OR (k.id_user = 0 AND m.id_user IS NULL))
+          AND m."timestamp" >= (k.day::TIMESTAMP AT TIME ZONE %(tz)s) - %(idle)s
+          AND m."timestamp" <  ((k.day + 1)::TIMESTAMP AT TIME ZONE %(tz)s)
+       ) w
+ GROUP BY k.id_user, k.day, k.id_conversation
+HAVING COUNT(*) FILTER (WHERE w.in_day) > 0;
+"""
+
+DELETE_KEYS_SQL = f"""
+DELETE FROM usage_daily u
+ USING {ROLLUP_KEYS}
+ WHERE u.id_user = k.id_user AND u.id_conversation = k.id_conversation AND u.day = k.day;
+"""
+
+DAILY_COLUMNS = """SUM(message_count)::BIGINT       AS message_count,
+               SUM(agent_message_count)::BIGINT AS agent_message_count,
+               SUM(human_message_count)::BIGINT AS human_message_count,
+               SUM(char_count)::BIGINT          AS char_count,
+               SUM(session_time)                AS session_time"""
+
+
+class UsageRollupDAO:
+    """DAO de la table usage_daily (agrégats par utilisateur, conversation et jour).
+
+    ``refresh`` ne traite que les messages d'id supérieur au point de reprise
+    (rollup_watermark) : les clés (utilisateur, conversation, jour) touchées
+    sont recalculées en entier, ce qui rend le traitement rejouable. Une
+    insertion validée après qu'un id plus grand a été traité (séquence allouée
+    avant le commit) est rattrapée par la fenêtre de sécurité : chaque lot
+    relit aussi les ``lookback_ids`` derniers ids sous le point de reprise.
+    Les modifications et suppressions de messages ne sont vues que par
+    ``rebuild`` (à planifier chaque nuit sur les derniers jours).
+
+    ``refresh`` et ``rebuild`` prennent le même verrou (ligne de
+    rollup_watermark, FOR UPDATE) : ils ne s'entrelacent jamais.
+    """
+
+    WATERMARK = "usage_daily"
+    DEFAULT_IDLE_THRESHOLD = timedelta(minutes=10)
+    DEFAULT_LOOKBACK_IDS = 10000
+
+    def __init__(self, idle_threshold: timedelta = DEFAULT_IDLE_THRESHOLD,
+                 lookback_ids: int = DEFAULT_LOOKBACK_IDS):
+        self.idle_threshold = idle_threshold
+        self.lookback_ids = lookback_ids
+
+    def _params(self, keys: Sequence[Tuple[int, int, date]]) -> Dict[str, Any]:
+        return {
+            "users": [k[0] for k in keys],
+            "conversations": [k[1] for k in keys],
+            "days": [k[2] for k in keys],
+            "idle": self.idle_threshold,
+            "tz": str(app_timezone()),
+        }
+
+    def _recompute(self, cursor, keys: Sequence[Tuple[int, int, date]]) -> None:
+        params = self._params(keys)
+        cursor.execute(DELETE_KEYS_SQL, params)
+        cursor.execute(RECOMPUTE_SQL, params)
+
+    def _lock_watermark(self, cursor) -> int:
+        """Verrouille le point de reprise jusqu'à la fin de la transaction ; retourne last_id."""
+        cursor.execute(
+            "SELECT last_id FROM rollup_watermark WHERE name = %(name)s FOR UPDATE;",
+            {"name": self.WATERMARK},
+        )
+        row = cursor.fetchone()
+        if row is None:
+            raise RuntimeError("rollup_watermark absent : appliquer les migrations (0006)")
+        return row[0]
+
+    # --- MISE À JOUR ----------------------------------------------------------
+
+    def refresh(self, batch_size: int = 50000) -> int:
+        """
+        Intègre les nouveaux messages, par lots de ``batch_size`` ids (une
+        transaction par lot, point de reprise avancé dans la même transaction).
+        Retourne le nombre de messages traités.
+        """
+        next_batch = """
+        SELECT MAX(id_message), COUNT(*) FROM (
+            SELECT id_message FROM message
+             WHERE id_message > %(after)s
+             ORDER BY id_message
+             LIMIT %(batch_size)s
+        ) b;
+        """
+        # Le jour du message, et le lendemain si le message est à moins de ``idle``
+        # de minuit (il change le premier écart de ce jour-là). La borne basse
+        # ``since`` inclut la fenêtre de sécurité sous le point de reprise.
+        touched = """
+        SELECT DISTINCT COALESCE(m.id_user, 0), m.id_conversation, d.day
+          FROM message m
+         CROSS JOIN LATERAL (VALUES
+               ((m."timestamp" AT TIME ZONE %(tz)s)::DATE),
+               (((m."timestamp" + %(idle)s) AT TIME ZONE %(tz)s)::DATE)) AS d(day)
+         WHERE m.id_message > %(since)s AND m.id_message <= %(upto)s;
+        """
+        advance = """
+        UPDATE rollup_watermark SET last_id = %(upto)s, refreshed_at = NOW()
+         WHERE name = %(name)s;
+        """
+        processed = 0
+        while True:
+            with DBConnection().connection as conn:
+                with conn.cursor(cursor_factory=TupleCursor) as cursor:
+                    # verrou : rafraîchissements et reconstructions s'exécutent l'un après l'autre
+                    after = self._lock_watermark(cursor)
+                    cursor.execute(next_batch, {"after": after, "batch_size": batch_size})
+                    upto, count = cursor.fetchone()
+                    if upto is None:
+                        return processed
+                    bounds = {
+                        "since": max(after - self.lookback_ids, 0),
+                        "upto": upto,
+                        "idle": self.idle_threshold,
+                        "tz": str(app_timezone()),
+                    }
+                    cursor.execute(touched, bounds)
+                    keys = [(int(u), int(c), d) for u, c, d in cursor.fetchall() or []]
+                    self._recompute(cursor, keys)
+                    cursor.execute(advance, {"upto": upto, "name": self.WATERMARK})
+            logging.info(f"usage_daily : messages ]{after}, {upto}] intégrés ({len(keys)} clé(s))")
+            processed += count
+
+    def rebuild(self, start: date, end: date) -> int:
+        """
+        Recalcule entièrement les jours ``start`` à ``end`` inclus (une transaction
+        par jour, sous le verrou de ``refresh``) : rattrape les modifications et
+        suppressions de messages.
+        Retourne le nombre de jours traités.
+        """
+        if end < start:
+            raise ValueError("end doit être postérieur ou égal à start")
+        keys_of_day = """
+        SELECT DISTINCT COALESCE(id_user, 0), id_conversation
+          FROM message
+         WHERE "timestamp" >= (%(day)s::TIMESTAMP AT TIME ZONE %(tz)s)
+           AND "timestamp" <  ((%(day)s::DATE + 1)::TIMESTAMP AT TIME ZONE %(tz)s);
+        """
+        day = start
+        while day <= end:
+            with DBConnection().connection as conn:
+                with conn.cursor(cursor_factory=TupleCursor) as cursor:
+                    self._lock_watermark(cursor)
+                    cursor.execute(keys_of_day, {"day": day, "tz": str(app_timezone())})
+                    keys = [(int(u), int(c), day) for u, c in cursor.fetchall() or []]
+                    cursor.execute("DELETE FROM usage_daily WHERE day = %(day)s;", {"day": day})
+                    cursor.execute(RECOMPUTE_SQL, self._params(keys))
+            day += timedelta(days=1)
+        return (end - start).days + 1
+
+    # --- LECTURE --------------------------------------------------------------
+
+    def _fetch_all(self, query: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with DBConnection(readonly=True).connection as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(query, params)
+                return [dict(row) for row in cursor.fetchall() or []]
+
+    def get_user_daily(self, user_id: int, start: date, end: date) -> List[Dict[str, Any]]:
+        """Une ligne par jour d'activité de l'utilisateur entre ``start`` et ``end`` inclus."""
+        query = f"""
+        SELECT day, {DAILY_COLUMNS}
+          FROM usage_daily
+         WHERE id_user = %(id_user)s AND day >= %(start)s AND day <= %(end)s
+         GROUP BY day
+         ORDER BY day;
+        """
+        return self._fetch_all(query, {"id_user": user_id, "start": start, "end": end})
+
+    def get_conversation_daily(self, conversation_id: int, start: date, end: date) -> List[Dict[str, Any]]:
+        """Une ligne par jour d'activité de la conversation (tous auteurs confondus)."""
+        query = f"""
+        SELECT day, {DAILY_COLUMNS}
+          FROM usage_daily
+         WHERE id_conversation = %(id_conversation)s AND day >= %(start)s AND day <= %(end)s
+         GROUP BY day
+         ORDER BY day;
+        """
+        return self._fetch_all(query, {"id_conversation": conversation_id, "start": start, "end": end})
+
+    def get_user_totals(self, user_id: int, start: date, end: date) -> Dict[str, Any]:
+        """Totaux de l'utilisateur sur la période (+ nombre de conversations et de jours actifs)."""
+        query = f"""
+        SELECT {DAILY_COLUMNS},
+               COUNT(DISTINCT id_conversation) AS conversation_count,
+               COUNT(DISTINCT day)             AS active_days
+          FROM usage_daily
+         WHERE id_user = %(id_user)s AND day >= %(start)s AND day <= %(end)s;
+        """
+        rows = self._fetch_all(query, {"id_user": user_id, "start": start, "end": end})
+        totals = rows[0] if rows else {}
+        return {
+            "message_count": int(totals.get("message_count") or 0),
+            "agent_message_count": int(totals.get("agent_message_count") or 0),
+            "human_message_count": int(totals.get("human_message_count") or 0),
+            "char_count": int(totals.get("char_count") or 0),
+            "session_time": totals.get("session_time") or timedelta(0),
+            "conversation_count": int(totals.get("conversation_count") or 0),
+            "active_days": int(totals.get("active_days") or 0),
+        }
+
+    def get_top_users(self, start: date, end: date, limit: int = 10) -> List[Tuple[int, int]]:
+        """(id_user, nombre de messages) des utilisateurs les plus actifs sur la période."""
+        query = """
+        SELECT id_user, SUM(message_count)::BIGINT AS n
+          FROM usage_daily
+         WHERE day >= %(start)s AND day <= %(end)s AND id_user <> 0
+         GROUP BY id_user
+         ORDER BY n DESC, id_user
+         LIMIT %(limit)s;
+        """
+        rows = self._fetch_all(query, {"start": start, "end": end, "limit": limit})
+        return [(int(r["id_user"]), int(r["n"])) for r in rows]
+
+    def get_watermark(self) -> Optional[Dict[str, Any]]:
+        """Point de reprise : dernier id_message intégré et date du dernier rafraîchissement."""
+        rows = self._fetch_all(
+            "SELECT last_id, refreshed_at FROM rollup_watermark WHERE name = %(name)s;",
+            {"name": self.WATERMARK},
+        )
+        return rows[0] if rows else None
@@ -3,7 +3,7 @@ import logging
 from psycopg2.errors import DatabaseError, IntegrityError
 from psycopg2.extras import RealDictCursor
 
-from DAO.DBConnector import DBConnection
+from DAO.DBConnector import DBConnection, execute_prepared
 
 try:
     from ObjetMetier.User import User
@@ -11,6 +11,14 @@ except Exception:
     from ObjetMetier.User import User
 
 
+# Colonnes explicites pour les requêtes préparées : un plan en cache sur « SELECT * »
+# échoue (« cached plan must not change result type ») après un ALTER TABLE users.
+USER_COLUMNS = (
+    "id_user, username, nom, prenom, mail, password_hash, salt, "
+    "sign_in_date, last_login, status, setting_param"
+)
+
+
 class UserDAO:
     """DAO pour User : CRUD + recherche, basé sur DBConnection (pool partagé)."""
 
@@ -56,10 +64,10 @@ class UserDAO:
     # --- READ (by ID) ---
     def read(self, user_id: int):
         """Lit un utilisateur par id. Retourne None si non trouvé."""
-        query = "SELECT * FROM users WHERE id_user = %(id)s;"
-        with DBConnection().connection as conn:
+        query = f"SELECT {USER_COLUMNS} FROM users WHERE id_user = %(id)s;"
+        with DBConnection(readonly=True, use_replica=False).connection as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query, {"id": user_id})
+                execute_prepared(cur, query, {"id": user_id})
                 row = cur.fetchone()
                 if not row:
                     return None
@@ -132,10 +140,10 @@ class UserDAO:
     # --- READ by EMAIL ---
     def get_user_by_email(self, email: str):
         """Lit un utilisateur par email. Retourne None si non trouvé."""
-        query = "SELECT * FROM users WHERE mail = %(email)s;"
-        with DBConnection().connection as conn:
+        query = f"SELECT {USER_COLUMNS} FROM users WHERE mail = %(email)s;"
+        with DBConnection(readonly=True, use_replica=False).connection as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query, {"email": email})
+                execute_prepared(cur, query, {"email": email})
                 row = cur.fetchone()
                 if not row:
                     return None
@@ -156,10 +164,10 @@ class UserDAO:
     # --- READ by USERNAME ---
     def get_user_by_username(self, username: str):
         """Lit un utilisateur par username. Retourne None si non trouvé."""
-        query = "SELECT * FROM users WHERE username = %(u)s;"
-        with DBConnection().connection as conn:
+        query = f"SELECT {USER_COLUMNS} FROM users WHERE username = %(u)s;"
+        with DBConnection(readonly=True, use_replica=False).connection as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query, {"u": username})
+                execute_prepared(cur, query, {"u": username})
                 row = cur.fetchone()
                 if not row:
                     return None
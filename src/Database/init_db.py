@@ -1,22 +1,16 @@
 # src/Database/init_db.py
-import psycopg2
-from .schema_sql import SCHEMA_SQL
+from .migrate import MigrationRunner
 
 def init_db_for_url(db_url: str):
+    """Crée / met à jour le schéma en appliquant les migrations en attente (voir Database/migrate.py)."""
     print(f"Connexion à PostgreSQL pour initialiser le schéma…")
-    with psycopg2.connect(db_url) as conn:
-        conn.autocommit = False
-        try:
-            with conn.cursor() as cur:
-                cur.execute(SCHEMA_SQL)
-            conn.commit()
-            print("✅ Schéma créé / mis à jour avec succès.")
-        except Exception as e:
-            conn.rollback()
-            print("❌ Erreur lors de la création du schéma :", e)
+    try:
+        applied = MigrationRunner(db_url).apply()
+        print(f"✅ Schéma créé / mis à jour avec succès ({len(applied)} migration(s) appliquée(s)).")
+    except Exception as e:
+        print("❌ Erreur lors de la création du schéma :", e)
 
 # rétro-compat : permet encore `python -m Database.init_db` pour la base principale
 if __name__ == "__main__":
     from .settings import DATABASE_URL
     init_db_for_url(DATABASE_URL)
-
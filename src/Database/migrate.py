@@ -0,0 +1,368 @@
+# src/Database/migrate.py
+"""
+Migrations versionnées du schéma.
+
+Chaque fichier ``Database/migrations/NNNN_description.sql`` est appliqué une
+seule fois, dans l'ordre des versions, et enregistré dans ``schema_migrations``
+(version, nom, empreinte, date, durée).
+
+Par défaut une migration s'exécute dans une transaction (tout ou rien). Un
+fichier dont l'en-tête contient ``-- migrate: no-transaction`` est exécuté
+instruction par instruction hors transaction : obligatoire pour
+``CREATE INDEX CONCURRENTLY``, qui construit l'index sans bloquer les écritures
+(partition par partition si la table est partitionnée).
+
+Usage (depuis src/) :
+    python -m Database.migrate status
+    python -m Database.migrate apply [--target 0003]
+    python -m Database.migrate dry-run [--url postgresql://localhost/app]
+"""
+import argparse
+import hashlib
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import psycopg2
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+# Clé du verrou consultatif : un seul processus migre une base à la fois
+ADVISORY_LOCK_KEY = 0x5C4E_3A11
+
+_FILENAME = re.compile(r"^(\d{4})_(\w+)\.sql$")
+_CONCURRENT_INDEX = re.compile(
+    r"CREATE\s+(?P<unique>UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(?P<name>\w+)"
+    r"\s+ON\s+(?P<table>\w+)(?P<rest>.*)$",
+    re.IGNORECASE | re.DOTALL,
+)
+
+SCHEMA_MIGRATIONS_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+  version     VARCHAR(16)  PRIMARY KEY,
+  name        VARCHAR(255) NOT NULL,
+  checksum    CHAR(64)     NOT NULL,
+  applied_at  TIMESTAMPTZ  NOT NULL DEFAULT NOW(),
+  duration_ms INTEGER      NOT NULL DEFAULT 0
+);
+"""
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: str
+    name: str
+    sql: str
+
+    @property
+    def transactional(self) -> bool:
+        head = self.sql.lstrip().splitlines()[:1]
+        return not (head and head[0].strip().lower() == NO_TRANSACTION_MARKER)
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+
+    def statements(self) -> List[str]:
+        return split_statements(self.sql)
+
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Lit les fichiers NNNN_nom.sql du dossier, triés par version (doublon = erreur)."""
+    migrations: Dict[str, Migration] = {}
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        version, name = match.groups()
+        if version in migrations:
+            raise ValueError(f"Version de migration en double : {version}")
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            migrations[version] = Migration(version, name, f.read())
+    return [migrations[v] for v in sorted(migrations)]
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Découpe un script en instructions sur les ';' hors chaînes, identifiants
+    entre guillemets, commentaires et blocs $tag$ ... $tag$.
+    """
+    statements: List[str] = []
+    buf: List[str] = []
+    i, n = 0, len(sql)
+    while i < n:
+        ch = sql[i]
+        if ch == "-" and sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = n if end < 0 else end  # commentaire ignoré
+            continue
+        if ch in ("'", '"'):
+            end = sql.find(ch, i + 1)
+            while end >= 0 and sql.startswith(ch * 2, end):
+                end = sql.find(ch, end + 2)
+            end = n if end < 0 else end + 1
+            buf.append(sql[i:end])
+            i = end
+            continue
+        if ch == "$":
+            tag = re.match(r"\$\w*\$", sql[i:])
+            if tag:
+                end = sql.find(tag.group(), i + len(tag.group()))
+                end = n if end < 0 else end + len(tag.group())
+                buf.append(sql[i:end])
+                i = end
+                continue
+        if ch == ";":
+            stmt = "".join(buf).strip()
+            if stmt:
+                statements.append(stmt)
+            buf = []
+        else:
+            buf.append(ch)
+        i += 1
+    stmt = "".join(buf).strip()
+    if stmt:
+        statements.append(stmt)
+    return statements
+
+
+class MigrationRunner:
+    """
+    Applique les migrations en attente sur une base.
+
+    La session de migration pose un ``lock_timeout`` (DB_MIGRATION_LOCK_TIMEOUT,
+    5s par défaut) : une migration qui attend un verrou échoue vite au lieu de
+    bloquer derrière elle toutes les requêtes de l'application.
+    """
+
+    def __init__(
+        self,
+        db_url: str,
+        directory: str = MIGRATIONS_DIR,
+        *,
+        connect: Callable[[str], "psycopg2.extensions.connection"] = psycopg2.connect,
+        lock_timeout: Optional[str] = None,
+    ):
+        self.db_url = db_url
+        self.directory = directory
+        self._connect = connect
+        self.lock_timeout = lock_timeout or os.getenv("DB_MIGRATION_LOCK_TIMEOUT", "5s")
+
+    # ------------------------------------------------------------------ #
+    # Connexion                                                          #
+    # ------------------------------------------------------------------ #
+    def _open(self):
+        conn = self._connect(self.db_url)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("SET lock_timeout = %s", (self.lock_timeout,))
+            cur.execute("SET statement_timeout = 0")  # construction d'index longue
+            cur.execute(SCHEMA_MIGRATIONS_SQL)
+        return conn
+
+    @staticmethod
+    def _applied(conn) -> Dict[str, Tuple[str, object]]:
+        with conn.cursor() as cur:
+            cur.execute("SELECT version, checksum, applied_at FROM schema_migrations ORDER BY version;")
+            return {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+
+    # ------------------------------------------------------------------ #
+    # État                                                               #
+    # ------------------------------------------------------------------ #
+    def status(self) -> List[Dict[str, object]]:
+        """Une ligne par migration : version, nom, état (appliquée / en attente / modifiée), date."""
+        conn = self._open()
+        try:
+            applied = self._applied(conn)
+        finally:
+            conn.close()
+        rows = []
+        for m in load_migrations(self.directory):
+            checksum, applied_at = applied.get(m.version, (None, None))
+            if checksum is None:
+                state = "en attente"
+            elif checksum.strip() != m.checksum:
+                state = "modifiée"
+            else:
+                state = "appliquée"
+            rows.append({"version": m.version, "name": m.name, "state": state, "applied_at": applied_at})
+        return rows
+
+    def pending(self, conn, target: Optional[str] = None) -> List[Migration]:
+        applied = self._applied(conn)
+        return [
+            m for m in load_migrations(self.directory)
+            if m.version not in applied and (target is None or m.version <= target)
+        ]
+
+    # ------------------------------------------------------------------ #
+    # Application                                                        #
+    # ------------------------------------------------------------------ #
+    def apply(self, target: Optional[str] = None, *, dry_run: bool = False) -> List[Migration]:
+        """
+        Applique les migrations en attente (jusqu'à ``target`` inclus) et les renvoie.
+
+        En ``dry_run``, les migrations transactionnelles sont exécutées dans une
+        seule transaction annulée à la fin (validation contre la base, rien
+        n'est conservé) ; les migrations hors transaction sont seulement listées.
+        """
+        conn = self._open()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_lock(%s)", (ADVISORY_LOCK_KEY,))
+            try:
+                todo = self.pending(conn, target)
+                if dry_run:
+                    self._dry_run(conn, todo)
+                else:
+                    for m in todo:
+                        self._apply_one(conn, m)
+                return todo
+            finally:
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute("SELECT pg_advisory_unlock(%s)", (ADVISORY_LOCK_KEY,))
+        finally:
+            conn.close()
+
+    def _apply_one(self, conn, m: Migration) -> None:
+        print(f"→ {m.version} {m.name}{'' if m.transactional else ' (hors transaction)'}")
+        t0 = time.monotonic()
+        if m.transactional:
+            conn.autocommit = False
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(m.sql)
+                    self._record(cur, m, t0)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.autocommit = True
+            return
+
+        with conn.cursor() as cur:
+            for stmt in m.statements():
+                index = _CONCURRENT_INDEX.match(stmt)
+                if index and self._is_partitioned(cur, index.group("table")):
+                    self._create_partitioned_index(cur, index)
+                    continue
+                if index:
+                    self._drop_invalid_index(cur, index.group("name"))
+                cur.execute(stmt)
+            self._record(cur, m, t0)
+
+    @staticmethod
+    def _record(cur, m: Migration, t0: float) -> None:
+        cur.execute(
+            "INSERT INTO schema_migrations (version, name, checksum, duration_ms) "
+            "VALUES (%s, %s, %s, %s);",
+            (m.version, m.name, m.checksum, int((time.monotonic() - t0) * 1000)),
+        )
+
+    @staticmethod
+    def _drop_invalid_index(cur, name: str) -> None:
+        """
+        Un CREATE INDEX CONCURRENTLY interrompu laisse un index INVALID que
+        IF NOT EXISTS ignorerait : on le supprime avant de relancer la construction.
+        """
+        cur.execute(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = %s AND NOT i.indisvalid;",
+            (name,),
+        )
+        if cur.fetchone():
+            print(f"  index invalide {name} supprimé avant reconstruction")
+            cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}";')
+
+    @staticmethod
+    def _is_partitioned(cur, table: str) -> bool:
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s);", (table,))
+        row = cur.fetchone()
+        return bool(row) and row[0] == "p"
+
+    def _create_partitioned_index(self, cur, index: "re.Match") -> None:
+        """
+        CREATE INDEX CONCURRENTLY est refusé sur une table partitionnée (voir
+        Database/partitions.py) : index créé sur le parent seul (ON ONLY, invalide),
+        construit en CONCURRENTLY sur chaque partition puis rattaché ; le parent
+        devient valide une fois toutes ses partitions rattachées. Un index parent
+        déjà valide (ex. créé par ``partitions convert``) est laissé tel quel.
+        """
+        unique, name, table, rest = (index.group(g) or "" for g in ("unique", "name", "table", "rest"))
+        cur.execute("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s);", (name,))
+        row = cur.fetchone()
+        if row and row[0]:
+            return
+        cur.execute(f"CREATE {unique}INDEX IF NOT EXISTS {name} ON ONLY {table}{rest};")
+        cur.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname;",
+            (table,),
+        )
+        for (partition,) in cur.fetchall():
+            part_index = f"{partition}_{name}"[:63]
+            self._drop_invalid_index(cur, part_index)
+            cur.execute(f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {part_index} ON {partition}{rest};")
+            cur.execute(f"ALTER INDEX {name} ATTACH PARTITION {part_index};")
+
+    @staticmethod
+    def _dry_run(conn, todo: List[Migration]) -> None:
+        conn.autocommit = False
+        try:
+            with conn.cursor() as cur:
+                for m in todo:
+                    if m.transactional:
+                        print(f"→ {m.version} {m.name} : exécutée puis annulée")
+                        cur.execute(m.sql)
+                    else:
+                        print(f"→ {m.version} {m.name} : hors transaction, non exécutée")
+                        for stmt in m.statements():
+                            print(f"    {stmt};")
+        finally:
+            conn.rollback()
+
+
+# ---------------------------------------------------------------------- #
+# CLI                                                                    #
+# ---------------------------------------------------------------------- #
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m Database.migrate", description="Migrations du schéma")
+    parser.add_argument("command", choices=("apply", "status", "dry-run"))
+    parser.add_argument("--url", help="URL PostgreSQL (défaut : DATABASE_URL)")
+    parser.add_argument("--test", action="store_true", help="utiliser DATABASE_URL_TEST")
+    parser.add_argument("--target", help="dernière version à appliquer (ex. 0003)")
+    args = parser.parse_args(argv)
+
+    url = args.url
+    if not url:
+        from Database.settings import DATABASE_URL, DATABASE_URL_TEST
+        url = DATABASE_URL_TEST if args.test else DATABASE_URL
+    runner = MigrationRunner(url)
+
+    if args.command == "status":
+        for row in runner.status():
+            when = row["applied_at"] or ""
+            print(f"{row['version']}  {row['state']:<10}  {row['name']}  {when}")
+        return 0
+
+    done = runner.apply(args.target, dry_run=args.command == "dry-run")
+    if not done:
+        print("✅ Schéma à jour, aucune migration en attente.")
+    elif args.command == "apply":
+        print(f"✅ {len(done)} migration(s) appliquée(s).")
+    if args.command == "apply":
+        # chaque déploiement complète aussi les partitions à venir (sans effet si message
+        # n'est pas partitionnée) : un cron « ensure » manqué ne bloque pas les insertions
+        from Database.partitions import MessagePartitioner
+        created = MessagePartitioner(url).ensure_future()
+        if created:
+            print(f"✅ partitions prêtes ({', '.join(created)}).")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,6 @@
+-- Recherche plein texte : tsvector généré (français + simple).
+-- Sur une base existante, l'ALTER calcule la colonne pour toutes les lignes
+-- (réécriture de la table sous verrou exclusif) : à planifier hors pointe.
+-- L'index GIN est créé sans bloquer les écritures par 0003.
+ALTER TABLE message ADD COLUMN IF NOT EXISTS message_tsv tsvector
+  GENERATED ALWAYS AS (to_tsvector('french', message) || to_tsvector('simple', message)) STORED;
@@ -0,0 +1,15 @@
+-- migrate: no-transaction
+-- Index de performance, construits sans bloquer les écritures (CONCURRENTLY).
+
+-- pagination keyset de l'historique et plages de dates par conversation
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_message_conv_ts_id
+  ON message(id_conversation, "timestamp", id_message);
+
+-- recherche plein texte
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_message_tsv ON message USING GIN (message_tsv);
+
+-- recherches autorisées : collaborations d'un utilisateur (semi-jointure sur message)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_collaboration_user ON collaboration(id_user, id_conversation);
+
+-- recherche de conversations par plage de dates (created_at >= .. AND created_at < ..)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversation_created_at ON conversation(created_at);
@@ -0,0 +1,131 @@
+-- Compteurs dénormalisés par conversation, tenus à jour par triggers sur message
+-- (INSERT, COPY, DELETE, suppressions en cascade, TRUNCATE) : le nombre de messages
+-- et le dernier message se lisent en O(1) au lieu d'un COUNT(*) / tri sur message.
+-- Dérive éventuelle : python -m Database.reconcile_stats (voir MessageDAO.reconcile_conversation_stats).
+CREATE TABLE IF NOT EXISTS conversation_stats (
+  id_conversation     BIGINT PRIMARY KEY
+                       REFERENCES conversation(id_conversation) ON DELETE CASCADE,
+  message_count       BIGINT      NOT NULL DEFAULT 0,
+  agent_message_count BIGINT      NOT NULL DEFAULT 0,
+  last_message_id     BIGINT,
+  last_message_at     TIMESTAMPTZ,
+  updated_at          TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Recalcul exact des compteurs des conversations données (index (id_conversation, "timestamp", id_message))
+CREATE OR REPLACE FUNCTION conversation_stats_recompute(conv_ids BIGINT[]) RETURNS VOID
+LANGUAGE sql AS $$
+  INSERT INTO conversation_stats AS s
+         (id_conversation, message_count, agent_message_count, last_message_id, last_message_at, updated_at)
+  SELECT c.id_conversation, a.n, a.n_agent, l.id_message, l."timestamp", NOW()
+    FROM conversation c
+    CROSS JOIN LATERAL (
+          SELECT COUNT(*) AS n, COUNT(*) FILTER (WHERE m.is_from_agent) AS n_agent
+            FROM message m WHERE m.id_conversation = c.id_conversation) a
+    LEFT JOIN LATERAL (
+          SELECT m.id_message, m."timestamp"
+            FROM message m WHERE m.id_conversation = c.id_conversation
+           ORDER BY m."timestamp" DESC, m.id_message DESC
+           LIMIT 1) l ON TRUE
+   WHERE c.id_conversation = ANY(conv_ids)
+   ORDER BY c.id_conversation
+  ON CONFLICT (id_conversation) DO UPDATE SET
+         message_count       = EXCLUDED.message_count,
+         agent_message_count = EXCLUDED.agent_message_count,
+         last_message_id     = EXCLUDED.last_message_id,
+         last_message_at     = EXCLUDED.last_message_at,
+         updated_at          = NOW();
+$$;
+
+-- INSERT / COPY : un seul upsert par instruction et par conversation (table de transition)
+CREATE OR REPLACE FUNCTION conversation_stats_after_insert() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  INSERT INTO conversation_stats AS s
+         (id_conversation, message_count, agent_message_count, last_message_id, last_message_at, updated_at)
+  SELECT id_conversation,
+         COUNT(*),
+         COUNT(*) FILTER (WHERE is_from_agent),
+         (ARRAY_AGG(id_message ORDER BY "timestamp" DESC, id_message DESC))[1],
+         MAX("timestamp"),
+         NOW()
+    FROM new_rows
+   GROUP BY id_conversation
+   ORDER BY id_conversation  -- ordre de verrouillage stable entre transactions concurrentes
+  ON CONFLICT (id_conversation) DO UPDATE SET
+         message_count       = s.message_count + EXCLUDED.message_count,
+         agent_message_count = s.agent_message_count + EXCLUDED.agent_message_count,
+         last_message_id     = CASE
+             WHEN s.last_message_at IS NULL
+               OR (EXCLUDED.last_message_at, EXCLUDED.last_message_id) > (s.last_message_at, s.last_message_id)
+             THEN EXCLUDED.last_message_id ELSE s.last_message_id END,
+         last_message_at     = GREATEST(s.last_message_at, EXCLUDED.last_message_at),
+         updated_at          = NOW();
+  RETURN NULL;
+END $$;
+
+-- DELETE (y compris en cascade) : décrément, puis relecture du dernier message s'il a été supprimé
+CREATE OR REPLACE FUNCTION conversation_stats_after_delete() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  UPDATE conversation_stats s
+     SET message_count       = s.message_count - d.n,
+         agent_message_count = s.agent_message_count - d.n_agent,
+         updated_at          = NOW()
+    FROM (SELECT id_conversation, COUNT(*) AS n, COUNT(*) FILTER (WHERE is_from_agent) AS n_agent
+            FROM old_rows GROUP BY id_conversation) d
+   WHERE s.id_conversation = d.id_conversation;
+
+  UPDATE conversation_stats s
+     SET (last_message_id, last_message_at) = (
+          SELECT m.id_message, m."timestamp"
+            FROM message m WHERE m.id_conversation = s.id_conversation
+           ORDER BY m."timestamp" DESC, m.id_message DESC
+           LIMIT 1)
+   WHERE s.last_message_id IN (SELECT id_message FROM old_rows);
+  RETURN NULL;
+END $$;
+
+-- UPDATE de la conversation, de l'horodatage ou de l'auteur (rare) : recalcul exact
+CREATE OR REPLACE FUNCTION conversation_stats_after_update() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  PERFORM conversation_stats_recompute(ARRAY[OLD.id_conversation, NEW.id_conversation]);
+  RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION conversation_stats_after_truncate() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  UPDATE conversation_stats
+     SET message_count = 0, agent_message_count = 0,
+         last_message_id = NULL, last_message_at = NULL, updated_at = NOW();
+  RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_message_stats_insert ON message;
+CREATE TRIGGER trg_message_stats_insert
+  AFTER INSERT ON message REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION conversation_stats_after_insert();
+
+DROP TRIGGER IF EXISTS trg_message_stats_delete ON message;
+CREATE TRIGGER trg_message_stats_delete
+  AFTER DELETE ON message REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION conversation_stats_after_delete();
+
+DROP TRIGGER IF EXISTS trg_message_stats_update ON message;
+CREATE TRIGGER trg_message_stats_update
+  AFTER UPDATE OF id_conversation, "timestamp", is_from_agent ON message
+  FOR EACH ROW
+  WHEN (OLD.id_conversation IS DISTINCT FROM NEW.id_conversation
+        OR OLD."timestamp" IS DISTINCT FROM NEW."timestamp"
+        OR OLD.is_from_agent IS DISTINCT FROM NEW.is_from_agent)
+  EXECUTE FUNCTION conversation_stats_after_update();
+
+DROP TRIGGER IF EXISTS trg_message_stats_truncate ON message;
+CREATE TRIGGER trg_message_stats_truncate
+  AFTER TRUNCATE ON message
+  FOR EACH STATEMENT EXECUTE FUNCTION conversation_stats_after_truncate();
+
+-- Initialisation à partir des messages existants
+SELECT conversation_stats_recompute(ARRAY(SELECT DISTINCT id_conversation FROM message));
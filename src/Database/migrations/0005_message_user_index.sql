@@ -0,0 +1,6 @@
+-- migrate: no-transaction
+-- Statistiques par utilisateur (COUNT par id_user, COUNT(DISTINCT id_conversation),
+-- messages d'un utilisateur dans une conversation, sessions par LAG("timestamp")).
+-- Sur message partitionnée, l'index est construit partition par partition puis rattaché.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_message_user_conv_ts
+  ON message(id_user, id_conversation, "timestamp");
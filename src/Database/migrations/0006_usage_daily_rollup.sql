@@ -0,0 +1,30 @@
+-- Agrégats d'usage par jour, utilisateur et conversation, pour les tableaux de bord :
+-- une requête sur une période lit quelques lignes par jour au lieu de rebalayer message.
+-- Tenue à jour par python -m Database.refresh_rollups (voir DAO/UsageRollupDAO.py) :
+-- seuls les messages d'id supérieur au point de reprise (rollup_watermark) sont traités.
+-- Les jours sont ceux du fuseau APP_TIMEZONE ; après un changement de fuseau, reconstruire (rebuild).
+CREATE TABLE IF NOT EXISTS usage_daily (
+  id_user             BIGINT      NOT NULL,  -- 0 : auteur supprimé (message.id_user NULL)
+  day                 DATE        NOT NULL,
+  id_conversation     BIGINT      NOT NULL
+                       REFERENCES conversation(id_conversation) ON DELETE CASCADE,
+  message_count       INTEGER     NOT NULL DEFAULT 0,
+  agent_message_count INTEGER     NOT NULL DEFAULT 0,
+  human_message_count INTEGER     NOT NULL DEFAULT 0,
+  char_count          BIGINT      NOT NULL DEFAULT 0,
+  session_time        INTERVAL    NOT NULL DEFAULT INTERVAL '0',
+  refreshed_at        TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (id_user, day, id_conversation)
+);
+
+CREATE INDEX IF NOT EXISTS idx_usage_daily_conversation_day ON usage_daily(id_conversation, day);
+CREATE INDEX IF NOT EXISTS idx_usage_daily_day ON usage_daily(day);
+
+-- Point de reprise des agrégats incrémentaux : dernier id_message traité
+CREATE TABLE IF NOT EXISTS rollup_watermark (
+  name         VARCHAR(64) PRIMARY KEY,
+  last_id      BIGINT      NOT NULL DEFAULT 0,
+  refreshed_at TIMESTAMPTZ
+);
+
+INSERT INTO rollup_watermark (name) VALUES ('usage_daily') ON CONFLICT (name) DO NOTHING;
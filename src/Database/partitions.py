@@ -0,0 +1,460 @@
+# src/Database/partitions.py
+"""
+Partitionnement mensuel (optionnel) de la table message, par plage sur "timestamp".
+
+Conversion sans recopie des données : la table existante devient la partition
+``message_legacy`` (toutes les dates avant le mois prochain) d'une nouvelle table
+``message`` partitionnée ; les mois suivants ont chacun leur partition
+``message_yAAAAmMM`` (bornes en UTC), créées à l'avance. La partition par défaut
+``message_default`` reçoit les lignes au-delà de la dernière borne (mois non créé
+à temps) : les insertions n'échouent pas, ``ensure`` et ``status`` le signalent.
+
+Usage (depuis src/) :
+    python -m Database.partitions status
+    python -m Database.partitions convert [--months-ahead 3]
+    python -m Database.partitions ensure [--months-ahead 3]      # cron mensuel (aussi après migrate apply)
+    python -m Database.partitions detach message_y2025m01 [--drop]
+    python -m Database.partitions detach --older-than 12 [--drop]
+
+Contraintes du mode partitionné :
+  - la clé primaire devient (id_message, "timestamp") : la clé étrangère
+    feedback.id_message -> message est remplacée par des triggers
+    (vérification à l'insertion, suppression en cascade) ;
+  - CREATE INDEX CONCURRENTLY n'existe pas sur une table partitionnée : le
+    runner de migrations (Database/migrate.py) construit alors l'index partition
+    par partition puis le rattache au parent ;
+  - une partition détachée sort des compteurs conversation_stats (recalculés) ;
+    les feedbacks de ses messages sont conservés tels quels.
+"""
+import argparse
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import Callable, List, Optional, Tuple
+
+import psycopg2
+from psycopg2 import sql
+
+LEGACY_PARTITION = "message_legacy"
+DEFAULT_PARTITION = "message_default"
+ARCHIVE_SCHEMA = "archive"
+_MONTHLY = re.compile(r"^message_y(\d{4})m(\d{2})$")
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+# Index de message : recréés sur la table partitionnée sous le même nom ; ceux
+# de message_legacy, équivalents, lui sont rattachés sans reconstruction.
+MESSAGE_INDEXES = [
+    ("idx_message_conversation", 'message(id_conversation)'),
+    ("idx_message_user", 'message(id_user)'),
+    ("idx_message_timestamp", 'message("timestamp")'),
+    ("idx_message_conv_ts_id", 'message(id_conversation, "timestamp", id_message)'),
+    ("idx_message_tsv", "message USING GIN (message_tsv)"),
+    ("idx_message_user_conv_ts", 'message(id_user, id_conversation, "timestamp")'),
+]
+
+PARTITIONED_TABLE_SQL = """
+CREATE TABLE message (
+  id_message      BIGINT      NOT NULL DEFAULT nextval('message_id_message_seq'),
+  id_conversation BIGINT      NOT NULL
+                   REFERENCES conversation(id_conversation) ON DELETE CASCADE,
+  id_user         BIGINT
+                   REFERENCES users(id_user) ON DELETE SET NULL,
+  "timestamp"     TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  message         TEXT        NOT NULL,
+  is_from_agent   BOOLEAN     NOT NULL DEFAULT FALSE,
+  message_tsv     tsvector
+                   GENERATED ALWAYS AS (to_tsvector('french', message) || to_tsvector('simple', message)) STORED,
+  CONSTRAINT message_pkey PRIMARY KEY (id_message, "timestamp")
+) PARTITION BY RANGE ("timestamp");
+ALTER SEQUENCE message_id_message_seq OWNED BY message.id_message;
+"""
+
+# Triggers conversation_stats (migration 0004) : déplacés de l'ancienne table vers la nouvelle
+STATS_TRIGGERS_SQL = """
+CREATE TRIGGER trg_message_stats_insert
+  AFTER INSERT ON message REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION conversation_stats_after_insert();
+CREATE TRIGGER trg_message_stats_delete
+  AFTER DELETE ON message REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION conversation_stats_after_delete();
+CREATE TRIGGER trg_message_stats_update
+  AFTER UPDATE OF id_conversation, "timestamp", is_from_agent ON message
+  FOR EACH ROW
+  WHEN (OLD.id_conversation IS DISTINCT FROM NEW.id_conversation
+        OR OLD."timestamp" IS DISTINCT FROM NEW."timestamp"
+        OR OLD.is_from_agent IS DISTINCT FROM NEW.is_from_agent)
+  EXECUTE FUNCTION conversation_stats_after_update();
+CREATE TRIGGER trg_message_stats_truncate
+  AFTER TRUNCATE ON message
+  FOR EACH STATEMENT EXECUTE FUNCTION conversation_stats_after_truncate();
+"""
+
+# Remplace la clé étrangère feedback.id_message, impossible vers une table
+# partitionnée dont la clé primaire inclut "timestamp"
+FEEDBACK_TRIGGERS_SQL = """
+CREATE OR REPLACE FUNCTION feedback_check_message() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM message WHERE id_message = NEW.id_message) THEN
+    RAISE EXCEPTION 'message % introuvable', NEW.id_message USING ERRCODE = 'foreign_key_violation';
+  END IF;
+  RETURN NEW;
+END $$;
+CREATE OR REPLACE FUNCTION message_delete_feedback() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  DELETE FROM feedback WHERE id_message IN (SELECT id_message FROM old_rows);
+  RETURN NULL;
+END $$;
+DROP TRIGGER IF EXISTS trg_feedback_check_message ON feedback;
+CREATE TRIGGER trg_feedback_check_message
+  BEFORE INSERT OR UPDATE OF id_message ON feedback
+  FOR EACH ROW EXECUTE FUNCTION feedback_check_message();
+CREATE TRIGGER trg_message_delete_feedback
+  AFTER DELETE ON message REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION message_delete_feedback();
+"""
+
+
+def month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, n: int) -> date:
+    y, m = divmod(d.month - 1 + n, 12)
+    return date(d.year + y, m + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"message_y{month.year:04d}m{month.month:02d}"
+
+
+def _utc(d: date) -> datetime:
+    return datetime(d.year, d.month, d.day, tzinfo=timezone.utc)
+
+
+class MessagePartitioner:
+    """Conversion, extension et archivage des partitions de message."""
+
+    def __init__(
+        self,
+        db_url: str,
+        *,
+        connect: Callable[[str], "psycopg2.extensions.connection"] = psycopg2.connect,
+        lock_timeout: Optional[str] = None,
+        today: Optional[Callable[[], date]] = None,
+    ):
+        self.db_url = db_url
+        self._connect = connect
+        self.lock_timeout = lock_timeout or os.getenv("DB_MIGRATION_LOCK_TIMEOUT", "5s")
+        self._today = today or (lambda: datetime.now(timezone.utc).date())
+
+    def _open(self):
+        conn = self._connect(self.db_url)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("SET lock_timeout = %s", (self.lock_timeout,))
+            cur.execute("SET statement_timeout = 0")
+            cur.execute("SET TIME ZONE 'UTC'")  # bornes des partitions lues en UTC
+        return conn
+
+    # ------------------------------------------------------------------ #
+    # État                                                               #
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _is_partitioned(cur) -> bool:
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = 'message'::regclass;")
+        row = cur.fetchone()
+        return bool(row) and row[0] == "p"
+
+    @staticmethod
+    def _has_default_partition(cur) -> bool:
+        cur.execute("SELECT partdefid <> 0 FROM pg_partitioned_table WHERE partrelid = 'message'::regclass;")
+        row = cur.fetchone()
+        return bool(row) and bool(row[0])
+
+    @staticmethod
+    def _partitions(cur) -> List[Tuple[str, Optional[datetime]]]:
+        """Partitions attachées : (nom, borne haute exclusive), dans l'ordre des bornes."""
+        cur.execute(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+              FROM pg_inherits i
+              JOIN pg_class c ON c.oid = i.inhrelid
+             WHERE i.inhparent = 'message'::regclass;
+            """
+        )
+        parts = []
+        for name, bound in cur.fetchall():
+            match = _UPPER_BOUND.search(bound or "")
+            parts.append((name, datetime.fromisoformat(match.group(1)) if match else None))
+        return sorted(parts, key=lambda p: p[1] or datetime.max.replace(tzinfo=timezone.utc))
+
+    def status(self) -> List[Tuple[str, Optional[datetime]]]:
+        conn = self._open()
+        try:
+            with conn.cursor() as cur:
+                return self._partitions(cur) if self._is_partitioned(cur) else []
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------ #
+    # Conversion                                                         #
+    # ------------------------------------------------------------------ #
+    def convert(self, months_ahead: int = 3) -> bool:
+        """
+        Passe message en table partitionnée (False si c'est déjà le cas).
+
+        1. hors transaction, sans bloquer les écritures : contrainte CHECK
+           "timestamp" < mois prochain (validée à part) et index unique
+           (id_message, "timestamp") construit en CONCURRENTLY ;
+        2. en une transaction courte : cet index devient la clé primaire,
+           renommage en message_legacy, création de la table partitionnée,
+           rattachement de message_legacy (la contrainte CHECK évite de la
+           parcourir, ses index sont réutilisés), triggers, mois à venir.
+        """
+        boundary = add_months(month_start(self._today()), 1)
+        conn = self._open()
+        try:
+            with conn.cursor() as cur:
+                if self._is_partitioned(cur):
+                    return False
+                cur.execute(
+                    "ALTER TABLE message DROP CONSTRAINT IF EXISTS message_legacy_range;"
+                    'ALTER TABLE message ADD CONSTRAINT message_legacy_range CHECK ("timestamp" < %s) NOT VALID;',
+                    (_utc(boundary),),
+                )
+                cur.execute("ALTER TABLE message VALIDATE CONSTRAINT message_legacy_range;")
+                cur.execute(
+                    "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS message_legacy_id_ts "
+                    'ON message (id_message, "timestamp");'
+                )
+
+            conn.autocommit = False
+            try:
+                with conn.cursor() as cur:
+                    self._swap(cur, boundary)
+                    self._create_months(cur, boundary, add_months(boundary, months_ahead))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.autocommit = True
+            return True
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _swap(cur, boundary: date) -> None:
+        cur.execute("LOCK TABLE message IN ACCESS EXCLUSIVE MODE;")
+        cur.execute("ALTER TABLE feedback DROP CONSTRAINT IF EXISTS feedback_id_message_fkey;")
+        for trigger in ("insert", "delete", "update", "truncate"):
+            cur.execute(f"DROP TRIGGER IF EXISTS trg_message_stats_{trigger} ON message;")
+        # la clé primaire de la partition doit être celle du parent : (id_message, "timestamp")
+        cur.execute("ALTER TABLE message DROP CONSTRAINT message_pkey;")
+        cur.execute(
+            f"ALTER TABLE message ADD CONSTRAINT {LEGACY_PARTITION}_pkey "
+            "PRIMARY KEY USING INDEX message_legacy_id_ts;"
+        )
+        cur.execute(f"ALTER TABLE message RENAME TO {LEGACY_PARTITION};")
+        existing = []
+        for name, target in MESSAGE_INDEXES:
+            legacy_name = f"{LEGACY_PARTITION}_{name[len('idx_message_'):]}_idx"
+            cur.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {legacy_name};")
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (legacy_name,))
+            row = cur.fetchone()
+            if row and row[0]:
+                existing.append((name, target))
+        cur.execute(PARTITIONED_TABLE_SQL)
+        cur.execute(
+            f"ALTER TABLE message ATTACH PARTITION {LEGACY_PARTITION} FOR VALUES FROM (MINVALUE) TO (%s);",
+            (_utc(boundary),),
+        )
+        cur.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF message DEFAULT;")
+        # Seuls les index déjà présents sur l'ancienne table sont recréés ici (rattachement,
+        # sans construction sous le verrou) ; ceux d'une migration pas encore appliquée
+        # seront construits partition par partition par le runner de migrations.
+        for name, target in existing:
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target};")
+        cur.execute(STATS_TRIGGERS_SQL)
+        cur.execute(FEEDBACK_TRIGGERS_SQL)
+
+    @staticmethod
+    def _create_months(cur, start: date, end: date, *, check_default: bool = False) -> List[str]:
+        """
+        Crée les partitions mensuelles de [start, end[ (bornes en UTC). Avec
+        ``check_default``, un mois dont des lignes sont déjà dans la partition par
+        défaut est sauté (sa création échouerait) : voir ``default_rows``.
+        """
+        created = []
+        month = start
+        while month < end:
+            name = partition_name(month)
+            if check_default:
+                cur.execute(
+                    f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE "timestamp" >= %s AND "timestamp" < %s);',
+                    (_utc(month), _utc(add_months(month, 1))),
+                )
+                row = cur.fetchone()
+                if row and row[0]:
+                    print(f"  ⚠️ {name} non créée : des lignes de ce mois sont dans {DEFAULT_PARTITION}")
+                    month = add_months(month, 1)
+                    continue
+            cur.execute(
+                sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF message FOR VALUES FROM (%s) TO (%s);").format(
+                    sql.Identifier(name)
+                ),
+                (_utc(month), _utc(add_months(month, 1))),
+            )
+            created.append(name)
+            month = add_months(month, 1)
+        return created
+
+    # ------------------------------------------------------------------ #
+    # Partitions à venir                                                 #
+    # ------------------------------------------------------------------ #
+    def ensure_future(self, months_ahead: int = 3) -> List[str]:
+        """
+        Crée les partitions manquantes jusqu'à ``months_ahead`` mois après le mois
+        courant (à planifier chaque mois ; appelé aussi par ``migrate apply``), et la
+        partition par défaut si elle manque. Sans effet si message n'est pas partitionnée.
+        """
+        conn = self._open()
+        try:
+            with conn.cursor() as cur:
+                if not self._is_partitioned(cur):
+                    return []
+                cur.execute(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF message DEFAULT;")
+                uppers = [upper for _, upper in self._partitions(cur) if upper is not None]
+                start = uppers[-1].date() if uppers else month_start(self._today())
+                end = add_months(month_start(self._today()), months_ahead + 1)
+                return self._create_months(cur, start, end, check_default=True)
+        finally:
+            conn.close()
+
+    def default_rows(self) -> int:
+        """
+        Nombre de lignes dans la partition par défaut : non nul, des mois n'ont pas
+        été créés à temps (cron ``ensure`` manqué) et ``ensure`` saute ces mois. À
+        traiter à la main : détacher message_default, créer la partition du mois,
+        y déplacer les lignes, rattacher message_default (DEFAULT).
+        """
+        conn = self._open()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (DEFAULT_PARTITION,))
+                row = cur.fetchone()
+                if not (row and row[0]):
+                    return 0
+                cur.execute(f"SELECT COUNT(*) FROM {DEFAULT_PARTITION};")
+                return int(cur.fetchone()[0])
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------ #
+    # Archivage                                                          #
+    # ------------------------------------------------------------------ #
+    def cold_partitions(self, older_than_months: int) -> List[str]:
+        """Partitions mensuelles entièrement antérieures à ``older_than_months`` mois."""
+        limit = add_months(month_start(self._today()), -older_than_months)
+        names = []
+        for name, _ in self.status():
+            match = _MONTHLY.match(name)
+            if match and date(int(match.group(1)), int(match.group(2)), 1) < limit:
+                names.append(name)
+        return names
+
+    def detach(self, name: str, *, drop: bool = False) -> None:
+        """
+        Détache une partition mensuelle, recalcule les compteurs des conversations
+        concernées, puis la déplace dans le schéma archive (ou la supprime).
+
+        DETACH ... CONCURRENTLY ne bloque pas les lectures/écritures, mais
+        PostgreSQL le refuse quand une partition par défaut existe : le DETACH
+        est alors simple (verrou exclusif bref sur message, sans parcours de
+        données), borné par ``lock_timeout`` pour ne pas faire attendre le trafic.
+        """
+        if not _MONTHLY.match(name):
+            raise ValueError(f"Partition mensuelle invalide : {name}")
+        table = sql.Identifier(name)
+        conn = self._open()
+        try:
+            with conn.cursor() as cur:
+                if self._has_default_partition(cur):
+                    cur.execute(sql.SQL("ALTER TABLE message DETACH PARTITION {};").format(table))
+                else:
+                    cur.execute(sql.SQL("ALTER TABLE message DETACH PARTITION {} CONCURRENTLY;").format(table))
+                cur.execute(
+                    sql.SQL(
+                        "SELECT conversation_stats_recompute(ARRAY(SELECT DISTINCT id_conversation FROM {}));"
+                    ).format(table)
+                )
+                if drop:
+                    cur.execute(sql.SQL("DROP TABLE {};").format(table))
+                else:
+                    schema = sql.Identifier(ARCHIVE_SCHEMA)
+                    cur.execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {};").format(schema))
+                    cur.execute(sql.SQL("ALTER TABLE {} SET SCHEMA {};").format(table, schema))
+        finally:
+            conn.close()
+
+
+# ---------------------------------------------------------------------- #
+# CLI                                                                    #
+# ---------------------------------------------------------------------- #
+def _report_default_rows(partitioner: MessagePartitioner) -> int:
+    """Alerte (code de sortie 1, pour le cron) si la partition par défaut contient des lignes."""
+    rows = partitioner.default_rows()
+    if not rows:
+        return 0
+    print(f"⚠️ {rows} message(s) dans {DEFAULT_PARTITION} : partition(s) mensuelle(s) manquante(s).")
+    return 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m Database.partitions", description="Partitions de message")
+    parser.add_argument("command", choices=("status", "convert", "ensure", "detach"))
+    parser.add_argument("partition", nargs="?", help="partition à détacher (message_yAAAAmMM)")
+    parser.add_argument("--url", help="URL PostgreSQL (défaut : DATABASE_URL)")
+    parser.add_argument("--test", action="store_true", help="utiliser DATABASE_URL_TEST")
+    parser.add_argument("--months-ahead", type=int, default=3, help="mois créés à l'avance")
+    parser.add_argument("--older-than", type=int, help="détacher les partitions plus vieilles que N mois")
+    parser.add_argument("--drop", action="store_true", help="supprimer au lieu d'archiver")
+    args = parser.parse_args(argv)
+
+    url = args.url
+    if not url:
+        from Database.settings import DATABASE_URL, DATABASE_URL_TEST
+        url = DATABASE_URL_TEST if args.test else DATABASE_URL
+    partitioner = MessagePartitioner(url)
+
+    if args.command == "status":
+        parts = partitioner.status()
+        if not parts:
+            print("message n'est pas partitionnée.")
+        for name, upper in parts:
+            print(f"{name:<24} < {upper.isoformat() if upper else '∞'}")
+        return _report_default_rows(partitioner) if parts else 0
+    elif args.command == "convert":
+        done = partitioner.convert(args.months_ahead)
+        print("✅ message partitionnée par mois." if done else "message est déjà partitionnée.")
+    elif args.command == "ensure":
+        created = partitioner.ensure_future(args.months_ahead)
+        print(f"✅ partitions prêtes ({', '.join(created) or 'aucune à créer'}).")
+        return _report_default_rows(partitioner)
+    else:
+        if args.older_than is not None:
+            names = partitioner.cold_partitions(args.older_than)
+        elif args.partition:
+            names = [args.partition]
+        else:
+            parser.error("detach : préciser une partition ou --older-than")
+        for name in names:
+            partitioner.detach(name, drop=args.drop)
+            print(f"✅ {name} {'supprimée' if args.drop else f'archivée dans {ARCHIVE_SCHEMA}'}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
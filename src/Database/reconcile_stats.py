@@ -0,0 +1,26 @@
+# src/Database/reconcile_stats.py
+"""
+Réparation des compteurs dénormalisés conversation_stats (migration 0004).
+
+À planifier (cron) en heures creuses, ou à lancer après une intervention manuelle
+sur la table message avec les triggers désactivés :
+    python -m Database.reconcile_stats [--batch-size 1000]
+"""
+import argparse
+from typing import List, Optional
+
+from DAO.MessageDAO import MessageDAO
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m Database.reconcile_stats", description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=1000, help="conversations par transaction")
+    args = parser.parse_args(argv)
+
+    repaired = MessageDAO().reconcile_conversation_stats(batch_size=args.batch_size)
+    print(f"✅ conversation_stats vérifiée : {repaired} conversation(s) corrigée(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,49 @@
+# src/Database/refresh_rollups.py
+"""
+Mise à jour des agrégats d'usage quotidiens usage_daily (migration 0006).
+
+À planifier (cron) : rafraîchissement incrémental fréquent, reconstruction
+nocturne des derniers jours (modifications / suppressions de messages) :
+    python -m Database.refresh_rollups refresh [--batch-size 50000]
+    python -m Database.refresh_rollups rebuild [--days 2]
+    python -m Database.refresh_rollups rebuild --start 2025-01-01 --end 2025-03-31
+"""
+import argparse
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from DAO.UsageRollupDAO import UsageRollupDAO
+from Utils.date_range import app_timezone
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m Database.refresh_rollups", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--idle-minutes", type=int, default=10, help="seuil d'inactivité d'une session")
+    parser.add_argument("--lookback-ids", type=int, default=UsageRollupDAO.DEFAULT_LOOKBACK_IDS,
+                        help="fenêtre de sécurité relue sous le point de reprise (insertions validées en retard)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    refresh = sub.add_parser("refresh", help="intègre les messages postérieurs au point de reprise")
+    refresh.add_argument("--batch-size", type=int, default=50000, help="messages par transaction")
+    rebuild = sub.add_parser("rebuild", help="recalcule entièrement des jours")
+    rebuild.add_argument("--days", type=int, default=2, help="nombre de jours jusqu'à aujourd'hui inclus")
+    rebuild.add_argument("--start", type=date.fromisoformat)
+    rebuild.add_argument("--end", type=date.fromisoformat)
+    args = parser.parse_args(argv)
+
+    dao = UsageRollupDAO(idle_threshold=timedelta(minutes=args.idle_minutes), lookback_ids=args.lookback_ids)
+    if args.command == "refresh":
+        n = dao.refresh(batch_size=args.batch_size)
+        print(f"✅ usage_daily : {n} nouveau(x) message(s) intégré(s).")
+        return 0
+
+    today = datetime.now(app_timezone()).date()
+    end = args.end or today
+    start = args.start or end - timedelta(days=args.days - 1)
+    n = dao.rebuild(start, end)
+    print(f"✅ usage_daily : {n} jour(s) reconstruit(s) du {start} au {end}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -21,6 +21,8 @@ class Message:
         Indique si le message provient de l’agent (True) ou d’un utilisateur (False).
     """
 
+    __slots__ = ("id_message", "id_conversation", "id_user", "datetime", "message", "is_from_agent")
+
     def __init__(
         self,
         id_message=None,  # peut être None
@@ -81,6 +83,22 @@ class Message:
         author = "Agent" if self.is_from_agent else "User"
         return f"[{self.datetime}] {author}({self.id_user}) : {self.message}"
 
+    @classmethod
+    def from_row(cls, id_message, id_conversation, id_user, datetime, message, is_from_agent) -> "Message":
+        """
+        Construit un Message depuis une ligne de la table message, sans les
+        vérifications de __init__ : réservé aux données venant de la base,
+        dont les types sont déjà garantis par le schéma (lecture en masse).
+        """
+        obj = cls.__new__(cls)
+        obj.id_message = id_message
+        obj.id_conversation = id_conversation
+        obj.id_user = id_user if id_user is not None else -1  # comme __init__ (ON DELETE SET NULL)
+        obj.datetime = datetime
+        obj.message = message
+        obj.is_from_agent = is_from_agent
+        return obj
+
     @classmethod
     def from_dict(cls, data: dict) -> "Message":
         """Crée une instance de Message depuis un dictionnaire."""
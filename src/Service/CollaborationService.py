@@ -3,6 +3,7 @@ from typing import List
 from DAO.CollaborationDAO import CollaborationDAO
 from DAO.UserDAO import UserDAO
 from DAO.ConversationDAO import ConversationDAO
+from DAO.DBConnector import unit_of_work
 from ObjetMetier.Collaboration import Collaboration
 from Utils.Singleton import Singleton
 from Utils.log_decorator import log
@@ -47,29 +48,33 @@ class CollaborationService(metaclass=Singleton):
 
     @log
     def create_collab(self, user_id: int, conversation_id: int, role: str) -> bool:
-        """Crée une nouvelle collaboration (vérifie l’existence du user & de la conversation)."""
+        """
+        Crée une nouvelle collaboration (vérifie l’existence du user & de la conversation).
+        Vérifications et insertion partagent une connexion (unit_of_work).
+        """
         try:
-            # Vérifier que l’utilisateur et la conversation existent
-            if not self.user_dao.read(user_id):
-                raise ValueError(f"Utilisateur {user_id} introuvable.")
-            if not self.conversation_dao.read(conversation_id):
-                raise ValueError(f"Conversation {conversation_id} introuvable.")
-
-            # Vérifier que le rôle est valide
-            if role.lower() not in {"admin", "writer", "viewer", "banni"}:
-                raise ValueError("Rôle invalide.")
-
-            # Vérifier qu’il n’existe pas déjà une collaboration pour cette paire
-            existing = self.collab_dao.find_by_conversation_and_user(conversation_id, user_id)
-            if existing:
-                raise ValueError("Une collaboration existe déjà pour cet utilisateur dans cette conversation.")
-
-            collab = Collaboration(
-                id_conversation=conversation_id,
-                id_user=user_id,
-                role=role
-            )
-            return self.collab_dao.create(collab)
+            with unit_of_work():
+                # Vérifier que l’utilisateur et la conversation existent
+                if not self.user_dao.read(user_id):
+                    raise ValueError(f"Utilisateur {user_id} introuvable.")
+                if not self.conversation_dao.read(conversation_id):
+                    raise ValueError(f"Conversation {conversation_id} introuvable.")
+
+                # Vérifier que le rôle est valide
+                if role.lower() not in {"admin", "writer", "viewer", "banni"}:
+                    raise ValueError("Rôle invalide.")
+
+                # Vérifier qu’il n’existe pas déjà une collaboration pour cette paire
+                existing = self.collab_dao.find_by_conversation_and_user(conversation_id, user_id)
+                if existing:
+                    raise ValueError("Une collaboration existe déjà pour cet utilisateur dans cette conversation.")
+
+                collab = Collaboration(
+                    id_conversation=conversation_id,
+                    id_user=user_id,
+                    role=role
+                )
+                return self.collab_dao.create(collab)
         except Exception as e:
             logging.error(f"Erreur dans create_collab : {e}")
             return False
@@ -0,0 +1,92 @@
+from typing import Dict, List, Optional, Tuple
+import datetime
+
+from Utils.columnar import np, read_message_columns, require_numpy
+
+
+class ColumnarStatistics:
+    """
+    Statistiques de StatisticsService calculées avec NumPy sur un export en
+    colonnes (Utils.columnar) : aucune requête, aucun objet Message ; tout le
+    jeu de données tient en quelques tableaux et se traite en opérations vectorisées.
+
+    Colonnes attendues : id_conversation, id_user (0 = auteur supprimé),
+    timestamp (microsecondes, int64), message_length.
+
+        stats = ColumnarStatistics.from_file("messages.parquet")
+        stats.top_active_users(10)
+    """
+
+    def __init__(
+        self,
+        columns: Dict[str, "np.ndarray"],
+        idle_threshold: datetime.timedelta = datetime.timedelta(minutes=10),
+    ):
+        require_numpy()
+        self.id_conversation = np.asarray(columns["id_conversation"], dtype=np.int64)
+        self.id_user = np.asarray(columns["id_user"], dtype=np.int64)
+        self.timestamp = np.asarray(columns["timestamp"], dtype=np.int64)
+        self.message_length = np.asarray(columns["message_length"], dtype=np.int64)
+        self.idle_threshold = idle_threshold
+        self._order: Optional["np.ndarray"] = None
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "ColumnarStatistics":
+        columns = read_message_columns(path, ("id_conversation", "id_user", "timestamp", "message_length"))
+        return cls(columns, **kwargs)
+
+    # ------------------------------------------------------------
+    #                       COMPTAGES
+    # ------------------------------------------------------------
+    def nb_messages(self, user_id: int) -> int:
+        return int(np.count_nonzero(self.id_user == user_id))
+
+    def nb_conv(self, user_id: int) -> int:
+        return int(np.unique(self.id_conversation[self.id_user == user_id]).size)
+
+    def nb_message_conv(self, conversation_id: int) -> int:
+        return int(np.count_nonzero(self.id_conversation == conversation_id))
+
+    def top_active_users(self, limit: int = 10) -> List[Tuple[int, int]]:
+        if limit <= 0:
+            raise ValueError("limit doit être > 0")
+        users, counts = np.unique(self.id_user[self.id_user != 0], return_counts=True)
+        order = np.lexsort((users, -counts))[:limit]  # nombre décroissant, puis id croissant
+        return [(int(users[i]), int(counts[i])) for i in order]
+
+    def average_message_length(self) -> float:
+        if self.message_length.size == 0:
+            return 0.0
+        return float(self.message_length.mean())
+
+    # ------------------------------------------------------------
+    #                    TEMPS PASSÉ (SESSIONS)
+    # ------------------------------------------------------------
+    def _session_gaps(self) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        (utilisateur, écart en µs) des écarts comptés dans une session : même
+        règle que StatisticsService._compute_sessions_duration, par
+        (utilisateur, conversation), écart <= seuil d'inactivité.
+        """
+        if self._order is None:
+            self._order = np.lexsort((self.timestamp, self.id_conversation, self.id_user))
+        user = self.id_user[self._order]
+        conv = self.id_conversation[self._order]
+        ts = self.timestamp[self._order]
+        gaps = np.diff(ts)
+        idle_us = self.idle_threshold // datetime.timedelta(microseconds=1)
+        same = (user[1:] == user[:-1]) & (conv[1:] == conv[:-1]) & (gaps <= idle_us)
+        return user[1:][same], gaps[same]
+
+    def temps_passe_par_user(self) -> Dict[int, datetime.timedelta]:
+        """Temps passé de chaque utilisateur, en une passe sur tout le jeu de données."""
+        users, gaps = self._session_gaps()
+        if users.size == 0:
+            return {}
+        ids, inverse = np.unique(users, return_inverse=True)
+        totals = np.bincount(inverse, weights=gaps)
+        return {int(u): datetime.timedelta(microseconds=int(t)) for u, t in zip(ids, totals)}
+
+    def temps_passe(self, user_id: int) -> datetime.timedelta:
+        users, gaps = self._session_gaps()
+        return datetime.timedelta(microseconds=int(gaps[users == user_id].sum()))
@@ -7,11 +7,13 @@ import secrets
 try:  # pragma: no cover
     from ObjetMetier.Conversation import Conversation
     from DAO.ConversationDAO import ConversationDAO
+    from DAO.DBConnector import unit_of_work
     from Service.UserService import UserService
     from Service.MessageService import MessageService
 except ImportError:  # pragma: no cover
     from ObjetMetier.Conversation import Conversation  # pragma: no cover
     from DAO.ConversationDAO import ConversationDAO  # pragma: no cover
+    from DAO.DBConnector import unit_of_work  # pragma: no cover
     from Service.UserService import UserService  # pragma: no cover
     from Service.MessageService import MessageService  # pragma: no cover
 
@@ -40,43 +42,50 @@ class ConversationService:
     def create_conversation(
         self, title: str, user_id: int, setting_conversation: str = "Tu es un assistant utile."
     ) -> Conversation:
-        """Crée une nouvelle conversation et ajoute le créateur comme admin."""
-        # Vérifier que l'utilisateur existe
-        if self.user_service:
-            user = self.user_service.get_user_by_id(user_id)
-            if not user:
-                raise ValueError("Utilisateur introuvable")
-
-        # Valider le titre
-        if not title or not title.strip():
-            raise ValueError("Titre invalide")
-        title = title.strip()
-
-        # Générer les tokens d'accès
-        token_viewer = secrets.token_urlsafe(32)
-        token_writter = secrets.token_urlsafe(32)
-
-        # Créer l'objet conversation
-        conversation = Conversation(
-            id_conversation=None,  # Sera généré par la BD
-            titre=title,
-            created_at=datetime.now(),
-            setting_conversation=setting_conversation,
-            token_viewer=token_viewer,
-            token_writter=token_writter,
-            is_active=True,
-        )
+        """
+        Crée une nouvelle conversation et ajoute le créateur comme admin.
+        Lectures, création et ajout du créateur partagent une seule connexion
+        et un seul COMMIT (unit_of_work) : tout ou rien.
+        """
+        with unit_of_work():
+            # Vérifier que l'utilisateur existe
+            if self.user_service:
+                user = self.user_service.get_user_by_id(user_id)
+                if not user:
+                    raise ValueError("Utilisateur introuvable")
+
+            # Valider le titre
+            if not title or not title.strip():
+                raise ValueError("Titre invalide")
+            title = title.strip()
+
+            # Générer les tokens d'accès
+            token_viewer = secrets.token_urlsafe(32)
+            token_writter = secrets.token_urlsafe(32)
+
+            # Créer l'objet conversation
+            conversation = Conversation(
+                id_conversation=None,  # Sera généré par la BD
+                titre=title,
+                created_at=datetime.now(),
+                setting_conversation=setting_conversation,
+                token_viewer=token_viewer,
+                token_writter=token_writter,
+                is_active=True,
+            )
 
-        # Persister et retourner
-        conversation = self.conversation_dao.create(conversation, user_id)
+            # Persister et retourner
+            conversation = self.conversation_dao.create(conversation, user_id)
 
-        # Ajouter le créateur comme admin
-        if self.collaboration_service:
-            self.collaboration_service.create_collab(
-                user_id, conversation.id_conversation, "admin"
-            )
+            # Ajouter le créateur comme admin
+            if self.collaboration_service:
+                if not self.collaboration_service.create_collab(
+                    user_id, conversation.id_conversation, "admin"
+                ):
+                    # sortie en exception : la création de la conversation est annulée
+                    raise ValueError("Impossible d'ajouter le créateur comme admin")
 
-        return conversation
+            return conversation
 
     def get_conversation_by_id(
         self, conversation_id: int, user_id: int
@@ -1,5 +1,8 @@
-from typing import List, Optional, Dict, Set, TYPE_CHECKING
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union, TYPE_CHECKING
 import datetime
+import io
+import json
+import zlib
 
 # --- Entités métiers (légères) ---
 try:
@@ -11,6 +14,11 @@ except Exception:
     from ObjetMetier.Conversation import Conversation  # type: ignore
     from ObjetMetier.User import User  # type: ignore
 
+from Utils.columnar import MessageColumnsWriter
+
+EXPORT_FORMATS = ("markdown", "plain", "jsonl")  # format inconnu : markdown
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
 # --- Types DAO / Services: uniquement pour l'analyse statique ---
 if TYPE_CHECKING:
     try:
@@ -43,8 +51,10 @@ class ExportService:
     UML:
       - export_conversation(conversation_id: int, user_id: int) -> str
       - format_conversation(conversation: Conversation, messages: List[Message]) -> str
+      - stream_conversation(...) / export_conversation_to(out, ...)  (flux, mémoire bornée, gzip possible)
+      - export_messages_columnar(path) -> int  (Parquet / Arrow, analyse hors ligne)
 
-    Par défaut, on produit du Markdown avec :
+    Formats : markdown (défaut), plain, jsonl. Par défaut, on produit du Markdown avec :
       - titre, métadonnées (id, date de création),
       - messages triés par date, avec auteur et rôle (agent ou utilisateur).
 
@@ -146,7 +156,61 @@ class ExportService:
         - Valide l'accès utilisateur.
         - Récupère Conversation + Messages triés par date.
         - Injecte les usernames si possible.
+        Pour une grosse conversation, préférer stream_conversation / export_conversation_to.
+        """
+        return "".join(self.stream_conversation(conversation_id, user_id, fmt=fmt))
+
+    def stream_conversation(
+        self,
+        conversation_id: int,
+        user_id: int,
+        *,
+        fmt: Optional[str] = None,
+        compress: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Iterator[Union[str, bytes]]:
+        """
+        Exporte une conversation en flux : blocs de texte d'environ ``chunk_size``
+        caractères, produits au fil des lignes lues sur le curseur serveur du DAO.
+        La mémoire reste bornée par la taille d'un bloc. ``compress=True`` produit
+        des octets gzip au lieu du texte. Accès et conversation vérifiés dès l'appel.
+        """
+        conv, messages, users_map, effective_fmt = self._open_export(conversation_id, user_id, fmt)
+        if chunk_size < 1:
+            raise ValueError("chunk_size invalide")
+        pieces = self._iter_format(conv, messages, users_map, effective_fmt)
+        chunks = _rechunk(pieces, chunk_size)
+        return _gzip_chunks(chunks) if compress else chunks
+
+    def export_conversation_to(
+        self,
+        out: IO,
+        conversation_id: int,
+        user_id: int,
+        *,
+        fmt: Optional[str] = None,
+        compress: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> int:
+        """
+        Écrit l'export dans ``out`` (fichier texte ou binaire, réponse HTTP...)
+        bloc par bloc ; le texte est encodé en UTF-8 si ``out`` est binaire.
+        Retourne le nombre de caractères (ou d'octets) écrits.
         """
+        binary = compress or not isinstance(out, io.TextIOBase)
+        written = 0
+        for chunk in self.stream_conversation(
+            conversation_id, user_id, fmt=fmt, compress=compress, chunk_size=chunk_size
+        ):
+            if binary and isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            out.write(chunk)
+            written += len(chunk)
+        return written
+
+    def _open_export(
+        self, conversation_id: int, user_id: int, fmt: Optional[str]
+    ) -> Tuple[Conversation, Iterable[Message], Optional[Dict[int, str]], str]:
         self._validate_id("conversation_id", conversation_id)
         self._validate_id("user_id", user_id)
 
@@ -169,47 +233,102 @@ class ExportService:
         if conv is None:
             raise ValueError("Conversation introuvable")
 
-        # 3) récupérer les messages (triés par datetime si possible)
-        fn_get_msgs = self._get_callable(
-            self.message_dao,
-            "get_messages_by_conversation",
-            "get_by_conversation",
-        )
-        if not fn_get_msgs:
-            raise RuntimeError("Le DAO des messages ne permet pas de lister les messages d'une conversation")
-        messages: List[Message] = list(fn_get_msgs(conversation_id))
-        try:
-            messages.sort(key=lambda m: m.datetime)
-        except Exception:
-            pass
+        # 3) récupérer les messages
+        #    - en flux (curseur serveur, déjà triés par la base) si le DAO le permet ;
+        #    - sinon liste complète, triée par datetime si possible.
+        fn_iter_msgs = self._get_callable(self.message_dao, "iter_messages_by_conversation")
+        messages: Iterable[Message]
+        if fn_iter_msgs:
+            messages = fn_iter_msgs(conversation_id)
+        else:
+            fn_get_msgs = self._get_callable(
+                self.message_dao,
+                "get_messages_by_conversation",
+                "get_by_conversation",
+            )
+            if not fn_get_msgs:
+                raise RuntimeError("Le DAO des messages ne permet pas de lister les messages d'une conversation")
+            messages = list(fn_get_msgs(conversation_id))
+            try:
+                messages.sort(key=lambda m: m.datetime)
+            except Exception:
+                pass
 
-        # 4) map user_id -> username si possible
+        # 4) map user_id -> username si possible (rempli au fil des messages)
         users_map: Optional[Dict[int, str]] = None
-        if self.include_usernames and self.user_dao and messages:
-            user_ids: Set[int] = {int(getattr(m, "id_user", 0)) for m in messages}
-            users_map = self._build_users_map(user_ids)
+        if self.include_usernames and self.user_dao:
+            users_map = {}
+            messages = self._with_usernames(messages, users_map)
 
-        # 5) formatage
-        return self.format_conversation(conv, messages, users_map=users_map, fmt=effective_fmt)
+        return conv, messages, users_map, effective_fmt
+
+    def export_messages_columnar(
+        self,
+        path: str,
+        *,
+        fmt: str = "parquet",
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+        row_group_size: int = 100_000,
+        include_text: bool = False,
+    ) -> int:
+        """
+        Exporte tous les messages (ou ceux de la période) dans un fichier Parquet
+        ou Arrow IPC, pour l'analyse hors ligne (voir Service.ColumnarStatistics).
+        Les lignes arrivent de la base par COPY TO STDOUT et sont écrites par
+        groupes de ``row_group_size`` lignes. Export global, sans contrôle d'accès
+        par conversation : réservé aux traitements d'administration.
+        Retourne le nombre de messages exportés.
+        """
+        fn_copy = self._get_callable(self.message_dao, "copy_messages_out")
+        if not fn_copy:
+            raise RuntimeError("Le DAO des messages ne permet pas l'export en masse (COPY)")
+        sink = MessageColumnsWriter(path, fmt=fmt, row_group_size=row_group_size, include_text=include_text)
+        try:
+            fn_copy(sink, start=start, end=end, include_text=include_text)
+        except BaseException:
+            sink.abort()  # pas de fichier tronqué ; l'erreur du COPY remonte telle quelle
+            raise
+        return sink.close()
 
     def format_conversation(
         self,
         conversation: Conversation,
-        messages: List[Message],
+        messages: Iterable[Message],
         *,
         users_map: Optional[Dict[int, str]] = None,
         fmt: str = "markdown",
     ) -> str:
         """Formate la conversation et ses messages en chaîne."""
-        fmt = (fmt or "markdown").lower()
+        return "".join(self._iter_format(conversation, messages, users_map, (fmt or "markdown").lower()))
+
+    def _iter_format(
+        self,
+        conversation: Conversation,
+        messages: Iterable[Message],
+        users_map: Optional[Dict[int, str]],
+        fmt: str,
+    ) -> Iterator[str]:
+        if fmt == "jsonl":
+            return self._iter_jsonl(conversation, messages, users_map)
         if fmt == "plain":
-            return self._format_plain(conversation, messages, users_map)
+            return _rstrip_end(self._iter_plain(conversation, messages, users_map))
         # défaut: markdown
-        return self._format_markdown(conversation, messages, users_map)
+        return _rstrip_end(self._iter_markdown(conversation, messages, users_map))
 
     # ------------------------------------------------------------------
     # Builders
     # ------------------------------------------------------------------
+    def _with_usernames(self, messages: Iterable[Message], users_map: Dict[int, str]) -> Iterator[Message]:
+        """Complète ``users_map`` à la première apparition de chaque auteur, sans matérialiser les messages."""
+        seen: Set[int] = set()
+        for m in messages:
+            uid = int(getattr(m, "id_user", 0))
+            if uid not in seen:
+                seen.add(uid)
+                users_map.update(self._build_users_map({uid}))
+            yield m
+
     def _build_users_map(self, user_ids: Set[int]) -> Dict[int, str]:
         users_map: Dict[int, str] = {}
         fn_get_user = self._get_callable(self.user_dao, "get_user_by_id", "read") if self.user_dao else None
@@ -225,74 +344,143 @@ class ExportService:
                 continue
         return users_map
 
-    def _format_markdown(
-        self,
-        conversation: Conversation,
-        messages: List[Message],
-        users_map: Optional[Dict[int, str]] = None,
-    ) -> str:
+    def _header(self, conversation: Conversation) -> Tuple[str, str, object]:
         titre = getattr(conversation, "titre", None) or f"Conversation #{getattr(conversation, 'id_conversation', '?')}"
         created = getattr(conversation, "created_at", None)
         created_s = created.strftime(self.time_format) if isinstance(created, (datetime.datetime, datetime.date)) else "?"
-        conv_id = getattr(conversation, "id_conversation", "?")
+        return titre, created_s, getattr(conversation, "id_conversation", "?")
+
+    def _describe(self, m: Message, users_map: Optional[Dict[int, str]]) -> Tuple[str, str, str, str]:
+        """(horodatage formaté, auteur, rôle, contenu) d'un message."""
+        ts = getattr(m, "datetime", None)
+        ts_s = ts.strftime(self.time_format) if isinstance(ts, (datetime.datetime, datetime.date)) else "?"
+        uid = int(getattr(m, "id_user", 0))
+        is_agent = bool(getattr(m, "is_from_agent", False))
+        role = "agent" if is_agent else "user"
+        author = "Agent"
+        if not is_agent:
+            if users_map and uid in users_map:
+                author = users_map[uid]
+            else:
+                author = f"user_{uid}"
+        return ts_s, author, role, str(getattr(m, "message", ""))
 
-        lines: List[str] = []
-        lines.append(f"# {titre}")
-        lines.append("")
-        lines.append(f"**ID**: {conv_id}  ")
-        lines.append(f"**Créée le**: {created_s}")
-        lines.append("")
-        lines.append("---")
+    # Chaque morceau commence par le séparateur "\n" (équivalent de "\n".join(lignes))
+    def _iter_markdown(
+        self,
+        conversation: Conversation,
+        messages: Iterable[Message],
+        users_map: Optional[Dict[int, str]] = None,
+    ) -> Iterator[str]:
+        titre, created_s, conv_id = self._header(conversation)
+        yield f"# {titre}\n\n**ID**: {conv_id}  \n**Créée le**: {created_s}\n\n---"
 
         for m in messages:
-            ts = getattr(m, "datetime", None)
-            ts_s = ts.strftime(self.time_format) if isinstance(ts, (datetime.datetime, datetime.date)) else "?"
-            uid = int(getattr(m, "id_user", 0))
-            is_agent = bool(getattr(m, "is_from_agent", False))
-            role = "agent" if is_agent else "user"
-            author = "Agent"
-            if not is_agent:
-                if users_map and uid in users_map:
-                    author = users_map[uid]
-                else:
-                    author = f"user_{uid}"
-            content = str(getattr(m, "message", ""))
+            ts_s, author, role, content = self._describe(m, users_map)
             # Chaque message en bloc Markdown
-            lines.append(f"**[{ts_s}] {author} ({role})**\n\n{content}\n")
-            lines.append("---")
+            yield f"\n**[{ts_s}] {author} ({role})**\n\n{content}\n\n---"
+
+    def _iter_plain(
+        self,
+        conversation: Conversation,
+        messages: Iterable[Message],
+        users_map: Optional[Dict[int, str]] = None,
+    ) -> Iterator[str]:
+        titre, created_s, conv_id = self._header(conversation)
+        yield f"{titre}\n\nID: {conv_id}\nCréée le: {created_s}\n"
 
-        return "\n".join(lines).rstrip()
+        for m in messages:
+            ts_s, author, role, content = self._describe(m, users_map)
+            yield f"\n[{ts_s}] {author} ({role})\n{content}\n"
+
+    def _iter_jsonl(
+        self,
+        conversation: Conversation,
+        messages: Iterable[Message],
+        users_map: Optional[Dict[int, str]] = None,
+    ) -> Iterator[str]:
+        """Une ligne JSON pour la conversation, puis une par message."""
+        created = getattr(conversation, "created_at", None)
+        yield json.dumps(
+            {
+                "type": "conversation",
+                "id_conversation": getattr(conversation, "id_conversation", None),
+                "titre": getattr(conversation, "titre", None),
+                "created_at": created.isoformat() if isinstance(created, (datetime.datetime, datetime.date)) else None,
+            },
+            ensure_ascii=False,
+        ) + "\n"
+        for m in messages:
+            _, author, role, content = self._describe(m, users_map)
+            ts = getattr(m, "datetime", None)
+            yield json.dumps(
+                {
+                    "type": "message",
+                    "id_message": getattr(m, "id_message", None),
+                    "id_user": getattr(m, "id_user", None),
+                    "author": author,
+                    "role": role,
+                    "datetime": ts.isoformat() if isinstance(ts, (datetime.datetime, datetime.date)) else None,
+                    "message": content,
+                },
+                ensure_ascii=False,
+            ) + "\n"
+
+    # Compatibilité : rendu complet en chaîne
+    def _format_markdown(
+        self,
+        conversation: Conversation,
+        messages: Iterable[Message],
+        users_map: Optional[Dict[int, str]] = None,
+    ) -> str:
+        return "".join(_rstrip_end(self._iter_markdown(conversation, messages, users_map)))
 
     def _format_plain(
         self,
         conversation: Conversation,
-        messages: List[Message],
+        messages: Iterable[Message],
         users_map: Optional[Dict[int, str]] = None,
     ) -> str:
-        titre = getattr(conversation, "titre", None) or f"Conversation #{getattr(conversation, 'id_conversation', '?')}"
-        created = getattr(conversation, "created_at", None)
-        created_s = created.strftime(self.time_format) if isinstance(created, (datetime.datetime, datetime.date)) else "?"
-        conv_id = getattr(conversation, "id_conversation", "?")
+        return "".join(_rstrip_end(self._iter_plain(conversation, messages, users_map)))
 
-        lines: List[str] = []
-        lines.append(f"{titre}\n")
-        lines.append(f"ID: {conv_id}")
-        lines.append(f"Créée le: {created_s}")
-        lines.append("")
 
-        for m in messages:
-            ts = getattr(m, "datetime", None)
-            ts_s = ts.strftime(self.time_format) if isinstance(ts, (datetime.datetime, datetime.date)) else "?"
-            uid = int(getattr(m, "id_user", 0))
-            is_agent = bool(getattr(m, "is_from_agent", False))
-            role = "agent" if is_agent else "user"
-            author = "Agent"
-            if not is_agent:
-                if users_map and uid in users_map:
-                    author = users_map[uid]
-                else:
-                    author = f"user_{uid}"
-            content = str(getattr(m, "message", ""))
-            lines.append(f"[{ts_s}] {author} ({role})\n{content}\n")
-
-        return "\n".join(lines).rstrip()
+# ----------------------------------------------------------------------
+# Flux de morceaux de texte
+# ----------------------------------------------------------------------
+def _rstrip_end(pieces: Iterable[str]) -> Iterator[str]:
+    """Comme "".join(pieces).rstrip(), en ne retenant qu'un morceau d'avance."""
+    held: List[str] = []  # morceaux en attente : uniquement des blancs, sauf le premier
+    for piece in pieces:
+        if piece.strip():
+            yield from held
+            held = [piece]
+        else:
+            held.append(piece)
+    if held:
+        tail = "".join(held).rstrip()
+        if tail:
+            yield tail
+
+
+def _rechunk(pieces: Iterable[str], chunk_size: int) -> Iterator[str]:
+    """Regroupe les morceaux en blocs d'au moins ``chunk_size`` caractères (sauf le dernier)."""
+    buf: List[str] = []
+    size = 0
+    for piece in pieces:
+        buf.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf)
+
+
+def _gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Compresse le flux au format gzip, bloc par bloc."""
+    compressor = zlib.compressobj(wbits=31)  # 16 + 15 : en-tête gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
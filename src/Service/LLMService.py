@@ -1,12 +1,22 @@
 from __future__ import annotations
 
-from typing import List, Optional, Dict, Any, TYPE_CHECKING
+from typing import List, Optional, Dict, Any, Generator, Iterator, Tuple, TYPE_CHECKING
 from datetime import datetime, timezone
+import asyncio
+from collections import OrderedDict
+import json
 import os
+import random
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from requests.adapters import HTTPAdapter
 
-AGENT_USER_ID = 6  # ID de l'agent en base
+from Utils.ResponseCache import ResponseCache
 
+AGENT_USER_ID = 6  # ID de l'agent en base
 
 # === Imports métier ===
 try:
@@ -77,6 +87,20 @@ class LLMService:
         default_temperature: float = 0.7,
         default_max_tokens: int = 512,
         timeout: float = 20.0,
+        history_window: Optional[int] = 50,
+        history_token_budget: Optional[int] = None,
+        summarize_history: bool = False,
+        summary_batch_size: int = 200,
+        summary_cache_size: int = 1024,
+        summary_batches_per_reply: int = 1,
+        requests_session: Optional[requests.Session] = None,
+        pool_maxsize: int = 10,
+        max_retries: int = 2,
+        backoff_factor: float = 0.5,
+        response_cache: Optional[ResponseCache] = None,
+        cache_sampled_responses: bool = False,
+        max_concurrency: int = 8,
+        async_timeout: Optional[float] = None,
     ) -> None:
         self.message_dao = message_dao
         self.conversation_dao = conversation_dao
@@ -88,6 +112,17 @@ class LLMService:
         self.default_max_tokens = default_max_tokens
         self.timeout = timeout
 
+        # Fenêtre d'historique envoyée au modèle (None = conversation complète)
+        self.history_window = history_window
+        self.history_token_budget = history_token_budget
+        self.summarize_history = summarize_history
+        self.summary_batch_size = summary_batch_size
+        # conversation_id -> (curseur du dernier message résumé, résumé), LRU borné
+        self.summary_cache_size = summary_cache_size
+        self.summary_batches_per_reply = summary_batches_per_reply
+        self._summary_cache: "OrderedDict[int, Tuple[Tuple[datetime, int], str]]" = OrderedDict()
+        self._summary_lock = threading.Lock()
+
         # base_url = racine de l’API, on ajoute /generate ensuite
         self.base_url = (
             base_url
@@ -95,7 +130,110 @@ class LLMService:
             or "https://ensai-gpt-109912438483.europe-west4.run.app"
         ).rstrip("/")
 
+        # Client HTTP persistant (keep-alive) : évite une poignée de main TCP+TLS par appel
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.session = requests_session or self._get_shared_session(pool_maxsize)
+
+        # Cache des complétions sans état (simple_complete / invité).
+        # Par défaut seules les réponses déterministes (temperature == 0) sont mises en cache.
+        self.response_cache = response_cache
+        self.cache_sampled_responses = cache_sampled_responses
+
+        # Front asynchrone : concurrence bornée, fusion des requêtes identiques en vol
+        self.max_concurrency = max_concurrency
+        self.async_timeout = async_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphores: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+        # clé (boucle, use_cache, requête) ; lu et modifié sous _async_lock (instance partagée entre threads)
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, bool, str], asyncio.Future] = {}
+        self._async_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Client HTTP partagé
+    # ------------------------------------------------------------------
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    _shared_sessions: Dict[int, requests.Session] = {}
+    _shared_lock = threading.Lock()
+    _guest_instance: Optional["LLMService"] = None
+
+    @classmethod
+    def _get_shared_session(cls, pool_maxsize: int = 10) -> requests.Session:
+        """
+        Session requests partagée par taille de pool (une par processus).
+        Les connexions vers l'API restent ouvertes et sont réutilisées.
+        """
+        with cls._shared_lock:
+            sess = cls._shared_sessions.get(pool_maxsize)
+            if sess is None:
+                sess = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+                sess.mount("https://", adapter)
+                sess.mount("http://", adapter)
+                cls._shared_sessions[pool_maxsize] = sess
+            return sess
+
+    def _retry_delay(self, attempt: int, resp: Optional[requests.Response] = None) -> float:
+        """Backoff exponentiel avec gigue ; respecte Retry-After s'il est fourni."""
+        if resp is not None:
+            headers = getattr(resp, "headers", None) or {}
+            retry_after = headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return max(0.0, float(retry_after))
+                except ValueError:
+                    pass
+        return self.backoff_factor * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    def _post(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Dict[str, str],
+        *,
+        timeout: Optional[float] = None,
+        stream: bool = False,
+        deadline: Optional[float] = None,
+    ) -> requests.Response:
+        """
+        POST via la session partagée, avec réessais (429/5xx, erreurs de connexion).
+        La dernière réponse (ou exception) est renvoyée telle quelle à l'appelant.
+        ``deadline`` (time.monotonic()) borne l'ensemble des tentatives : chaque
+        requête reçoit au plus le temps restant, puis requests.Timeout est levée.
+        """
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            per_call = timeout or self.timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise requests.exceptions.Timeout(f"délai global dépassé sur {url}")
+                per_call = min(per_call, remaining)
+            try:
+                kwargs: Dict[str, Any] = {"json": payload, "headers": headers, "timeout": per_call}
+                if stream:
+                    kwargs["stream"] = True
+                resp = self.session.post(url, **kwargs)
+            except requests.exceptions.ConnectionError:
+                if last_attempt:
+                    raise
+                time.sleep(self._bounded_delay(self._retry_delay(attempt), deadline))
+                continue
+            if resp.status_code in self.RETRY_STATUSES and not last_attempt:
+                delay = self._retry_delay(attempt, resp)
+                resp.close()
+                time.sleep(self._bounded_delay(delay, deadline))
+                continue
+            return resp
+        raise RuntimeError("[LLM] aucune tentative effectuée")  # max_retries < 0
 
+    @staticmethod
+    def _bounded_delay(delay: float, deadline: Optional[float]) -> float:
+        """Attente avant réessai, sans dépasser ``deadline``."""
+        if deadline is None:
+            return delay
+        return max(0.0, min(delay, deadline - time.monotonic()))
 
     # ------------------------------------------------------------------
     # Helpers
@@ -111,6 +249,7 @@ class LLMService:
         *,
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
+        deadline: Optional[float] = None,
     ) -> Dict[str, Any]:
         """
         Appelle POST /generate avec:
@@ -140,12 +279,7 @@ class LLMService:
         }
 
         try:
-            resp = requests.post(
-                url,
-                json=payload,
-                headers=headers,
-                timeout=self.timeout,
-            )
+            resp = self._post(url, payload, headers, deadline=deadline)
             resp.raise_for_status()
         except requests.exceptions.HTTPError as e:
             # print(f"[LLMService] HTTP ERROR {resp.status_code}: {resp.text}")
@@ -164,7 +298,11 @@ class LLMService:
             raise RuntimeError(f"[LLM] Réponse non-JSON depuis {url}") from e
 
         # print(f"[LLMService] Réponse brute: {data}")
+        return self._parse_generate_response(data)
 
+    @staticmethod
+    def _parse_generate_response(data: Any) -> Dict[str, Any]:
+        """Extrait {"content", "usage"} d'une réponse JSON complète de /generate."""
         # On suit exactement le format de l'exemple:
         # data["choices"][0]["message"]["content"]
         try:
@@ -190,6 +328,120 @@ class LLMService:
             "usage": usage,
         }
 
+    @staticmethod
+    def _extract_stream_delta(data: str) -> str:
+        """Texte porté par un évènement SSE (format OpenAI-like ou texte brut)."""
+        try:
+            event = json.loads(data)
+        except ValueError:
+            return data
+        if not isinstance(event, dict):
+            return str(event)
+        try:
+            choice = event["choices"][0]
+            part = choice.get("delta") or choice.get("message") or {}
+            return str(part.get("content") or "")
+        except (KeyError, IndexError, TypeError, AttributeError):
+            return str(event.get("content") or "")
+
+    def _stream_llm(
+        self,
+        history: List[Dict[str, str]],
+        *,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> Iterator[str]:
+        """
+        Variante streamée de _call_llm : POST /generate avec "stream": true et
+        renvoie les fragments de texte au fil de l'eau (SSE "data: ..." ou réponse
+        chunkée en texte brut). Si le serveur répond en JSON classique (pas de
+        streaming) ou refuse le paramètre, on retombe sur l'appel bloquant.
+        """
+        url = f"{self.base_url}/generate"
+        payload: Dict[str, Any] = {
+            "history": history,
+            "max_tokens": max_tokens if max_tokens is not None else self.default_max_tokens,
+            "temperature": temperature if temperature is not None else self.default_temperature,
+            "top_p": 1,
+            "stream": True,
+        }
+        headers = {
+            "accept": "text/event-stream, application/json",
+            "Content-Type": "application/json",
+        }
+
+        try:
+            resp = self._post(url, payload, headers, stream=True)
+        except requests.exceptions.Timeout as e:
+            raise RuntimeError(f"[LLM] Timeout ({self.timeout}s) sur {url}") from e
+        except requests.exceptions.RequestException as e:
+            raise RuntimeError(f"[LLM] Erreur réseau sur {url}: {e}") from e
+
+        with resp:
+            if resp.status_code in (400, 404, 405, 415, 422):
+                # le serveur ne connaît pas le mode stream : chemin bloquant
+                out = self._call_llm(history, temperature=temperature, max_tokens=max_tokens)
+                yield str(out.get("content", ""))
+                return
+            try:
+                resp.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                raise RuntimeError(
+                    f"[LLM] HTTP {resp.status_code} sur {url} – corps: {resp.text[:800]}"
+                ) from e
+
+            content_type = resp.headers.get("Content-Type", "")
+            if "charset" not in content_type.lower():
+                # requests supposerait ISO-8859-1 pour text/* sans charset : accents illisibles
+                resp.encoding = "utf-8"
+            try:
+                if "application/json" in content_type:
+                    # pas de streaming côté serveur : réponse complète d'un bloc
+                    yield str(self._parse_generate_response(resp.json()).get("content", ""))
+                elif "text/event-stream" in content_type:
+                    for line in resp.iter_lines(decode_unicode=True):
+                        if not line or not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        delta = self._extract_stream_delta(data)
+                        if delta:
+                            yield delta
+                else:
+                    for chunk in resp.iter_content(chunk_size=None, decode_unicode=True):
+                        if chunk:
+                            yield chunk
+            except ValueError as e:
+                raise RuntimeError(f"[LLM] Réponse non-JSON depuis {url}") from e
+            except requests.exceptions.RequestException as e:
+                raise RuntimeError(f"[LLM] Flux interrompu sur {url}: {e}") from e
+
+    def _cached_call(
+        self,
+        history: List[Dict[str, str]],
+        *,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """_call_llm avec passage par le cache de réponses quand c'est autorisé."""
+        temp = temperature if temperature is not None else self.default_temperature
+        tokens = max_tokens if max_tokens is not None else self.default_max_tokens
+        cacheable = self.response_cache is not None and (temp == 0 or self.cache_sampled_responses)
+        if not cacheable:
+            return self._call_llm(history, temperature=temperature, max_tokens=max_tokens, deadline=deadline)
+
+        key = ResponseCache.make_key(
+            history, base_url=self.base_url, temperature=temp, max_tokens=tokens, top_p=1
+        )
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            return cached
+        out = self._call_llm(history, temperature=temperature, max_tokens=max_tokens, deadline=deadline)
+        self.response_cache.set(key, out)
+        return out
+
     def _build_history_for_prompt(
         self,
         user_content: str,
@@ -204,16 +456,23 @@ class LLMService:
         # print(f"[LLMService] History pour simple_complete: {history}")
         return history
 
-    def _build_history_for_conversation(
-        self,
-        conversation_id: int,
-        *,
-        system_prompt: Optional[str] = None,
-        extra_context: Optional[str] = None,
-    ) -> List[Dict[str, str]]:
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Estimation grossière (~4 caractères par token + surcoût du rôle)."""
+        return len(text) // 4 + 4
+
+    def _load_history_window(self, conversation_id: int) -> List[Message]:
         """
-        Construit le history pour l'API à partir des messages en BDD.
+        Charge les messages à envoyer au modèle, du plus ancien au plus récent.
+        Avec une fenêtre, seuls les ``history_window`` derniers messages sont lus
+        (requête bornée en ordre inverse) ; sinon toute la conversation.
         """
+        get_window = getattr(self.message_dao, "get_messages_by_conversation_keyset", None)
+        if self.history_window is not None and callable(get_window):
+            window: List[Message] = list(get_window(conversation_id, self.history_window))
+            window.reverse()
+            return window
+
         get_msgs = getattr(self.message_dao, "get_messages_by_conversation", None)
         if not callable(get_msgs):
             raise RuntimeError(
@@ -221,17 +480,150 @@ class LLMService:
             )
 
         history_messages: List[Message] = list(get_msgs(conversation_id))
-        # print(f"[LLMService] Historique récupéré: {len(history_messages)} messages")
-
         # Normalement déjà trié par timestamp dans le DAO, mais on sécurise
         try:
             history_messages.sort(key=lambda m: m.datetime)
         except Exception:
             pass
+        return history_messages
+
+    def _apply_token_budget(self, messages: List[Dict[str, str]], reserved: int) -> List[Dict[str, str]]:
+        """Garde les messages les plus récents tenant dans le budget (au moins le dernier)."""
+        if self.history_token_budget is None:
+            return messages
+        remaining = self.history_token_budget - reserved
+        kept: List[Dict[str, str]] = []
+        for msg in reversed(messages):
+            cost = self._estimate_tokens(msg["content"])
+            if kept and cost > remaining:
+                break
+            kept.append(msg)
+            remaining -= cost
+        kept.reverse()
+        return kept
+
+    def _summary_cache_get(self, conversation_id: int) -> Optional[Tuple[Tuple[datetime, int], str]]:
+        with self._summary_lock:
+            entry = self._summary_cache.get(conversation_id)
+            if entry is not None:
+                self._summary_cache.move_to_end(conversation_id)
+            return entry
+
+    def _summary_cache_put(self, conversation_id: int, entry: Tuple[Tuple[datetime, int], str]) -> None:
+        with self._summary_lock:
+            self._summary_cache[conversation_id] = entry
+            self._summary_cache.move_to_end(conversation_id)
+            while len(self._summary_cache) > self.summary_cache_size:
+                self._summary_cache.popitem(last=False)
+
+    def _rolling_summary(
+        self, conversation_id: int, window: List[Message]
+    ) -> Tuple[Optional[str], List[Message]]:
+        """
+        Résumé des échanges plus anciens que la fenêtre, mis en cache par conversation,
+        et messages évincés pas encore résumés à remettre devant la fenêtre.
+
+        Les messages sortis de la fenêtre sont repliés du plus ancien au plus récent,
+        par paquets complets de ``summary_batch_size`` et au plus
+        ``summary_batches_per_reply`` paquets par réponse : une longue conversation
+        (premier appel, redémarrage, entrée sortie du cache) rattrape son résumé sur
+        plusieurs réponses. Le reste partiel (moins d'un paquet) est renvoyé pour être
+        envoyé tel quel : aucun message n'est absent à la fois de la fenêtre et du résumé,
+        sauf pendant un rattrapage.
+        """
+        if not window or window[0].id_message is None:
+            return None, []
+        cached = self._summary_cache_get(conversation_id)
+        summarized_until = cached[0] if cached else None
+        summary = cached[1] if cached else None
+        if self.history_window is not None and len(window) < self.history_window:
+            # la fenêtre couvre toute la conversation : rien à résumer
+            return summary, []
+
+        get_window = getattr(self.message_dao, "get_messages_by_conversation_keyset", None)
+        if not callable(get_window):
+            return summary, []
+        window_start = (window[0].datetime, window[0].id_message)
+
+        folded = 0
+        while True:
+            evicted: List[Message] = list(
+                get_window(
+                    conversation_id,
+                    self.summary_batch_size,
+                    before=window_start,
+                    after=summarized_until,
+                    oldest_first=True,
+                )
+            )
+            if len(evicted) < self.summary_batch_size:
+                return summary, evicted
+            if folded >= self.summary_batches_per_reply:
+                return summary, []  # rattrapage poursuivi aux réponses suivantes
+
+            lines = []
+            for m in evicted:
+                author = "Assistant" if m.is_from_agent else f"Utilisateur {m.id_user}"
+                lines.append(f"{author}: {m.message}")
+            prompt = "Résume de façon concise cette conversation.\n"
+            if summary:
+                prompt += f"Résumé précédent:\n{summary}\n"
+            prompt += "Nouveaux échanges:\n" + "\n".join(lines)
+
+            out = self._call_llm(
+                self._build_history_for_prompt(prompt),
+                temperature=0.0,
+                max_tokens=self.default_max_tokens,
+            )
+            summary = str(out.get("content", "")) or summary or ""
+            last = evicted[-1]
+            summarized_until = (last.datetime, last.id_message)
+            self._summary_cache_put(conversation_id, (summarized_until, summary))
+            folded += 1
+
+    def _build_history_for_conversation(
+        self,
+        conversation_id: int,
+        *,
+        system_prompt: Optional[str] = None,
+        extra_context: Optional[str] = None,
+    ) -> List[Dict[str, str]]:
+        """
+        Construit le history pour l'API à partir des messages en BDD.
+        Le coût est borné par la fenêtre (``history_window``) et éventuellement
+        par un budget de tokens ; les tours plus anciens peuvent être remplacés
+        par un résumé glissant (``summarize_history``).
+        """
+        history_messages = self._load_history_window(conversation_id)
+        return self._history_from_messages(
+            conversation_id,
+            history_messages,
+            system_prompt=system_prompt,
+            extra_context=extra_context,
+        )
 
+    def _history_from_messages(
+        self,
+        conversation_id: int,
+        history_messages: List[Message],
+        *,
+        system_prompt: Optional[str] = None,
+        extra_context: Optional[str] = None,
+    ) -> List[Dict[str, str]]:
+        """Construit le history pour l'API à partir de messages déjà chargés (ordre chronologique)."""
         sys = system_prompt or self.default_system_prompt
         messages: List[Dict[str, str]] = [{"role": "system", "content": sys}]
 
+        summary = None
+        if self.summarize_history and self.history_window is not None:
+            summary, unsummarized = self._rolling_summary(conversation_id, history_messages)
+            history_messages = unsummarized + list(history_messages)
+        if summary:
+            messages.append(
+                {"role": "system", "content": f"Résumé des échanges précédents:\n{summary}"}
+            )
+
+        turns: List[Dict[str, str]] = []
         for m in history_messages:
             is_agent = bool(getattr(m, "is_from_agent", False))
             role = "assistant" if is_agent else "user"
@@ -242,12 +634,19 @@ class LLMService:
                 uid = int(getattr(m, "id_user", 0))
                 content = f"<user id={uid}>\n{content}"
 
-            messages.append({"role": role, "content": content})
+            turns.append({"role": role, "content": content})
 
+        context_msg = None
         if extra_context:
-            messages.append(
-                {"role": "system", "content": f"Contexte additionnel:\n{extra_context}"}
-            )
+            context_msg = {"role": "system", "content": f"Contexte additionnel:\n{extra_context}"}
+
+        reserved = sum(self._estimate_tokens(m["content"]) for m in messages)
+        if context_msg:
+            reserved += self._estimate_tokens(context_msg["content"])
+        messages.extend(self._apply_token_budget(turns, reserved))
+
+        if context_msg:
+            messages.append(context_msg)
 
         # print(f"[LLMService] History complet envoyé à l'API ({len(messages)} messages)")
         return messages
@@ -271,7 +670,7 @@ class LLMService:
 
         # self._ensure_not_banned("input", prompt)
         history = self._build_history_for_prompt(prompt, system_prompt=system_prompt)
-        out = self._call_llm(
+        out = self._cached_call(
             history,
             temperature=temperature,
             max_tokens=max_tokens,
@@ -291,7 +690,7 @@ class LLMService:
         extra_context: Optional[str] = None,
     ) -> Message:
         """
-        Utilise l'historique complet de la conversation, envoie à l'API,
+        Utilise l'historique (fenêtré) de la conversation, envoie à l'API,
         récupère la réponse et la sauvegarde comme message agent.
         """
         self._validate_id("conversation_id", conversation_id)
@@ -324,12 +723,15 @@ class LLMService:
         # self._ensure_not_banned("output", content)
 
         # 4) Persister la réponse agent
-        now = datetime.now(timezone.utc)
+        return self._persist_agent_reply(conversation_id, content)
+
+    def _persist_agent_reply(self, conversation_id: int, content: str) -> Message:
+        """Enregistre la réponse du modèle comme message de l'agent."""
         msg_obj = Message(
             id_message=None,
             id_conversation=conversation_id,
             id_user=AGENT_USER_ID,
-            datetime=now,
+            datetime=datetime.now(timezone.utc),
             message=content,
             is_from_agent=True,
         )
@@ -341,93 +743,294 @@ class LLMService:
         created: Message = create_fn(msg_obj)
         return created
 
-    @staticmethod
-    def requete_invitee(prompt: str) -> str:
+    def stream_agent_reply(
+        self,
+        conversation_id: int,
+        user_id: int,
+        *,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        extra_context: Optional[str] = None,
+    ) -> Generator[str, None, Message]:
         """
-        Méthode statique pour des requêtes invitées simples.
+        Comme generate_agent_reply, mais produit les fragments de la réponse
+        au fur et à mesure de leur arrivée. Le message agent complet n'est
+        persisté qu'une fois, à la fin du flux ; il est la valeur de retour
+        du générateur (``StopIteration.value`` / ``yield from``).
         """
+        self._validate_id("conversation_id", conversation_id)
+        self._validate_id("user_id", user_id)
 
-        default_temperature_invite = 0.7
-        default_max_tokens_invite = 512
-        timeout_invite = 20.0
-        url = f"https://ensai-gpt-109912438483.europe-west4.run.app/generate"
-        # print(f"[LLMService] Appel API POST inivitee {url}")
+        history = self._build_history_for_conversation(
+            conversation_id,
+            system_prompt=system_prompt,
+            extra_context=extra_context,
+        )
 
-        history_invitee = [
-    {
-      "content": "Tu es un assistant utile.",
-      "role": "system"
-    },
-    {
-      "content": prompt,
-      "role": "user"
-    }
-  ]
+        create_fn = getattr(self.message_dao, "create", None)
+        if not callable(create_fn):
+            raise RuntimeError("MessageDAO ne fournit pas create")
 
-        payload: Dict[str, Any] = {
-            "history": history_invitee,
-            "max_tokens": default_max_tokens_invite,
-            "temperature": default_temperature_invite,
-            "top_p": 1,
-        }
+        parts: List[str] = []
+        for chunk in self._stream_llm(history, temperature=temperature, max_tokens=max_tokens):
+            parts.append(chunk)
+            yield chunk
 
-        # print(f"[LLMService] Payload envoyé invitee: {payload}")
+        return self._persist_agent_reply(conversation_id, "".join(parts))
 
-        headers = {
-            "accept": "application/json",
-            "Content-Type": "application/json",
-        }
+    def generate_agent_replies(
+        self,
+        conversation_ids: List[int],
+        *,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        max_workers: Optional[int] = None,
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Génère une réponse agent pour chaque conversation (traitements par lot).
 
-        try:
-            resp = requests.post(
-                url,
-                json=payload,
-                headers=headers,
-                timeout=timeout_invite,
-            )
-            resp.raise_for_status()
-        except requests.exceptions.HTTPError as e:
-            # print(f"[LLMService] HTTP ERROR invitee {resp.status_code}: {resp.text}")
+        1) les historiques sont chargés en une seule requête ; une conversation
+           sans message (inexistante ou vide) est signalée en échec sans appel au modèle ;
+        2) les appels au modèle sont répartis sur un pool de workers ;
+        3) les réponses obtenues sont insérées en une seule écriture multi-lignes.
+           Si ce lot échoue, chaque réponse est réinsérée seule pour que
+           chaque conversation ait son propre résultat.
+
+        Renvoie, par conversation, {"ok": bool, "message": Message | None, "error": str | None}.
+        """
+        ids: List[int] = list(dict.fromkeys(conversation_ids))
+        for cid in ids:
+            self._validate_id("conversation_id", cid)
+        results: Dict[int, Dict[str, Any]] = {}
+        if not ids:
+            return results
+
+        load_fn = getattr(self.message_dao, "get_last_messages_by_conversations", None)
+        create_many = getattr(self.message_dao, "create_many", None)
+        if not callable(load_fn) or not callable(create_many):
             raise RuntimeError(
-                f"[LLM] HTTP invitee {resp.status_code} sur {url} – corps: {resp.text[:800]}"
-            ) from e
-        except requests.exceptions.Timeout as e:
-            raise RuntimeError(f"[LLM] Timeout invitee ({timeout_invite}s) sur {url}") from e
-        except requests.exceptions.RequestException as e:
-            raise RuntimeError(f"[LLM] Erreur réseau sur invitee {url}: {e}") from e
+                "MessageDAO ne fournit pas get_last_messages_by_conversations / create_many"
+            )
+
+        histories = load_fn(ids, self.history_window)
+        ready: List[int] = []
+        for cid in ids:
+            if histories.get(cid):
+                ready.append(cid)
+            else:
+                results[cid] = {"ok": False, "message": None, "error": f"conversation {cid} sans historique"}
+
+        def _generate(cid: int) -> str:
+            history = self._history_from_messages(
+                cid, list(histories[cid]), system_prompt=system_prompt
+            )
+            out = self._call_llm(history, temperature=temperature, max_tokens=max_tokens)
+            return str(out.get("content", ""))
 
+        contents: Dict[int, str] = {}
+        with ThreadPoolExecutor(max_workers=max_workers or self.max_concurrency) as pool:
+            futures = {cid: pool.submit(_generate, cid) for cid in ready}
+            for cid, future in futures.items():
+                try:
+                    contents[cid] = future.result()
+                except Exception as e:
+                    results[cid] = {"ok": False, "message": None, "error": str(e)}
+
+        now = datetime.now(timezone.utc)
+        pending: List[Message] = [
+            Message(
+                id_message=None,
+                id_conversation=cid,
+                id_user=AGENT_USER_ID,
+                datetime=now,
+                message=content,
+                is_from_agent=True,
+            )
+            for cid, content in contents.items()
+        ]
         try:
-            data = resp.json()
-        except ValueError as e:
-            # print(f"[LLMService] Réponse non JSON invitee : {resp.text[:800]}")
-            raise RuntimeError(f"[LLM] Réponse non-JSON depuis invitee {url}") from e
+            created: List[Message] = list(create_many(pending)) if pending else []
+        except Exception:
+            # lot annulé en entier (ex. une conversation supprimée entre-temps) :
+            # une insertion par réponse, les autres conversations ne sont pas perdues
+            created = []
+            for m in pending:
+                try:
+                    created.append(self._persist_agent_reply(m.id_conversation, m.message))
+                except Exception as e:
+                    results[m.id_conversation] = {"ok": False, "message": None, "error": str(e)}
+        for m in created:
+            results[m.id_conversation] = {"ok": True, "message": m, "error": None}
 
-        # print(f"[LLMService] Réponse brute invitee: {data}")
+        return {cid: results[cid] for cid in ids if cid in results}
+
+    # ------------------------------------------------------------------
+    # Front asynchrone (asyncio)
+    # ------------------------------------------------------------------
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Pool de workers borné par max_concurrency pour les appels bloquants."""
+        with self._async_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix="llm"
+                )
+            return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Sémaphore par endpoint (base_url), recréé si la boucle d'évènements change."""
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            entry = self._semaphores.get(self.base_url)
+            if entry is None or entry[0] is not loop:
+                entry = (loop, asyncio.Semaphore(self.max_concurrency))
+                self._semaphores[self.base_url] = entry
+            return entry[1]
+
+    def close(self) -> None:
+        """Arrête le pool de workers du front asynchrone (attend les appels en cours)."""
+        with self._async_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    async def aclose(self) -> None:
+        """Équivalent asynchrone de close(), sans bloquer la boucle d'évènements."""
+        await asyncio.to_thread(self.close)
+
+    def _forget_inflight(self, key, future: asyncio.Future) -> None:
+        with self._async_lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _run_blocking(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), partial(fn, *args, **kwargs))
+
+    async def _acall_llm(
+        self,
+        history: List[Dict[str, str]],
+        *,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Version asynchrone de _call_llm :
+          - au plus max_concurrency requêtes en vol par endpoint ;
+          - les requêtes identiques en cours sur la même boucle d'évènements, et
+            avec le même use_cache, sont fusionnées (un seul appel HTTP) ; un
+            futur n'étant attendable que depuis sa boucle, deux boucles (threads)
+            n'en partagent jamais ;
+          - abandon après async_timeout secondes (RuntimeError) ; le même délai
+            est transmis à requests pour que le thread du pool se libère aussi.
+        """
+        temp = temperature if temperature is not None else self.default_temperature
+        tokens = max_tokens if max_tokens is not None else self.default_max_tokens
+        timeout = self.async_timeout or self.timeout * (self.max_retries + 1)
+        deadline = time.monotonic() + timeout
+        loop = asyncio.get_running_loop()
+        key = (
+            loop,
+            use_cache,
+            ResponseCache.make_key(history, base_url=self.base_url, temperature=temp, max_tokens=tokens, top_p=1),
+        )
+        call = self._cached_call if use_cache else self._call_llm
+
+        async def _limited() -> Dict[str, Any]:
+            async with self._get_semaphore():
+                return await self._run_blocking(
+                    call, history, temperature=temperature, max_tokens=max_tokens, deadline=deadline
+                )
+
+        with self._async_lock:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                inflight = loop.create_task(_limited())
+                self._inflight[key] = inflight
+                inflight.add_done_callback(partial(self._forget_inflight, key))
 
-        # On suit exactement le format de l'exemple:
-        # data["choices"][0]["message"]["content"]
         try:
-            first_choice = data["choices"][0]
-            message = first_choice["message"]
-            content = str(message.get("content", ""))
-        except Exception as e:
-            raise RuntimeError(
-                f"[LLM] Format de réponse inattendu, impossible de lire choices[0].message.content: {data}"
-            ) from e
+            # shield : l'expiration d'un appelant n'annule pas l'appel partagé par les autres
+            return await asyncio.wait_for(asyncio.shield(inflight), timeout=timeout)
+        except asyncio.TimeoutError as e:
+            raise RuntimeError(f"[LLM] Timeout ({timeout}s) sur {self.base_url}/generate") from e
 
-        usage_raw = data.get("usage", {}) if isinstance(data, dict) else {}
-        usage: Dict[str, int] = {}
-        if isinstance(usage_raw, dict):
-            usage = {
-                "prompt_tokens": int(usage_raw.get("prompt_tokens", 0)),
-                "completion_tokens": int(usage_raw.get("completion_tokens", 0)),
-                "total_tokens": int(usage_raw.get("total_tokens", 0)),
-            }
+    async def asimple_complete(
+        self,
+        prompt: str,
+        *,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> str:
+        """Équivalent asynchrone de simple_complete."""
+        if not isinstance(prompt, str) or not prompt.strip():
+            raise ValueError("prompt vide")
+        history = self._build_history_for_prompt(prompt, system_prompt=system_prompt)
+        out = await self._acall_llm(
+            history, temperature=temperature, max_tokens=max_tokens, use_cache=True
+        )
+        return str(out.get("content", ""))
 
-        return {
-            "content": content,
-            "usage": usage,
-        }
+    async def agenerate_agent_reply(
+        self,
+        conversation_id: int,
+        user_id: int,
+        *,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        extra_context: Optional[str] = None,
+    ) -> Message:
+        """
+        Équivalent asynchrone de generate_agent_reply : plusieurs conversations
+        peuvent avoir une génération en cours en même temps (accès BDD et HTTP
+        exécutés dans le pool de workers borné).
+        """
+        self._validate_id("conversation_id", conversation_id)
+        self._validate_id("user_id", user_id)
+
+        history = await self._run_blocking(
+            self._build_history_for_conversation,
+            conversation_id,
+            system_prompt=system_prompt,
+            extra_context=extra_context,
+        )
+        out = await self._acall_llm(history, temperature=temperature, max_tokens=max_tokens)
+        content = str(out.get("content", ""))
+        return await self._run_blocking(self._persist_agent_reply, conversation_id, content)
+
+    @classmethod
+    def _get_guest_service(cls) -> "LLMService":
+        """Instance partagée (sans DAO) pour le mode invité ; réutilise le client HTTP commun."""
+        with cls._shared_lock:
+            if cls._guest_instance is None:
+                cls._guest_instance = cls(
+                    message_dao=None,
+                    default_system_prompt="Tu es un assistant utile.",
+                    default_temperature=0.7,
+                    default_max_tokens=512,
+                    timeout=20.0,
+                    response_cache=ResponseCache(
+                        max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "256")),
+                        ttl_seconds=float(os.environ.get("LLM_CACHE_TTL", "3600")),
+                        disk_dir=os.environ.get("LLM_CACHE_DIR") or None,
+                    ),
+                    cache_sampled_responses=os.environ.get("LLM_CACHE_SAMPLED", "0") == "1",
+                )
+            return cls._guest_instance
+
+    @staticmethod
+    def requete_invitee(prompt: str) -> Dict[str, Any]:
+        """
+        Méthode statique pour des requêtes invitées simples.
+        Renvoie {"content": str, "usage": dict}.
+        """
+        guest = LLMService._get_guest_service()
+        history_invitee = guest._build_history_for_prompt(prompt)
+        return guest._cached_call(history_invitee)
 
 
 
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import datetime, timezone
 #from config import AGENT_USER_ID
 AGENT_USER_ID = 6
@@ -101,8 +101,8 @@ class MessageService:
         self.message_dao.delete_by_conversation(conversation_id)
 
     def check_conversation_exists(self, conversation_id: int) -> bool:
-        """Vérifie si une conversation existe."""
-        return self.message_dao.count_messages_by_conversation(conversation_id) >= 0
+        """Vérifie si une conversation existe (lecture de ses compteurs, sans COUNT(*))."""
+        return self.message_dao.get_conversation_stats(conversation_id) is not None
 
     def get_last_message(self, conversation_id: int) -> Optional[Message]:
         """Récupère le dernier message d'une conversation."""
@@ -148,16 +148,67 @@ class MessageService:
         )
         return self.message_dao.create(msg_obj)
 
+    COPY_THRESHOLD = 5000
+
+    def import_messages(
+        self, messages: List[Message], *, use_copy: Optional[bool] = None
+    ) -> List[Message]:
+        """
+        Importe un lot de messages (archive de conversation, rejeu de logs) en
+        une seule transaction et renvoie les objets avec leur id_message.
+        Au-delà de COPY_THRESHOLD messages, le chargement passe par COPY
+        (sauf si ``use_copy`` est précisé).
+        """
+        for m in messages:
+            if not isinstance(m, Message):
+                raise ValueError("Seuls des objets Message peuvent être importés")
+            if not isinstance(m.id_conversation, int) or m.id_conversation < 0:
+                raise ValueError("conversation_id invalide")
+            if not isinstance(m.message, str) or not m.message.strip():
+                raise ValueError("message non fourni")
+            if len(m.message) > 5000:
+                raise ValueError("message trop long")
+        if not messages:
+            return []
+        if use_copy is None:
+            use_copy = len(messages) >= self.COPY_THRESHOLD
+        return self.message_dao.create_many(messages, use_copy=use_copy)
+
     def get_messages_paginated(
-        self, conversation_id: int, page: int = 1, per_page: int = 50
+        self,
+        conversation_id: int,
+        page: int = 1,
+        per_page: int = 50,
+        *,
+        before: Optional[Tuple[datetime, int]] = None,
     ) -> List[Message]:
-        """Retourne une page de messages d'une conversation."""
+        """
+        Retourne une page de messages d'une conversation (ordre récent d'abord).
+
+        Avec ``before`` (curseur renvoyé par ``next_page_cursor``), la page suivante
+        est lue par pagination keyset, à coût constant quelle que soit sa profondeur.
+        ``page`` reste accepté pour compatibilité (LIMIT/OFFSET).
+        """
         if page < 1:
             raise ValueError("Page invalide")
+        if per_page < 1:
+            raise ValueError("per_page invalide")
+        if before is not None or page == 1:
+            return self.message_dao.get_messages_by_conversation_keyset(
+                conversation_id, per_page, before
+            )
         return self.message_dao.get_messages_by_conversation_paginated(
             conversation_id, page, per_page
         )
 
+    @staticmethod
+    def next_page_cursor(messages: List[Message]) -> Optional[Tuple[datetime, int]]:
+        """Curseur ("timestamp", id_message) permettant de lire la page suivante (None si vide)."""
+        if not messages:
+            return None
+        last = messages[-1]
+        return (last.datetime, last.id_message)
+
     def count_messages(self, conversation_id: int) -> int:
         """Compte le nombre de messages dans une conversation."""
         return self.message_dao.count_messages_by_conversation(conversation_id)
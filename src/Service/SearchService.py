@@ -1,74 +1,132 @@
 from datetime import datetime
-from typing import List
+from typing import Any, List, Optional, Tuple
 
 from DAO.CollaborationDAO import CollaborationDAO
 from DAO.ConversationDAO import ConversationDAO
 from DAO.MessageDAO import MessageDAO
 
 from ObjetMetier.Message import Message
-from ObjetMetier.Collaboration import Collaboration
 from ObjetMetier.Conversation import Conversation
+from Utils.date_range import DateLike
 
 
 class SearchService:
     """
     Service dedie a la recherche dans les messages et les conversations.
     Toutes les recherches sont filtrees pour n'afficher que le contenu
-    accessible par l'utilisateur (via CollaborationDAO).
+    accessible par l'utilisateur.
+
+    Les droits sont vérifiés par MessageDAO dans la requête elle-même
+    (semi-jointure sur collaboration) : un aller-retour, résultats paginés
+    (``limit`` + curseur ``before`` = MessageService.next_page_cursor(page précédente)).
+    ``collaboration_dao`` n'est plus interrogé ; il reste accepté pour les appelants existants.
+
+    Les recherches par date utilisent des plages [début, fin[ avec fuseau
+    (celui des dates passées, sinon APP_TIMEZONE) : index sur created_at /
+    (id_conversation, "timestamp").
+
+    Recherche par mot-clé, deux modes :
+      - "substring" : sous-chaîne insensible à la casse (ILIKE, parcours séquentiel) ;
+      - "fulltext"  : mots (racinisation française), index GIN ; résultats
+        classés par pertinence (ts_rank), curseur ``before`` = (score, id_message)
+        du dernier résultat de search_messages_ranked.
     """
 
+    KEYWORD_MODES = ("substring", "fulltext")
+    PAGE_SIZE = 50
+
     def __init__(
         self,
         message_dao: MessageDAO,
         conversation_dao: ConversationDAO,
-        collaboration_dao: CollaborationDAO,
+        collaboration_dao: Optional[CollaborationDAO] = None,
+        keyword_mode: str = "substring",
     ):
+        if keyword_mode not in self.KEYWORD_MODES:
+            raise ValueError(f"keyword_mode invalide : {keyword_mode}")
         self.message_dao = message_dao
         self.conversation_dao = conversation_dao
         self.collaboration_dao = collaboration_dao
+        self.keyword_mode = keyword_mode
 
     # ------------------------------------------------------------------ #
-    # Helper privé pour garantir la sécurité                             #
+    # Recherche dans les MESSAGES (MessageDAO, droits vérifiés en SQL)  #
     # ------------------------------------------------------------------ #
 
-    def _get_user_accessible_conversation_ids(self, user_id: int) -> List[int]:
+    def search_messages_by_keyword(
+        self,
+        user_id: int,
+        keyword: str,
+        *,
+        mode: Optional[str] = None,
+        limit: Optional[int] = None,
+        before: Optional[Tuple[Any, int]] = None,
+    ) -> List[Message]:
         """
-        Récupère les IDs des conversations auxquelles l'utilisateur a accès.
-        Autorise admin/writer/viewer, exclut banni.
+        Recherche des messages par mot-cle limites aux conversations de l'utilisateur,
+        une page de ``limit`` messages : plus récents d'abord ("substring", ``before``
+        = (date, id)) ou plus pertinents d'abord ("fulltext", ``before`` = (score, id)).
+        ``mode`` ("substring" | "fulltext") remplace le mode du service pour cet appel.
         """
-        collaborations: List[Collaboration] = self.collaboration_dao.find_by_user(user_id)
-
-        # Inclure 'reader' pour coller aux tests SearchService
-        allowed_roles = {"ADMIN", "WRITER", "VIEWER"}
-
-        conversation_ids = [
-            c.id_conversation
-            for c in collaborations
-            if isinstance(c.role, str) and c.role.upper() in allowed_roles
-        ]
-        return conversation_ids
-
-    # ------------------------------------------------------------------ #
-    # Recherche dans les MESSAGES (CollaborationDAO + MessageDAO)        #
-    # ------------------------------------------------------------------ #
-
-    def search_messages_by_keyword(self, user_id: int, keyword: str) -> List[Message]:
-        """Recherche des messages par mot-cle limites aux conversations de l'utilisateur."""
+        mode = mode or self.keyword_mode
+        if mode not in self.KEYWORD_MODES:
+            raise ValueError(f"mode de recherche invalide : {mode}")
         if not keyword:
             return []
-        conversation_ids = self._get_user_accessible_conversation_ids(user_id)
-        if not conversation_ids:
+        if mode == "fulltext":
+            hits = self.search_messages_ranked(user_id, keyword, limit=limit or self.PAGE_SIZE, before=before)
+            return [message for message, _, _ in hits]
+        return self.message_dao.search_by_keyword_for_user(
+            user_id,
+            keyword,
+            limit=limit or self.PAGE_SIZE,
+            before=before,
+        )
+
+    def search_messages_ranked(
+        self,
+        user_id: int,
+        keyword: str,
+        limit: int = 50,
+        *,
+        before: Optional[Tuple[float, int]] = None,
+    ) -> List[Tuple[Message, float, str]]:
+        """Recherche plein texte : (message, score, extrait surligné), meilleurs résultats d'abord."""
+        if not keyword:
             return []
-        return self.message_dao.search_by_keyword(keyword, conversation_ids)
+        return self.message_dao.search_fulltext(keyword, limit=limit, user_id=user_id, before=before)
 
-    def search_messages_by_date(self, user_id: int, target_date: datetime) -> List[Message]:
+    def search_messages_by_date(
+        self,
+        user_id: int,
+        target_date: datetime,
+        *,
+        limit: Optional[int] = None,
+        before: Optional[Tuple[datetime, int]] = None,
+    ) -> List[Message]:
         """
         Recherche des messages par date (journée entière), limités aux conversations de l'utilisateur.
         """
-        conversation_ids = self._get_user_accessible_conversation_ids(user_id)
-        if not conversation_ids:
-            return []
-        return self.message_dao.search_by_date(target_date, conversation_ids)
+        return self.message_dao.search_by_date_for_user(
+            user_id, target_date, limit=limit or self.PAGE_SIZE, before=before
+        )
+
+    def search_messages_by_date_range(
+        self,
+        user_id: int,
+        start: DateLike,
+        end: DateLike,
+        *,
+        limit: Optional[int] = None,
+        before: Optional[Tuple[datetime, int]] = None,
+    ) -> List[Message]:
+        """
+        Recherche des messages de la période [start, end[ (une date de fin est incluse
+        en entier), limités aux conversations de l'utilisateur.
+        """
+        return self.message_dao.search_by_date_range_for_user(
+            user_id, start, end, limit=limit or self.PAGE_SIZE, before=before
+        )
 
     # ------------------------------------------------------------------ #
     # Recherche dans les CONVERSATIONS (ConversationDAO)                  #
@@ -89,3 +147,15 @@ class SearchService:
         Recherche des conversations par date de création (journée entière), limitées à celles de l'utilisateur.
         """
         return self.conversation_dao.get_conversations_by_date(user_id, target_date)
+
+    def search_conversations_by_date_range(
+        self,
+        user_id: int,
+        start: DateLike,
+        end: DateLike,
+    ) -> List[Conversation]:
+        """
+        Recherche des conversations créées dans la période [start, end[ (une date de fin
+        est incluse en entier), limitées à celles de l'utilisateur.
+        """
+        return self.conversation_dao.get_conversations_by_date_range(user_id, start, end)
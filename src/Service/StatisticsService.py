@@ -1,4 +1,4 @@
-from typing import List, Optional, Dict, Tuple, TYPE_CHECKING
+from typing import Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
 import datetime
 
 # -----------------------------
@@ -23,12 +23,14 @@ if TYPE_CHECKING:
     from DAO.ConversationDAO import ConversationDAO
     from DAO.CollaborationDAO import CollaborationDAO
     from DAO.UserDAO import UserDAO
+    from DAO.UsageRollupDAO import UsageRollupDAO
     from Service.UserService import UserService
 else:
     MessageDAO = object  # type: ignore
     ConversationDAO = object  # type: ignore
     CollaborationDAO = object  # type: ignore
     UserDAO = object  # type: ignore
+    UsageRollupDAO = object  # type: ignore
     UserService = object  # type: ignore
 
 
@@ -37,15 +39,22 @@ else:
 # ===================================================================
 class StatisticsService:
     """
-    Service fournissant diverses statistiques d’utilisation :
+    Service fournissant diverses statistiques d’utilisation.
+    Chaque statistique est une requête d'agrégat du DAO (COUNT, GROUP BY, AVG)
+    quand il la fournit ; le calcul en Python sur des listes de messages
+    n'est qu'un repli pour des DAO minimaux :
       - nb_conv(user_id)
       - nb_messages(user_id)
       - nb_message_conv(conversation_id)
       - nb_messages_de_user_par_conv(user_id, conversation_id)
       - temps_passe(user_id)
       - temps_passe_par_conv(user_id, conversation_id)
+      - temps_passe_detail(user_id)
       - top_active_users(limit)
       - average_message_length()
+      - usage_par_jour / usage_conversation_par_jour / usage_periode /
+        top_active_users_periode : sur une période, lus dans les agrégats
+        quotidiens usage_daily (usage_dao) au lieu des messages
     """
 
     def __init__(
@@ -56,6 +65,7 @@ class StatisticsService:
         user_dao: Optional[UserDAO] = None,
         user_service: Optional[UserService] = None,
         idle_threshold: datetime.timedelta = datetime.timedelta(minutes=10),
+        usage_dao: Optional[UsageRollupDAO] = None,
     ):
         self.message_dao = message_dao
         self.conversation_dao = conversation_dao
@@ -63,6 +73,7 @@ class StatisticsService:
         self.user_dao = user_dao
         self.user_service = user_service
         self.idle_threshold = idle_threshold
+        self.usage_dao = usage_dao
 
     # ------------------------------------------------------------
     #                       UTILITAIRES
@@ -110,6 +121,13 @@ class StatisticsService:
                 except Exception:
                     pass
 
+        fn_count = self._get_callable(self.message_dao, "count_conversations_by_user")
+        if fn_count:
+            try:
+                return int(fn_count(user_id))
+            except Exception:
+                pass
+
         fn_msgs_user = self._get_callable(
             self.message_dao,
             "get_messages_by_user",
@@ -182,9 +200,14 @@ class StatisticsService:
             msgs: List[Message] = fn_get_user_conv(conversation_id, user_id)
             return len(msgs)
 
-        fn_get_conv = self._get_callable(self.message_dao, "get_messages_by_conversation", "get_by_conversation")
+        fn_get_conv = self._get_callable(
+            self.message_dao,
+            "iter_messages_by_conversation",
+            "get_messages_by_conversation",
+            "get_by_conversation",
+        )
         if fn_get_conv:
-            msgs: List[Message] = fn_get_conv(conversation_id)
+            msgs: Iterable[Message] = fn_get_conv(conversation_id)
             return sum(1 for m in msgs if int(getattr(m, "id_user", -1)) == user_id)
 
         raise RuntimeError("Aucune méthode DAO compatible pour nb_messages_de_user_par_conv")
@@ -199,6 +222,10 @@ class StatisticsService:
             timestamps = self._get_sorted_timestamps_for_user(user_id)
             return self._compute_sessions_duration(timestamps, simple_window=True)
 
+        durations = self._sql_session_durations(user_id)
+        if durations is not None:
+            return durations[0]
+
         total = datetime.timedelta(0)
         conv_ids = self._get_conversation_ids_of_user(user_id)
 
@@ -217,9 +244,28 @@ class StatisticsService:
     ) -> datetime.timedelta:
         self._validate_id("user_id", user_id)
         self._validate_id("conversation_id", conversation_id)
+        if not simple_window:
+            durations = self._sql_session_durations(user_id, conversation_id)
+            if durations is not None:
+                return durations[0]
         timestamps = self._get_sorted_timestamps_for_user_in_conv(user_id, conversation_id)
         return self._compute_sessions_duration(timestamps, simple_window=simple_window)
 
+    def temps_passe_detail(
+        self, user_id: int
+    ) -> Tuple[datetime.timedelta, Dict[int, datetime.timedelta]]:
+        """Temps passé total et par conversation : (total, {id_conversation: durée})."""
+        self._validate_id("user_id", user_id)
+        durations = self._sql_session_durations(user_id)
+        if durations is not None:
+            return durations
+
+        per_conv = {
+            cid: self._compute_sessions_duration(self._get_sorted_timestamps_for_user_in_conv(user_id, cid))
+            for cid in self._get_conversation_ids_of_user(user_id)
+        }
+        return sum(per_conv.values(), datetime.timedelta(0)), per_conv
+
     # ------------------------------------------------------------
     #                        AGRÉGATS
     # ------------------------------------------------------------
@@ -268,9 +314,66 @@ class StatisticsService:
 
         raise RuntimeError("Aucune méthode DAO compatible pour average_message_length")
 
+    # ------------------------------------------------------------
+    #             AGRÉGATS QUOTIDIENS (table usage_daily)
+    # ------------------------------------------------------------
+    def _usage_callable(self, name: str):
+        fn = self._get_callable(self.usage_dao, name) if self.usage_dao else None
+        if not fn:
+            raise RuntimeError(f"Aucun DAO d'agrégats quotidiens fournissant {name}")
+        return fn
+
+    @staticmethod
+    def _validate_period(debut: datetime.date, fin: datetime.date) -> None:
+        if not isinstance(debut, datetime.date) or not isinstance(fin, datetime.date):
+            raise ValueError("debut et fin doivent être des dates")
+        if fin < debut:
+            raise ValueError("fin doit être postérieure ou égale à debut")
+
+    def usage_par_jour(self, user_id: int, debut: datetime.date, fin: datetime.date) -> List[Dict]:
+        """Activité de l'utilisateur jour par jour, de ``debut`` à ``fin`` inclus."""
+        self._validate_id("user_id", user_id)
+        self._validate_period(debut, fin)
+        return list(self._usage_callable("get_user_daily")(user_id, debut, fin))
+
+    def usage_conversation_par_jour(
+        self, conversation_id: int, debut: datetime.date, fin: datetime.date
+    ) -> List[Dict]:
+        self._validate_id("conversation_id", conversation_id)
+        self._validate_period(debut, fin)
+        return list(self._usage_callable("get_conversation_daily")(conversation_id, debut, fin))
+
+    def usage_periode(self, user_id: int, debut: datetime.date, fin: datetime.date) -> Dict:
+        """Totaux de la période : messages (agent / humain), caractères, temps de session, jours actifs."""
+        self._validate_id("user_id", user_id)
+        self._validate_period(debut, fin)
+        return dict(self._usage_callable("get_user_totals")(user_id, debut, fin))
+
+    def top_active_users_periode(
+        self, debut: datetime.date, fin: datetime.date, limit: int = 10
+    ) -> List[Tuple[int, int]]:
+        if limit <= 0:
+            raise ValueError("limit doit être > 0")
+        self._validate_period(debut, fin)
+        rows = self._usage_callable("get_top_users")(debut, fin, limit)
+        return [(int(uid), int(n)) for uid, n in rows]
+
     # ------------------------------------------------------------
     #                MÉTHODES INTERNES D’AIDE
     # ------------------------------------------------------------
+    def _sql_session_durations(
+        self, user_id: int, conversation_id: Optional[int] = None
+    ) -> Optional[Tuple[datetime.timedelta, Dict[int, datetime.timedelta]]]:
+        # Sessions calculées en une requête (LAG() par conversation), sans charger les messages
+        fn = self._get_callable(self.message_dao, "get_session_durations")
+        if not fn:
+            return None
+        try:
+            total, per_conv = fn(user_id, self.idle_threshold, conversation_id)
+        except Exception:
+            return None
+        return total, dict(per_conv)
+
     def _get_sorted_timestamps_for_user(self, user_id: int) -> List[datetime.datetime]:
         fn = self._get_callable(self.message_dao, "get_messages_by_user", "get_by_user", "get_messages_for_user")
         if fn:
@@ -302,9 +405,15 @@ class StatisticsService:
                 key=lambda t: t,
             )
 
-        fn_conv = self._get_callable(self.message_dao, "get_messages_by_conversation", "get_by_conversation")
+        fn_conv = self._get_callable(
+            self.message_dao,
+            "iter_messages_by_conversation",
+            "get_messages_by_conversation",
+            "get_by_conversation",
+        )
         if fn_conv:
-            msgs: List[Message] = fn_conv(conversation_id)
+            # En flux si possible : seuls les timestamps de l'utilisateur sont conservés
+            msgs: Iterable[Message] = fn_conv(conversation_id)
             return sorted(
                 [
                     m.datetime
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ResponseCache:
+    """
+    Cache de réponses LLM à deux niveaux :
+      - mémoire : LRU borné (max_entries) avec TTL ;
+      - disque (optionnel) : un fichier JSON par clé dans ``disk_dir``,
+        avec TTL et éviction des plus anciens au-delà de ``max_disk_entries``.
+
+    La clé est dérivée de l'historique normalisé et des paramètres
+    d'échantillonnage (voir ``make_key``). Les compteurs ``hits`` / ``misses``
+    permettent de suivre l'efficacité du cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: Optional[float] = 3600.0,
+        disk_dir: Optional[str] = None,
+        max_disk_entries: int = 10_000,
+    ) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries doit être > 0")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        # nombre de fichiers sur disque, compté une fois puis tenu à jour à chaque écriture
+        self._disk_count: Optional[int] = None
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Clé
+    # ------------------------------------------------------------------
+    @staticmethod
+    def make_key(history: List[Dict[str, str]], **params: Any) -> str:
+        """Empreinte SHA-256 de l'historique normalisé (rôle, contenu sans espaces superflus) et des paramètres."""
+        normalized = [
+            {
+                "role": str(m.get("role", "")).strip().lower(),
+                "content": " ".join(str(m.get("content", "")).split()),
+            }
+            for m in history
+        ]
+        raw = json.dumps({"history": normalized, "params": params}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------
+    # Lecture / écriture
+    # ------------------------------------------------------------------
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Any]:
+        """Renvoie la valeur en cache (mémoire puis disque) ou None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if not self._expired(stored_at):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        entry = self._disk_get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            stored_at, value = entry
+            self._remember(key, value, stored_at)  # le TTL court depuis l'écriture sur disque
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Stocke une valeur (sérialisable en JSON) dans les deux niveaux."""
+        with self._lock:
+            self._remember(key, value)
+        self._disk_set(key, value)
+
+    def _remember(self, key: str, value: Any, stored_at: Optional[float] = None) -> None:
+        self._entries[key] = (time.time() if stored_at is None else stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Vide le niveau mémoire et remet les compteurs à zéro (le disque est conservé)."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+    # ------------------------------------------------------------------
+    # Niveau disque
+    # ------------------------------------------------------------------
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir or "", f"{key}.json")
+
+    def _disk_get(self, key: str) -> Optional[Tuple[float, Any]]:
+        """(date d'écriture, valeur) depuis le disque, ou None."""
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if self._expired(stored_at):
+                os.remove(path)
+                return None
+            with open(path, encoding="utf-8") as f:
+                return stored_at, json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _disk_set(self, key: str, value: Any) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp = None
+        try:
+            # fichier temporaire unique : plusieurs écrivains de la même clé ne se marchent pas dessus
+            fd, tmp = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            is_new = not os.path.exists(path)
+            os.replace(tmp, path)
+            tmp = None
+        except OSError:
+            if tmp is not None:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+            return
+        with self._lock:
+            if self._disk_count is None:
+                self._disk_count = self._count_disk_files()
+            elif is_new:
+                self._disk_count += 1
+            over = self._disk_count > self.max_disk_entries
+        if over:
+            self._disk_evict()
+
+    def _count_disk_files(self) -> int:
+        try:
+            return sum(1 for name in os.listdir(self.disk_dir) if name.endswith(".json"))
+        except OSError:
+            return 0
+
+    def _disk_evict(self) -> None:
+        """Supprime les fichiers les plus anciens au-delà de max_disk_entries (appelé quand le compteur déborde)."""
+        try:
+            files = [
+                os.path.join(self.disk_dir, name)
+                for name in os.listdir(self.disk_dir)
+                if name.endswith(".json")
+            ]
+        except OSError:
+            return
+        excess = len(files) - self.max_disk_entries
+        if excess > 0:
+            files.sort(key=os.path.getmtime)
+            for path in files[:excess]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        with self._lock:
+            self._disk_count = min(len(files), self.max_disk_entries)
@@ -0,0 +1,221 @@
+"""
+Export analytique des messages en colonnes (Parquet / Arrow IPC).
+
+Le flux texte de ``COPY ... TO STDOUT`` (MessageDAO.copy_messages_out) est
+décodé ligne à ligne et écrit par groupes de ``row_group_size`` lignes : la
+mémoire reste bornée par la taille d'un groupe, quel que soit le volume.
+
+pyarrow et numpy sont optionnels (``pdm install -G analytics``) : seuls
+l'écriture / la lecture des fichiers et les métriques vectorisées en ont besoin.
+"""
+import contextlib
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # dépendance optionnelle
+    np = None  # type: ignore
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # dépendance optionnelle
+    pa = pa_ipc = pq = None  # type: ignore
+
+# Ordre des colonnes produites par MessageDAO.COPY_EXPORT_COLUMNS (+ message en option)
+COPY_COLUMNS = ("id_message", "id_conversation", "id_user", "timestamp", "is_from_agent", "message_length")
+FORMATS = ("parquet", "arrow")
+
+_ESCAPE = re.compile(r"\\(.)")
+_UNESCAPED = {"b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v"}
+_NULL = "\\N"
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("numpy est requis pour les statistiques en colonnes (pdm install -G analytics)")
+
+
+def require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("pyarrow est requis pour l'export en colonnes (pdm install -G analytics)")
+
+
+def _unescape(value: str) -> str:
+    if "\\" not in value:
+        return value
+    return _ESCAPE.sub(lambda m: _UNESCAPED.get(m.group(1), m.group(1)), value)
+
+
+def parse_copy_line(line: str, include_text: bool = False) -> tuple:
+    """
+    Décode une ligne du format texte de COPY (séparateur tabulation, NULL = \\N,
+    retours à la ligne et tabulations échappés) en tuple typé.
+    """
+    fields = line.split("\t")
+    id_message, id_conversation, id_user, ts, agent, length = fields[:6]
+    row = (
+        int(id_message),
+        int(id_conversation),
+        None if id_user == _NULL else int(id_user),
+        int(ts),
+        agent == "t",
+        int(length),
+    )
+    if include_text:
+        row += (_unescape(fields[6]),)
+    return row
+
+
+class CopyLineDecoder:
+    """
+    Objet « fichier » passé à ``cursor.copy_expert`` : reçoit des blocs
+    arbitraires (octets ou texte), en extrait les lignes complètes et transmet
+    les tuples décodés à ``on_rows`` par paquets de ``batch_rows``. Une ligne
+    COPY ne contient jamais de retour à la ligne brut (il est échappé).
+    """
+
+    def __init__(self, on_rows: Callable[[List[tuple]], None], *, batch_rows: int, include_text: bool = False):
+        if batch_rows < 1:
+            raise ValueError("batch_rows invalide")
+        self._on_rows = on_rows
+        self._batch_rows = batch_rows
+        self._include_text = include_text
+        self._pending = b""
+        self._rows: List[tuple] = []
+        self.rows_written = 0
+
+    def write(self, data: Any) -> int:
+        chunk = data.encode("utf-8") if isinstance(data, str) else bytes(data)
+        buf = self._pending + chunk
+        cut = buf.rfind(b"\n")
+        if cut < 0:
+            self._pending = buf
+            return len(data)
+        # b"\n" n'apparaît jamais au milieu d'un caractère UTF-8 multi-octets
+        self._pending = buf[cut + 1:]
+        for line in buf[:cut].decode("utf-8").split("\n"):
+            self._rows.append(parse_copy_line(line, self._include_text))
+            if len(self._rows) >= self._batch_rows:
+                self._emit()
+        return len(data)
+
+    def _emit(self) -> None:
+        if self._rows:
+            self._on_rows(self._rows)
+            self.rows_written += len(self._rows)
+            self._rows = []
+
+    def flush(self) -> None:
+        if self._pending:
+            self._rows.append(parse_copy_line(self._pending.decode("utf-8").rstrip("\n"), self._include_text))
+            self._pending = b""
+        self._emit()
+
+    def discard(self) -> None:
+        """Abandonne la ligne partielle et les lignes non encore transmises (flux interrompu)."""
+        self._pending = b""
+        self._rows = []
+
+
+def message_schema(include_text: bool = False) -> "pa.Schema":
+    require_pyarrow()
+    fields = [
+        pa.field("id_message", pa.int64(), nullable=False),
+        pa.field("id_conversation", pa.int64(), nullable=False),
+        pa.field("id_user", pa.int64()),
+        pa.field("timestamp", pa.timestamp("us", tz="UTC"), nullable=False),
+        pa.field("is_from_agent", pa.bool_(), nullable=False),
+        pa.field("message_length", pa.int32(), nullable=False),
+    ]
+    if include_text:
+        fields.append(pa.field("message", pa.string(), nullable=False))
+    return pa.schema(fields)
+
+
+class MessageColumnsWriter(CopyLineDecoder):
+    """
+    Décodeur COPY qui écrit chaque paquet de lignes comme un groupe de lignes
+    Parquet (``fmt="parquet"``) ou un lot Arrow IPC (``fmt="arrow"``).
+
+        with MessageColumnsWriter("messages.parquet") as sink:
+            MessageDAO().copy_messages_out(sink)
+    """
+
+    def __init__(self, path: str, *, fmt: str = "parquet", row_group_size: int = 100_000, include_text: bool = False):
+        require_pyarrow()
+        if fmt not in FORMATS:
+            raise ValueError(f"format inconnu : {fmt} (attendu : {', '.join(FORMATS)})")
+        super().__init__(self._write_rows, batch_rows=row_group_size, include_text=include_text)
+        self.path = path
+        self.schema = message_schema(include_text)
+        self._parquet = fmt == "parquet"
+        if self._parquet:
+            self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            self._writer = pa_ipc.new_file(path, self.schema)
+
+    def _write_rows(self, rows: List[tuple]) -> None:
+        columns = [list(col) for col in zip(*rows)]
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema,
+        )
+        if self._parquet:
+            self._writer.write_table(pa.Table.from_batches([batch]))  # un groupe de lignes par paquet
+        else:
+            self._writer.write_batch(batch)
+
+    def close(self) -> int:
+        """Écrit le dernier groupe et ferme le fichier ; retourne le nombre de lignes."""
+        self.flush()
+        self._writer.close()
+        return self.rows_written
+
+    def abort(self) -> None:
+        """
+        Flux COPY interrompu : la ligne partielle n'est pas décodée, le fichier
+        (valide mais tronqué) est supprimé. Ne lève pas, pour laisser remonter
+        l'erreur d'origine.
+        """
+        self.discard()
+        with contextlib.suppress(Exception):
+            self._writer.close()
+        with contextlib.suppress(OSError):
+            os.remove(self.path)
+
+    def __enter__(self) -> "MessageColumnsWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+def read_message_columns(path: str, columns: Optional[Sequence[str]] = None) -> Dict[str, "np.ndarray"]:
+    """
+    Charge un export (Parquet ou Arrow IPC) en tableaux NumPy : horodatages en
+    microsecondes (int64), id_user NULL -> 0 (auteur supprimé).
+    """
+    require_pyarrow()
+    require_numpy()
+    wanted = list(columns or COPY_COLUMNS)
+    if path.endswith((".arrow", ".feather", ".ipc")):
+        with pa.memory_map(path) as source:
+            table = pa_ipc.open_file(source).read_all().select(wanted)
+    else:
+        table = pq.read_table(path, columns=wanted)
+    out: Dict[str, np.ndarray] = {}
+    for name in wanted:
+        col = table.column(name)
+        if name == "timestamp":
+            col = col.cast(pa.int64())
+        elif name == "id_user":
+            col = col.fill_null(0)
+        out[name] = col.to_numpy()
+    return out
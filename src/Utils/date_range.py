@@ -0,0 +1,61 @@
+import os
+from datetime import date, datetime, time, timedelta, tzinfo
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+from zoneinfo import ZoneInfo
+
+DateLike = Union[date, datetime]
+
+
+@lru_cache(maxsize=None)
+def _zone(name: str) -> tzinfo:
+    return ZoneInfo(name)
+
+
+def app_timezone() -> tzinfo:
+    """Fuseau de l'application (variable APP_TIMEZONE, UTC par défaut)."""
+    return _zone(os.getenv("APP_TIMEZONE") or "UTC")
+
+
+def to_aware(value: DateLike, tz: Optional[tzinfo] = None) -> datetime:
+    """
+    Convertit une date ou un datetime en datetime avec fuseau.
+    Une date donne minuit ; un datetime naïf est interprété dans ``tz``
+    (fuseau de l'application par défaut) ; un datetime avec fuseau est inchangé.
+    """
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time.min)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=tz or app_timezone())
+    return value
+
+
+def day_bounds(day: DateLike, tz: Optional[tzinfo] = None) -> Tuple[datetime, datetime]:
+    """
+    Bornes [début, fin[ de la journée calendaire de ``day`` (à utiliser en
+    ``col >= début AND col < fin``, ce qui reste indexable). Le fuseau est
+    celui de ``day`` s'il en a un, sinon ``tz`` / celui de l'application ;
+    les jours de 23 h ou 25 h (changement d'heure) sont respectés.
+    """
+    if isinstance(day, datetime) and day.tzinfo is not None:
+        tz = day.tzinfo
+    tz = tz or app_timezone()
+    d = day.date() if isinstance(day, datetime) else day
+    start = datetime.combine(d, time.min, tzinfo=tz)
+    end = datetime.combine(d + timedelta(days=1), time.min, tzinfo=tz)
+    return start, end
+
+
+def range_bounds(
+    start: DateLike, end: DateLike, tz: Optional[tzinfo] = None
+) -> Tuple[datetime, datetime]:
+    """
+    Bornes [start, end[ avec fuseau. Une ``date`` de fin est incluse en entier
+    (la borne devient le lendemain à minuit).
+    """
+    if end is not None and not isinstance(end, datetime):
+        end = end + timedelta(days=1)
+    lo, hi = to_aware(start, tz), to_aware(end, tz)
+    if hi <= lo:
+        raise ValueError("La fin de la période doit être postérieure au début")
+    return lo, hi
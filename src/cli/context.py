@@ -36,7 +36,9 @@ msg_service = MessageService(
 conv_service = ConversationService(
     conversation_dao, collab_service, user_service, msg_service
 )
-search_service = SearchService(message_dao, conversation_dao, collab_dao)
+search_service = SearchService(
+    message_dao, conversation_dao, collab_dao, keyword_mode="fulltext"
+)
 feedback_service = FeedbackService(feedback_dao)
 
 llm_service = LLMService(
@@ -7,6 +7,7 @@ from cli.ui import (
     session,
     ask_int,
     ask_nonempty,
+    ask_yes_no,
     BackCommand,
     QuitCommand,
     ensure_logged_in,
@@ -53,10 +54,11 @@ def page_conversation(conv_id: int) -> None:
         print("5) Collaborateurs")
         print("6) Partager la conversation")
         print("7) Actions (supprimer/archiver/restaurer)")
+        print("8) Afficher les messages plus anciens")
         print("9) Retour")
         print("0) Quitter")
         try:
-            choice = ask_int("Votre choix", [1, 2, 3, 4, 5, 6, 7, 9, 0])
+            choice = ask_int("Votre choix", [1, 2, 3, 4, 5, 6, 7, 8, 9, 0])
         except BackCommand:
             return
         if choice == 1:
@@ -75,6 +77,8 @@ def page_conversation(conv_id: int) -> None:
             collaboration.share_conversation(conv_id)
         elif choice == 7:
             conversation_actions(conv_id)
+        elif choice == 8:
+            show_older_messages(conv_id, msg_service.next_page_cursor(messages))
         elif choice == 9:
             return
         elif choice == 0:
@@ -98,6 +102,27 @@ def display_messages(messages: List) -> None:
         print(f"[{timestamp}] ({message.id_message}) {author}: {message.message}")
 
 
+def show_older_messages(conv_id: int, cursor, per_page: int = 20) -> None:
+    """Remonte l'historique page par page (pagination keyset a partir de cursor)."""
+    while cursor is not None:
+        try:
+            older = msg_service.get_messages_paginated(conv_id, per_page=per_page, before=cursor)
+        except Exception as exc:
+            print(f"Impossible de recuperer les messages: {exc}")
+            return
+        if not older:
+            print("Debut de la conversation.")
+            return
+        display_messages(older)
+        cursor = msg_service.next_page_cursor(older)
+        try:
+            if not ask_yes_no("Afficher les messages encore plus anciens ?"):
+                return
+        except BackCommand:
+            return
+    print("Aucun message plus ancien.")
+
+
 def send_user_message(conv_id: int) -> None:
     try:
         content = ask_nonempty("Votre message")
@@ -110,13 +135,17 @@ def send_user_message(conv_id: int) -> None:
         print(f"Echec d'envoi: {exc}")
         return
 
-    # réponse LLM
+    # réponse LLM, affichée au fil de l'eau
+    print("Agent: ", end="", flush=True)
     try:
-        llm_service.generate_agent_reply(
+        for chunk in llm_service.stream_agent_reply(
             conversation_id=conv_id,
             user_id=session.current_user_id,
-        )
+        ):
+            print(chunk, end="", flush=True)
+        print()
     except Exception as e:
+        print()
         # fallback : message agent minimal si l’appel HTTP fail
         msg_service.send_agent_message(conv_id, f"[LLM indisponible] {e}")
     print("Message envoye.")
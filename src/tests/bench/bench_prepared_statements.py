@@ -0,0 +1,87 @@
+# src/tests/bench/bench_prepared_statements.py
+"""
+Latence des lectures chaudes avec / sans requêtes préparées (execute_prepared).
+
+Nécessite une vraie base PostgreSQL (DATABASE_URL, connexion directe : derrière
+PgBouncer en mode transaction les requêtes préparées sont désactivées d'office) :
+    cd src && python -m tests.bench.bench_prepared_statements [--iterations 2000]
+
+Chaque lecture (UserDAO.read, ConversationDAO.has_access, MessageDAO.get_by_id)
+est exécutée --iterations fois avec DB_PREPARED_STATEMENTS=0 puis =1, sur des
+identifiants existants ; on affiche p50 / p95 en millisecondes.
+"""
+import argparse
+import os
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+from DAO.ConversationDAO import ConversationDAO
+from DAO.DBConnector import DBConnection
+from DAO.MessageDAO import MessageDAO
+from DAO.UserDAO import UserDAO
+
+
+def _sample_ids() -> Dict[str, int]:
+    """Un message existant, sa conversation et un collaborateur de celle-ci."""
+    query = """
+        SELECT m.id_message, m.id_conversation, c.id_user
+          FROM message m
+          JOIN collaboration c ON c.id_conversation = m.id_conversation
+         ORDER BY m.id_message DESC
+         LIMIT 1;
+    """
+    with DBConnection(readonly=True, use_replica=False).connection as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query)
+            row = cursor.fetchone()
+    if not row:
+        raise SystemExit("Base vide : il faut au moins un message dans une conversation partagée.")
+    return dict(row) if isinstance(row, dict) else dict(zip(("id_message", "id_conversation", "id_user"), row))
+
+
+def _timings(call: Callable[[], object], iterations: int) -> List[float]:
+    for _ in range(min(50, iterations)):  # chauffe : pool, PREPARE, caches
+        call()
+    out = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        call()
+        out.append((time.perf_counter() - start) * 1000)
+    return out
+
+
+def _percentile(values: List[float], q: int) -> float:
+    return statistics.quantiles(values, n=100)[q - 1]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tests.bench.bench_prepared_statements", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    ids = _sample_ids()
+    reads = {
+        "UserDAO.read": lambda: UserDAO().read(ids["id_user"]),
+        "ConversationDAO.has_access": lambda: ConversationDAO().has_access(ids["id_conversation"], ids["id_user"]),
+        "MessageDAO.get_by_id": lambda: MessageDAO().get_by_id(ids["id_message"]),
+    }
+    previous = os.environ.get("DB_PREPARED_STATEMENTS")
+    try:
+        print(f"{'lecture':<28} {'mode':<10} {'p50 ms':>8} {'p95 ms':>8}")
+        for name, call in reads.items():
+            for mode, flag in (("simple", "0"), ("préparée", "1")):
+                os.environ["DB_PREPARED_STATEMENTS"] = flag
+                t = _timings(call, args.iterations)
+                print(f"{name:<28} {mode:<10} {statistics.median(t):8.3f} {_percentile(t, 95):8.3f}")
+    finally:
+        if previous is None:
+            os.environ.pop("DB_PREPARED_STATEMENTS", None)
+        else:
+            os.environ["DB_PREPARED_STATEMENTS"] = previous
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
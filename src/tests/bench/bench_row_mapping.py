@@ -0,0 +1,71 @@
+# src/tests/bench/bench_row_mapping.py
+"""
+Débit de conversion lignes → Message (objets/s), sans base de données :
+    cd src && python -m tests.bench.bench_row_mapping [--rows 200000] [--repeat 5]
+
+- « dict + __init__ » : chemin d'origine, une ligne dict par message (ce que
+  construit RealDictCursor) puis Message(...) avec ses vérifications de types ;
+- « tuple + from_row » : chemin actuel, MessageDAO._row_to_message sur les
+  tuples de TupleCursor (ordre de MESSAGE_COLUMNS).
+
+Message ayant désormais __slots__, les deux chemins en profitent : l'écart
+mesuré ne compte que la construction des dicts et les vérifications.
+"""
+import argparse
+import timeit
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from DAO.MessageDAO import MessageDAO
+from ObjetMetier.Message import Message
+
+COLUMNS = ("id_message", "id_conversation", "id_user", "timestamp", "message", "is_from_agent")
+
+
+def _rows(n: int) -> List[tuple]:
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        (i, 1 + i % 50, None if i % 7 == 0 else 1 + i % 3, start + timedelta(seconds=i), f"message {i}", i % 2 == 0)
+        for i in range(1, n + 1)
+    ]
+
+
+def _dict_init(rows: List[tuple]) -> List[Message]:
+    out = []
+    for row in rows:
+        d = dict(zip(COLUMNS, row))
+        out.append(Message(
+            id_message=d["id_message"],
+            id_conversation=d["id_conversation"],
+            id_user=d["id_user"],
+            datetime=d["timestamp"],
+            message=d["message"],
+            is_from_agent=d["is_from_agent"],
+        ))
+    return out
+
+
+def _tuple_from_row(rows: List[tuple]) -> List[Message]:
+    to_message = MessageDAO._row_to_message
+    return [to_message(row) for row in rows]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tests.bench.bench_row_mapping", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    rows = _rows(args.rows)
+    results = {}
+    for name, fn in (("dict + __init__", _dict_init), ("tuple + from_row", _tuple_from_row)):
+        best = min(timeit.repeat(lambda fn=fn: fn(rows), number=1, repeat=args.repeat))
+        results[name] = args.rows / best
+        print(f"{name:<18} {results[name] / 1e6:6.2f} M objets/s")
+    print(f"gain : x{results['tuple + from_row'] / results['dict + __init__']:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -91,39 +91,25 @@ def test_settings_raises_if_database_url_missing(monkeypatch):
 # Tests INIT DB (unitaires via mocks)
 # ======================================================
 
-def test_init_db_executes_schema_then_commit(monkeypatch):
+def test_init_db_applies_pending_migrations(monkeypatch):
     import Database.init_db as initdb
 
-    fake_cur = MagicMock()
-    fake_conn_ctx = MagicMock()
-    fake_conn_ctx.__enter__.return_value = fake_conn_ctx
-    fake_conn_ctx.__exit__.return_value = False
-    fake_conn_ctx.cursor.return_value.__enter__.return_value = fake_cur
-
-    with patch("Database.init_db.psycopg2.connect", return_value=fake_conn_ctx):
+    with patch.object(initdb, "MigrationRunner") as Runner:
+        Runner.return_value.apply.return_value = []
         initdb.init_db_for_url("postgres://dsn")
 
-    fake_cur.execute.assert_called_once()        # SCHEMA_SQL exécuté
-    fake_conn_ctx.commit.assert_called_once()    # commit ok
-    fake_conn_ctx.rollback.assert_not_called()
+    Runner.assert_called_once_with("postgres://dsn")
+    Runner.return_value.apply.assert_called_once_with()
 
 
-def test_init_db_rolls_back_on_error(monkeypatch):
+def test_init_db_reports_migration_error(monkeypatch, capsys):
     import Database.init_db as initdb
 
-    fake_cur = MagicMock()
-    fake_cur.execute.side_effect = RuntimeError("sql error")
-
-    fake_conn_ctx = MagicMock()
-    fake_conn_ctx.__enter__.return_value = fake_conn_ctx
-    fake_conn_ctx.__exit__.return_value = False
-    fake_conn_ctx.cursor.return_value.__enter__.return_value = fake_cur
-
-    with patch("Database.init_db.psycopg2.connect", return_value=fake_conn_ctx):
+    with patch.object(initdb, "MigrationRunner") as Runner:
+        Runner.return_value.apply.side_effect = RuntimeError("sql error")
         initdb.init_db_for_url("postgres://dsn")
 
-    fake_conn_ctx.rollback.assert_called_once()
-    fake_conn_ctx.commit.assert_not_called()
+    assert "sql error" in capsys.readouterr().out
 
 
 # ======================================================
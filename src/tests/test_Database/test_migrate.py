@@ -0,0 +1,216 @@
+# src/tests/test_Database/test_migrate.py
+from unittest.mock import MagicMock
+
+import pytest
+
+from Database.migrate import (
+    MIGRATIONS_DIR,
+    MigrationRunner,
+    load_migrations,
+    main,
+    split_statements,
+)
+
+
+def _write(tmp_path, files):
+    for name, sql in files.items():
+        (tmp_path / name).write_text(sql, encoding="utf-8")
+    return str(tmp_path)
+
+
+def _fake_connect(applied=()):
+    """Connexion factice : schema_migrations contient ``applied`` (version, checksum)."""
+    cur = MagicMock()
+    cur.fetchall.return_value = [(v, c, None) for v, c in applied]
+    cur.fetchone.return_value = None
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cur
+    return MagicMock(return_value=conn), conn, cur
+
+
+def _executed(cur):
+    return [c.args[0] for c in cur.execute.call_args_list]
+
+
+def test_split_statements_ignores_semicolons_in_strings_comments_and_dollar_blocks():
+    sql = """
+    -- commentaire ; ignoré
+    CREATE TABLE t (x TEXT DEFAULT 'a;b');
+    DO $$ BEGIN PERFORM 1; END $$;
+    SELECT "we;ird" FROM t
+    """
+    assert split_statements(sql) == [
+        "CREATE TABLE t (x TEXT DEFAULT 'a;b')",
+        "DO $$ BEGIN PERFORM 1; END $$",
+        'SELECT "we;ird" FROM t',
+    ]
+
+
+def test_load_migrations_orders_versions_and_detects_no_transaction(tmp_path):
+    d = _write(tmp_path, {
+        "0002_index.sql": "-- migrate: no-transaction\nCREATE INDEX CONCURRENTLY IF NOT EXISTS i ON t(x);",
+        "0001_init.sql": "CREATE TABLE t (x INT);",
+        "README.md": "ignoré",
+    })
+    migrations = load_migrations(d)
+    assert [m.version for m in migrations] == ["0001", "0002"]
+    assert migrations[0].transactional and not migrations[1].transactional
+
+    (tmp_path / "0002_other.sql").write_text("SELECT 1;")
+    with pytest.raises(ValueError):
+        load_migrations(d)
+
+
+def test_shipped_migrations_load_and_indexes_are_concurrent():
+    migrations = load_migrations(MIGRATIONS_DIR)
+    assert migrations[0].version == "0001"
+    for m in migrations:
+        if not m.transactional:
+            for stmt in m.statements():
+                assert "CONCURRENTLY" in stmt
+
+
+def test_apply_runs_pending_in_order_and_records_them(tmp_path):
+    d = _write(tmp_path, {
+        "0001_init.sql": "CREATE TABLE t (x INT);",
+        "0002_col.sql": "ALTER TABLE t ADD COLUMN y INT;",
+        "0003_index.sql": "-- migrate: no-transaction\n"
+                          "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_t_x ON t(x);\n"
+                          "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_t_y ON t(y);\n",
+    })
+    first = load_migrations(d)[0]
+    connect, conn, cur = _fake_connect(applied=[("0001", first.checksum)])
+
+    done = MigrationRunner("postgres://dsn", d, connect=connect).apply()
+
+    assert [m.version for m in done] == ["0002", "0003"]
+    sqls = _executed(cur)
+    assert "CREATE TABLE t (x INT);" not in sqls
+    assert sqls.index("ALTER TABLE t ADD COLUMN y INT;") < sqls.index(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_t_x ON t(x)"
+    )
+    inserts = [c.args[1][0] for c in cur.execute.call_args_list if "INSERT INTO schema_migrations" in c.args[0]]
+    assert inserts == ["0002", "0003"]
+    conn.commit.assert_called_once()  # seule 0002 est transactionnelle
+    assert conn.autocommit is True
+    assert any("pg_advisory_unlock" in s for s in sqls)
+    assert any(s.startswith("SET lock_timeout") for s in sqls)
+
+
+def test_concurrent_index_left_invalid_is_dropped_before_rebuild(tmp_path):
+    d = _write(tmp_path, {
+        "0001_index.sql": "-- migrate: no-transaction\nCREATE INDEX CONCURRENTLY IF NOT EXISTS ix_t_x ON t(x);",
+    })
+    connect, _, cur = _fake_connect()
+    cur.fetchone.return_value = (1,)  # index INVALID présent
+
+    MigrationRunner("postgres://dsn", d, connect=connect).apply()
+
+    sqls = _executed(cur)
+    drop = sqls.index('DROP INDEX CONCURRENTLY IF EXISTS "ix_t_x";')
+    assert drop < sqls.index("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_t_x ON t(x)")
+
+
+def test_failed_transactional_migration_is_rolled_back_and_not_recorded(tmp_path):
+    d = _write(tmp_path, {"0001_bad.sql": "ALTER TABLE nope ADD COLUMN y INT;"})
+    connect, conn, cur = _fake_connect()
+
+    def execute(sql, *args):
+        if sql.startswith("ALTER TABLE nope"):
+            raise RuntimeError("relation nope does not exist")
+
+    cur.execute.side_effect = execute
+    with pytest.raises(RuntimeError):
+        MigrationRunner("postgres://dsn", d, connect=connect).apply()
+
+    conn.rollback.assert_called_once()
+    conn.commit.assert_not_called()
+    assert not any("INSERT INTO schema_migrations" in s for s in _executed(cur))
+    conn.close.assert_called_once()
+
+
+def test_dry_run_executes_transactional_migrations_then_rolls_back(tmp_path):
+    d = _write(tmp_path, {
+        "0001_init.sql": "CREATE TABLE t (x INT);",
+        "0002_index.sql": "-- migrate: no-transaction\nCREATE INDEX CONCURRENTLY IF NOT EXISTS ix ON t(x);",
+    })
+    connect, conn, cur = _fake_connect()
+
+    done = MigrationRunner("postgres://dsn", d, connect=connect).apply(dry_run=True)
+
+    assert [m.version for m in done] == ["0001", "0002"]
+    sqls = _executed(cur)
+    assert "CREATE TABLE t (x INT);" in sqls
+    assert not any("CONCURRENTLY" in s for s in sqls)
+    assert not any("INSERT INTO schema_migrations" in s for s in sqls)
+    conn.rollback.assert_called_once()
+    conn.commit.assert_not_called()
+
+
+def test_status_flags_pending_and_modified(tmp_path):
+    d = _write(tmp_path, {"0001_init.sql": "SELECT 1;", "0002_next.sql": "SELECT 2;"})
+    connect, _, _ = _fake_connect(applied=[("0001", "0" * 64)])
+    rows = MigrationRunner("postgres://dsn", d, connect=connect).status()
+    assert [(r["version"], r["state"]) for r in rows] == [("0001", "modifiée"), ("0002", "en attente")]
+
+
+def test_cli_dry_run_uses_given_url(monkeypatch):
+    runner = MagicMock()
+    runner.apply.return_value = []
+    factory = MagicMock(return_value=runner)
+    monkeypatch.setattr("Database.migrate.MigrationRunner", factory)
+
+    assert main(["dry-run", "--url", "postgresql://localhost/app", "--target", "0002"]) == 0
+    factory.assert_called_once_with("postgresql://localhost/app")
+    runner.apply.assert_called_once_with("0002", dry_run=True)
+
+
+def test_cli_apply_also_ensures_future_partitions(monkeypatch):
+    runner = MagicMock()
+    runner.apply.return_value = []
+    monkeypatch.setattr("Database.migrate.MigrationRunner", MagicMock(return_value=runner))
+    partitioner = MagicMock()
+    factory = MagicMock(return_value=partitioner)
+    monkeypatch.setattr("Database.partitions.MessagePartitioner", factory)
+
+    assert main(["apply", "--url", "postgresql://localhost/app"]) == 0
+    factory.assert_called_once_with("postgresql://localhost/app")
+    partitioner.ensure_future.assert_called_once_with()
+
+
+def test_concurrent_index_on_partitioned_table_is_built_per_partition(tmp_path):
+    d = _write(tmp_path, {
+        "0001_index.sql": "-- migrate: no-transaction\n"
+                          "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_m ON message(id_user, \"timestamp\");",
+    })
+    connect, _, cur = _fake_connect()
+    cur.fetchone.side_effect = [("p",), None, None, None]  # relkind, pas d'index parent, aucun index invalide
+    cur.fetchall.side_effect = [[], [("message_legacy",), ("message_y2026m11",)]]
+
+    MigrationRunner("postgres://dsn", d, connect=connect).apply()
+
+    sqls = _executed(cur)
+    assert 'CREATE INDEX IF NOT EXISTS ix_m ON ONLY message(id_user, "timestamp");' in sqls
+    assert 'CREATE INDEX CONCURRENTLY IF NOT EXISTS message_y2026m11_ix_m ON message_y2026m11(id_user, "timestamp");' in sqls
+    attached = [s for s in sqls if "ATTACH PARTITION" in s]
+    assert attached == [
+        "ALTER INDEX ix_m ATTACH PARTITION message_legacy_ix_m;",
+        "ALTER INDEX ix_m ATTACH PARTITION message_y2026m11_ix_m;",
+    ]
+    assert not any(s.startswith("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_m ON message") for s in sqls)
+
+
+def test_valid_parent_index_on_partitioned_table_is_left_alone(tmp_path):
+    d = _write(tmp_path, {
+        "0001_index.sql": "-- migrate: no-transaction\n"
+                          "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_m ON message(id_user, \"timestamp\");",
+    })
+    connect, _, cur = _fake_connect()
+    cur.fetchone.side_effect = [("p",), (True,)]  # relkind, index parent valide (partitions convert)
+    cur.fetchall.side_effect = [[]]
+
+    MigrationRunner("postgres://dsn", d, connect=connect).apply()
+
+    sqls = _executed(cur)
+    assert not any("ix_m ON" in s or "ATTACH PARTITION" in s for s in sqls)
+    assert any("INSERT INTO schema_migrations" in s for s in sqls)
@@ -0,0 +1,160 @@
+# src/tests/test_Database/test_partitions.py
+from datetime import date, datetime, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+from Database.partitions import MessagePartitioner, add_months, partition_name
+
+
+def _fake_connect(relkind="r", bounds=()):
+    """Connexion factice : pg_class renvoie ``relkind``, pg_inherits les ``bounds`` (nom, expression)."""
+    cur = MagicMock()
+    cur.fetchone.return_value = (relkind,)
+    cur.fetchall.return_value = list(bounds)
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cur
+    return MagicMock(return_value=conn), conn, cur
+
+
+def _executed(cur):
+    return [str(c.args[0]) for c in cur.execute.call_args_list]
+
+
+def _partitioner(connect, today=date(2026, 10, 17)):
+    return MessagePartitioner("postgres://dsn", connect=connect, today=lambda: today)
+
+
+def test_month_helpers():
+    assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partition_name(date(2027, 3, 1)) == "message_y2027m03"
+
+
+def test_convert_attaches_existing_table_without_copy():
+    connect, conn, cur = _fake_connect(relkind="r")
+
+    assert _partitioner(connect).convert(months_ahead=2) is True
+
+    sqls = _executed(cur)
+    joined = "\n".join(sqls)
+    # préparation hors transaction, avant le verrou exclusif
+    assert sqls.index("CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS message_legacy_id_ts "
+                      'ON message (id_message, "timestamp");') < sqls.index(
+        "LOCK TABLE message IN ACCESS EXCLUSIVE MODE;")
+    assert "INSERT INTO" not in joined  # aucune recopie
+    assert "ATTACH PARTITION message_legacy FOR VALUES FROM (MINVALUE)" in joined
+    assert "DROP CONSTRAINT IF EXISTS feedback_id_message_fkey" in joined
+    assert "PARTITION BY RANGE" in joined and "trg_message_stats_insert" in joined
+    assert "CREATE TABLE message_default PARTITION OF message DEFAULT;" in sqls
+    bound_params = [c.args[1] for c in cur.execute.call_args_list if "ATTACH PARTITION" in str(c.args[0])]
+    assert bound_params == [(datetime(2026, 11, 1, tzinfo=timezone.utc),)]
+    created = [c.args[1] for c in cur.execute.call_args_list if "PARTITION OF message FOR VALUES" in str(c.args[0])]
+    assert created[0] == (datetime(2026, 11, 1, tzinfo=timezone.utc), datetime(2026, 12, 1, tzinfo=timezone.utc))
+    assert len(created) == 2
+    conn.commit.assert_called_once()
+
+
+def test_convert_skips_parent_index_missing_on_legacy_table():
+    connect, conn, cur = _fake_connect(relkind="r")
+    # idx_message_user_conv_ts : migration 0005 pas encore appliquée
+    cur.fetchone.side_effect = lambda: (
+        (False,) if "user_conv_ts" in str(cur.execute.call_args.args[1:]) else ("r",)
+    )
+
+    assert _partitioner(connect).convert() is True
+
+    sqls = _executed(cur)
+    assert "CREATE INDEX IF NOT EXISTS idx_message_conv_ts_id ON message(id_conversation, \"timestamp\", id_message);" in sqls
+    assert not any(s.startswith("CREATE INDEX IF NOT EXISTS idx_message_user_conv_ts") for s in sqls)
+
+
+def test_convert_is_noop_when_already_partitioned():
+    connect, conn, cur = _fake_connect(relkind="p")
+    assert _partitioner(connect).convert() is False
+    assert not any("ALTER TABLE" in s for s in _executed(cur))
+    conn.close.assert_called_once()
+
+
+def test_ensure_future_starts_after_last_partition():
+    bounds = [
+        ("message_legacy", "FOR VALUES FROM (MINVALUE) TO ('2026-11-01 00:00:00+00')"),
+        ("message_y2026m11", "FOR VALUES FROM ('2026-11-01 00:00:00+00') TO ('2026-12-01 00:00:00+00')"),
+    ]
+    connect, _, cur = _fake_connect(relkind="p", bounds=bounds)
+    # relkind, puis partition par défaut vide pour chaque mois
+    cur.fetchone.side_effect = lambda: ("p",) if "relkind" in str(cur.execute.call_args.args[0]) else (False,)
+    created = _partitioner(connect, today=date(2026, 12, 5)).ensure_future(months_ahead=1)
+    assert created == ["message_y2026m12", "message_y2027m01"]
+    assert "CREATE TABLE IF NOT EXISTS message_default PARTITION OF message DEFAULT;" in _executed(cur)
+
+
+def test_ensure_future_skips_month_already_in_default_partition():
+    bounds = [("message_y2026m11", "FOR VALUES FROM ('2026-11-01 00:00:00+00') TO ('2026-12-01 00:00:00+00')"),
+              ("message_default", "DEFAULT")]
+    connect, _, cur = _fake_connect(relkind="p", bounds=bounds)
+
+    def fetchone():
+        query, *params = cur.execute.call_args.args
+        if "relkind" in query:
+            return ("p",)
+        return (params[0][0].month == 12,)  # décembre déjà inséré dans message_default
+
+    cur.fetchone.side_effect = fetchone
+    created = _partitioner(connect, today=date(2026, 12, 5)).ensure_future(months_ahead=1)
+    assert created == ["message_y2027m01"]
+
+
+def test_cli_ensure_alerts_when_default_partition_has_rows(monkeypatch):
+    from Database import partitions
+
+    partitioner = MagicMock()
+    partitioner.ensure_future.return_value = []
+    partitioner.default_rows.return_value = 3
+    monkeypatch.setattr(partitions, "MessagePartitioner", MagicMock(return_value=partitioner))
+    assert partitions.main(["ensure", "--url", "postgresql://localhost/app"]) == 1
+    partitioner.default_rows.return_value = 0
+    assert partitions.main(["ensure", "--url", "postgresql://localhost/app"]) == 0
+
+
+def test_ensure_future_ignores_unpartitioned_table():
+    connect, _, _ = _fake_connect(relkind="r")
+    assert _partitioner(connect).ensure_future() == []
+
+
+def test_cold_partitions_and_detach():
+    bounds = [
+        ("message_legacy", "FOR VALUES FROM (MINVALUE) TO ('2025-11-01 00:00:00+00')"),
+        ("message_y2025m11", "FOR VALUES FROM ('2025-11-01 00:00:00+00') TO ('2025-12-01 00:00:00+00')"),
+        ("message_y2026m09", "FOR VALUES FROM ('2026-09-01 00:00:00+00') TO ('2026-10-01 00:00:00+00')"),
+    ]
+    connect, _, cur = _fake_connect(relkind="p", bounds=bounds)
+    partitioner = _partitioner(connect)
+    assert partitioner.cold_partitions(older_than_months=6) == ["message_y2025m11"]
+
+    with pytest.raises(ValueError):
+        partitioner.detach("message_legacy")
+
+    cur.reset_mock()
+    cur.fetchone.return_value = (False,)  # pas de partition par défaut
+    partitioner.detach("message_y2025m11")
+    sqls = [s for s in _executed(cur) if not s.startswith("SET ")]
+    assert "pg_partitioned_table" in sqls[0]
+    assert "DETACH PARTITION" in sqls[1] and "CONCURRENTLY" in sqls[1]
+    assert "conversation_stats_recompute" in sqls[2]
+    assert "SET SCHEMA" in sqls[-1]
+
+
+def test_detach_with_default_partition_is_not_concurrent():
+    connect, _, cur = _fake_connect(relkind="p")
+    cur.fetchone.return_value = (True,)  # message_default attachée : CONCURRENTLY refusé
+
+    _partitioner(connect).detach("message_y2025m11", drop=True)
+
+    executed = _executed(cur)
+    assert executed[:3] == ["SET lock_timeout = %s", "SET statement_timeout = 0", "SET TIME ZONE 'UTC'"]
+    sqls = executed[3:]
+    assert "pg_partitioned_table" in sqls[0]
+    assert "DETACH PARTITION" in sqls[1] and "CONCURRENTLY" not in sqls[1]
+    assert "conversation_stats_recompute" in sqls[2]
+    assert "DROP TABLE" in sqls[3] and len(sqls) == 4
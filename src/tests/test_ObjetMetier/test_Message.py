@@ -152,3 +152,21 @@ def test_message_str_contains_key_fields():
     assert isinstance(s, str)
     # On tolère différents formats, mais on veut au moins du contenu clé
     assert "Bonjour Bob" in s or "100" in s or "Agent" in s or "User" in s
+
+
+def test_message_from_row_equals_checked_constructor():
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    assert Message.from_row(1, 10, 100, now, "Salut", False) == Message(1, 10, 100, now, "Salut", False)
+
+
+def test_message_from_row_null_user_like_init():
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    m = Message.from_row(1, 10, None, now, "Auteur supprimé", False)
+    assert m.id_user == -1
+
+
+def test_message_uses_slots():
+    m = Message(1, 10, 100, datetime.now(), "x", False)
+    assert not hasattr(m, "__dict__")
+    with pytest.raises(AttributeError):
+        m.autre_attribut = 1
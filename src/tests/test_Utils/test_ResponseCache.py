@@ -0,0 +1,99 @@
+# src/tests/test_Utils/test_ResponseCache.py
+import os
+import time
+
+import pytest
+
+from Utils.ResponseCache import ResponseCache
+
+
+HISTORY = [
+    {"role": "system", "content": "Tu es un assistant utile."},
+    {"role": "user", "content": "Bonjour"},
+]
+
+
+def test_make_key_normalizes_history_and_depends_on_params():
+    k1 = ResponseCache.make_key(HISTORY, temperature=0, max_tokens=10)
+    k2 = ResponseCache.make_key(
+        [{"role": "SYSTEM", "content": " Tu es  un assistant utile. "}, {"role": "user", "content": "Bonjour\n"}],
+        temperature=0,
+        max_tokens=10,
+    )
+    assert k1 == k2
+    assert k1 != ResponseCache.make_key(HISTORY, temperature=0, max_tokens=11)
+
+
+def test_lru_eviction_and_counters():
+    cache = ResponseCache(max_entries=2, ttl_seconds=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" devient le plus récent
+    cache.set("c", 3)  # évince "b"
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats() == {"hits": 2, "disk_hits": 0, "misses": 1, "entries": 2}
+
+
+def test_ttl_expiration(monkeypatch):
+    cache = ResponseCache(ttl_seconds=10)
+    now = time.time()
+    monkeypatch.setattr("Utils.ResponseCache.time.time", lambda: now)
+    cache.set("k", "v")
+    monkeypatch.setattr("Utils.ResponseCache.time.time", lambda: now + 11)
+    assert cache.get("k") is None
+    assert cache.misses == 1
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    cache = ResponseCache(disk_dir=str(tmp_path))
+    cache.set("k", {"content": "x", "usage": {}})
+
+    other = ResponseCache(disk_dir=str(tmp_path))
+    assert other.get("k") == {"content": "x", "usage": {}}
+    assert other.disk_hits == 1
+    # promu en mémoire : le 2e accès ne relit pas le disque
+    assert other.get("k") is not None
+    assert other.disk_hits == 1
+
+
+def test_disk_tier_size_eviction(tmp_path):
+    cache = ResponseCache(disk_dir=str(tmp_path), max_disk_entries=2)
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.set(key, i)
+        os.utime(tmp_path / f"{key}.json", (1000 + i, 1000 + i))
+    cache._disk_evict()
+    assert sorted(os.listdir(tmp_path)) == ["b.json", "c.json"]
+
+
+def test_disk_promotion_keeps_original_write_time(tmp_path, monkeypatch):
+    cache = ResponseCache(disk_dir=str(tmp_path), ttl_seconds=10)
+    cache.set("k", "v")
+    os.utime(tmp_path / "k.json", (1000, 1000))
+
+    other = ResponseCache(disk_dir=str(tmp_path), ttl_seconds=10)
+    monkeypatch.setattr("Utils.ResponseCache.time.time", lambda: 1005)
+    assert other.get("k") == "v"
+    monkeypatch.setattr("Utils.ResponseCache.time.time", lambda: 1011)
+    assert other.get("k") is None  # expiré 10 s après l'écriture disque, pas après la promotion
+
+
+def test_disk_writes_do_not_list_directory_each_time(tmp_path, monkeypatch):
+    cache = ResponseCache(disk_dir=str(tmp_path), max_disk_entries=3)
+    listings = []
+    real_listdir = os.listdir
+    monkeypatch.setattr("Utils.ResponseCache.os.listdir", lambda d: listings.append(d) or real_listdir(d))
+
+    for i in range(3):
+        cache.set(f"k{i}", i)
+    assert len(listings) == 1  # comptage initial seulement
+    cache.set("k0", 10)  # réécriture : pas de nouveau fichier
+    cache.set("k3", 3)  # dépasse la limite -> éviction
+    assert len(listings) == 2
+    assert len([n for n in real_listdir(tmp_path) if n.endswith(".json")]) == 3
+    assert not [n for n in real_listdir(tmp_path) if n.endswith(".tmp")]
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        ResponseCache(max_entries=0)
@@ -0,0 +1,50 @@
+import pytest
+
+from Utils.columnar import CopyLineDecoder, parse_copy_line
+
+# Deux lignes au format texte de COPY : NULL, tabulation et retour à la ligne échappés
+COPY_TEXT = "1\t10\t7\t1735725600000000\tf\t5\tété\\tok\n2\t10\t\\N\t1735725660000000\tt\t3\tl1\\nl2\\\\\n"
+
+
+def test_parse_copy_line_types_nulls_and_escapes():
+    assert parse_copy_line("2\t10\t\\N\t1735725660000000\tt\t3") == (2, 10, None, 1735725660000000, True, 3)
+    assert parse_copy_line("2\t10\t7\t0\tf\t3\tl1\\nl2\\\\", include_text=True)[-1] == "l1\nl2\\"
+
+
+@pytest.mark.parametrize("step", [1, 2, 7, 1000])
+def test_decoder_reassembles_lines_across_arbitrary_chunks(step):
+    batches = []
+    decoder = CopyLineDecoder(batches.append, batch_rows=1, include_text=True)
+    data = COPY_TEXT.encode("utf-8")
+    for i in range(0, len(data), step):  # coupe aussi au milieu des caractères UTF-8
+        decoder.write(data[i:i + step])
+    decoder.flush()
+
+    assert [len(b) for b in batches] == [1, 1]
+    assert batches[0][0] == (1, 10, 7, 1735725600000000, False, 5, "été\tok")
+    assert batches[1][0][2] is None and batches[1][0][-1] == "l1\nl2\\"
+    assert decoder.rows_written == 2
+
+
+def test_writer_round_trip_parquet_and_arrow(tmp_path):
+    pytest.importorskip("pyarrow")
+    pytest.importorskip("numpy")
+    from Utils.columnar import MessageColumnsWriter, read_message_columns
+
+    for name, fmt in (("m.parquet", "parquet"), ("m.arrow", "arrow")):
+        path = str(tmp_path / name)
+        with MessageColumnsWriter(path, fmt=fmt, row_group_size=1) as sink:
+            sink.write(COPY_TEXT)
+        cols = read_message_columns(path)
+        assert cols["id_user"].tolist() == [7, 0]
+        assert cols["timestamp"].tolist() == [1735725600000000, 1735725660000000]
+        assert cols["message_length"].tolist() == [5, 3]
+
+
+def test_decoder_discard_drops_partial_line():
+    batches = []
+    decoder = CopyLineDecoder(batches.append, batch_rows=10)
+    decoder.write(b"1\t10\t7\t0\tf\t5\n2\t10")
+    decoder.discard()
+    decoder.flush()
+    assert batches == [] and decoder.rows_written == 0
@@ -0,0 +1,45 @@
+# src/tests/test_Utils/test_date_range.py
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from Utils.date_range import day_bounds, range_bounds, to_aware
+
+
+PARIS = ZoneInfo("Europe/Paris")
+
+
+def test_day_bounds_is_half_open_in_given_timezone():
+    start, end = day_bounds(date(2025, 1, 4), PARIS)
+    assert start == datetime(2025, 1, 3, 23, tzinfo=timezone.utc)
+    assert end == datetime(2025, 1, 4, 23, tzinfo=timezone.utc)
+
+
+def test_day_bounds_keeps_timezone_of_aware_datetime():
+    tz = timezone(timedelta(hours=9))
+    start, end = day_bounds(datetime(2025, 1, 4, 1, 30, tzinfo=tz), PARIS)
+    assert start.tzinfo is tz and start.hour == 0
+    assert end - start == timedelta(days=1)
+
+
+def test_day_bounds_across_dst_change():
+    start, end = day_bounds(date(2025, 3, 30), PARIS)  # passage à l'heure d'été
+    assert end.astimezone(timezone.utc) - start.astimezone(timezone.utc) == timedelta(hours=23)
+
+
+def test_naive_values_use_app_timezone():
+    with patch.dict("os.environ", {"APP_TIMEZONE": "Europe/Paris"}):
+        assert to_aware(datetime(2025, 7, 1, 12)).utcoffset() == timedelta(hours=2)
+    with patch.dict("os.environ", {"APP_TIMEZONE": ""}):
+        assert to_aware(date(2025, 7, 1)) == datetime(2025, 7, 1, tzinfo=timezone.utc)
+
+
+def test_range_bounds_includes_whole_end_date_and_rejects_empty_range():
+    start, end = range_bounds(date(2025, 1, 1), date(2025, 1, 31), timezone.utc)
+    assert end == datetime(2025, 2, 1, tzinfo=timezone.utc)
+    start, end = range_bounds(datetime(2025, 1, 1, 8), datetime(2025, 1, 1, 9), timezone.utc)
+    assert end - start == timedelta(hours=1)
+    with pytest.raises(ValueError):
+        range_bounds(datetime(2025, 1, 2), datetime(2025, 1, 1), timezone.utc)
@@ -153,3 +153,13 @@ class TestCollaborationDAO:
             result = dao.delete_by_conversation_and_user(10, 100)
 
             assert result is True
+
+    def test_count_conversations_by_user(self):
+        with patch("DAO.CollaborationDAO.DBConnection") as MockDAO:
+            mock_db_instance, mock_connection, mock_cursor = make_mock_db()
+            mock_cursor.fetchone.return_value = {"total": 4}
+            MockDAO.return_value = mock_db_instance
+
+            dao = CollaborationDAO()
+            assert dao.count_conversations_by_user(100) == 4
+            assert "COUNT(DISTINCT id_conversation)" in mock_cursor.execute.call_args.args[0]
@@ -1,4 +1,4 @@
-from datetime import datetime, date
+from datetime import datetime, date, timedelta, timezone
 from unittest.mock import MagicMock, patch
 import re
 import pytest
@@ -97,8 +97,11 @@ class TestConversationDAOUnit:
         assert conv.setting_conversation == "{}"
         assert conv.token_viewer == "a" * 32
         # Vérifie la requête paramétrée
+        # requête préparée : PREPARE (1er appel sur la connexion) puis EXECUTE
+        prepare_sql = mock_cur.execute.call_args_list[0][0][0]
+        assert "where id_conversation = $1" in prepare_sql.lower()
         sql, params = mock_cur.execute.call_args[0]
-        assert "where id_conversation = %(id_conversation)s" in sql.lower()
+        assert sql.startswith("EXECUTE ")
         assert params["id_conversation"] == 7
 
     @patch("DAO.ConversationDAO.DBConnection")
@@ -208,6 +211,7 @@ class TestConversationDAOUnit:
         assert params["user_id"] == 321
         assert params["title"] == "%magique%"
 
+    @patch.dict("os.environ", {"APP_TIMEZONE": "UTC"})
     @patch("DAO.ConversationDAO.DBConnection")
     def test_get_conversations_by_date(self, MockDB):
         mock_db, mock_conn, mock_cur = make_mock_db()
@@ -231,9 +235,29 @@ class TestConversationDAOUnit:
         assert len(lst) == 1
         assert lst[0].id_conversation == 11
         sql, params = mock_cur.execute.call_args[0]
-        assert "date(c.created_at) = %(target_date)s" in sql.lower()
+        # plage [début, lendemain[ indexable, pas de DATE(created_at)
+        assert "date(" not in sql.lower()
+        assert "c.created_at >= %(start)s" in sql and "c.created_at < %(end)s" in sql
         assert params["user_id"] == 9
-        assert isinstance(params["target_date"], date)
+        assert params["start"] == datetime(2025, 6, 1, tzinfo=timezone.utc)
+        assert params["end"] == datetime(2025, 6, 2, tzinfo=timezone.utc)
+
+    @patch.dict("os.environ", {"APP_TIMEZONE": "Europe/Paris"})
+    @patch("DAO.ConversationDAO.DBConnection")
+    def test_get_conversations_by_date_range_uses_app_timezone(self, MockDB):
+        mock_db, _, mock_cur = make_mock_db()
+        mock_cur.fetchall.return_value = []
+        MockDB.return_value = mock_db
+
+        dao = ConversationDAO()
+        dao.get_conversations_by_date_range(9, date(2025, 6, 1), date(2025, 6, 30))
+
+        _, params = mock_cur.execute.call_args[0]
+        assert params["start"].utcoffset() == timedelta(hours=2)
+        assert params["start"] == datetime(2025, 5, 31, 22, tzinfo=timezone.utc)
+        assert params["end"] == datetime(2025, 6, 30, 22, tzinfo=timezone.utc)
+        with pytest.raises(ValueError):
+            dao.get_conversations_by_date_range(9, date(2025, 6, 2), date(2025, 6, 1))
 
     @patch("DAO.ConversationDAO.DBConnection")
     def test_has_access_true_false(self, MockDB):
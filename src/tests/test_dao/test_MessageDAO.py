@@ -1,6 +1,6 @@
 import unittest
 from unittest.mock import MagicMock, patch
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from DAO.MessageDAO import MessageDAO
 from ObjetMetier.Message import Message
@@ -61,6 +61,72 @@ class TestMessageDAOUnit(unittest.TestCase):
         assert params["message"] == "hello"
         assert params["is_from_agent"] is False
 
+    @patch("DAO.MessageDAO.execute_values")
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_create_many_single_multirow_insert(self, MockDBC, mock_exec_values):
+        conn_mgr, _, cur = self._mk_conn_cursor()
+        MockDBC.return_value.connection = conn_mgr
+        mock_exec_values.return_value = [{"id_message": 10}, {"id_message": 11}]
+
+        msgs = [
+            Message(None, 1, 2, datetime(2025, 1, 1, 10), "a", False),
+            Message(None, 2, 6, datetime(2025, 1, 1, 11), "b", True),
+        ]
+        out = self.dao.create_many(msgs)
+        assert [m.id_message for m in out] == [10, 11]
+
+        mock_exec_values.assert_called_once()
+        args, kwargs = mock_exec_values.call_args
+        assert args[0] is cur
+        assert "VALUES %s" in args[1] and "RETURNING id_message" in args[1]
+        assert args[2] == [
+            (1, 2, datetime(2025, 1, 1, 10), "a", False),
+            (2, 6, datetime(2025, 1, 1, 11), "b", True),
+        ]
+        assert kwargs["fetch"] is True
+
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_create_many_empty(self, MockDBC):
+        assert self.dao.create_many([]) == []
+        MockDBC.assert_not_called()
+
+    @patch("DAO.MessageDAO.execute_values")
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_create_many_splits_large_batches(self, MockDBC, mock_exec_values):
+        conn_mgr, _, _ = self._mk_conn_cursor()
+        MockDBC.return_value.connection = conn_mgr
+        mock_exec_values.side_effect = [
+            [{"id_message": 1}, {"id_message": 2}],
+            [{"id_message": 3}],
+        ]
+        msgs = [Message(None, 1, 2, datetime(2025, 1, 1, 10, i), f"m{i}", False) for i in range(3)]
+        out = self.dao.create_many(msgs, page_size=2)
+        assert [m.id_message for m in out] == [1, 2, 3]
+        assert mock_exec_values.call_count == 2
+
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_create_many_copy_mode(self, MockDBC):
+        conn_mgr, _, cur = self._mk_conn_cursor(fetchall_ret=[{"id_message": 7}, {"id_message": 8}])
+        MockDBC.return_value.connection = conn_mgr
+        copied = {}
+        cur.copy_expert.side_effect = lambda sql, buf: copied.update(sql=sql, data=buf.read())
+
+        msgs = [
+            Message(None, 1, 2, datetime(2025, 1, 1, 10), 'dit "bonjour", puis part', False),
+            Message(None, 1, 6, datetime(2025, 1, 1, 11), "réponse\nsur 2 lignes", True),
+        ]
+        out = self.dao.create_many(msgs, use_copy=True)
+        assert [m.id_message for m in out] == [7, 8]
+
+        # réservation des ids sur la séquence puis COPY avec ces ids
+        seq_sql, seq_params = cur.execute.call_args.args
+        assert "nextval" in seq_sql and seq_params == {"n": 2}
+        assert copied["sql"].startswith("COPY message (id_message,")
+        import csv, io
+        rows = list(csv.reader(io.StringIO(copied["data"])))
+        assert rows[0] == ["7", "1", "2", "2025-01-01T10:00:00", 'dit "bonjour", puis part', "f"]
+        assert rows[1][4] == "réponse\nsur 2 lignes" and rows[1][5] == "t"
+
     # --- READ ---
 
     @patch("DAO.MessageDAO.DBConnection")
@@ -82,6 +148,23 @@ class TestMessageDAOUnit(unittest.TestCase):
         assert m.message == "hi"
         assert m.is_from_agent is True
 
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_reads_use_tuple_cursor_and_explicit_columns(self, MockDBC):
+        from DAO.MessageDAO import MESSAGE_COLUMNS, TupleCursor
+
+        rows = [
+            (1, 10, 2, datetime(2025, 1, 1, 10), "a", False),
+            (2, 10, None, datetime(2025, 1, 1, 11), "b", True),
+        ]
+        conn_mgr, conn, cur = self._mk_conn_cursor(fetchall_ret=rows)
+        MockDBC.return_value.connection = conn_mgr
+
+        msgs = self.dao.get_messages_by_conversation(10)
+        assert [m.id_message for m in msgs] == [1, 2]
+        assert msgs[1].id_user == -1 and msgs[1].is_from_agent is True
+        assert conn.cursor.call_args.kwargs["cursor_factory"] is TupleCursor
+        assert MESSAGE_COLUMNS in cur.execute.call_args.args[0]
+
     @patch("DAO.MessageDAO.DBConnection")
     def test_get_by_id_not_found(self, MockDBC):
         conn_mgr, _, _ = self._mk_conn_cursor(fetchone_ret=None)
@@ -120,6 +203,73 @@ class TestMessageDAOUnit(unittest.TestCase):
         assert params["limit"] == 1
         assert params["offset"] == 1  # (page-1)*per_page
 
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_get_messages_by_conversation_keyset_first_page(self, MockDBC):
+        rows = [
+            {"id_message": 4, "id_conversation": 10, "id_user": 2, "timestamp": datetime(2025,1,2,11), "message": "d", "is_from_agent": False},
+        ]
+        conn_mgr, _, cur = self._mk_conn_cursor(fetchall_ret=rows)
+        MockDBC.return_value.connection = conn_mgr
+
+        msgs = self.dao.get_messages_by_conversation_keyset(10, per_page=1)
+        assert len(msgs) == 1 and msgs[0].id_message == 4
+
+        # pas de curseur -> pas de condition keyset ni d'OFFSET
+        args, kwargs = cur.execute.call_args
+        assert "OFFSET" not in args[0]
+        assert "before_ts" not in args[1]
+        assert args[1]["limit"] == 1
+
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_get_messages_by_conversation_keyset_with_cursor(self, MockDBC):
+        conn_mgr, _, cur = self._mk_conn_cursor(fetchall_ret=[])
+        MockDBC.return_value.connection = conn_mgr
+
+        ts = datetime(2025, 1, 2, 10)
+        assert self.dao.get_messages_by_conversation_keyset(10, per_page=5, before=(ts, 3)) == []
+
+        args, kwargs = cur.execute.call_args
+        assert '("timestamp", id_message) <' in args[0]
+        assert '"timestamp" <= %(before_ts)s' in args[0]  # borne simple : élagage des partitions
+        assert "OFFSET" not in args[0]
+        params = args[1]
+        assert params["before_ts"] == ts
+        assert params["before_id"] == 3
+        assert params["limit"] == 5
+
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_get_messages_by_conversation_keyset_oldest_first(self, MockDBC):
+        conn_mgr, _, cur = self._mk_conn_cursor(fetchall_ret=[])
+        MockDBC.return_value.connection = conn_mgr
+
+        ts = datetime(2025, 1, 2, 10)
+        self.dao.get_messages_by_conversation_keyset(10, per_page=5, after=(ts, 3), oldest_first=True)
+
+        args, kwargs = cur.execute.call_args
+        assert 'ORDER BY "timestamp" ASC, id_message ASC' in args[0]
+        assert args[1]["after_ts"] == ts and args[1]["after_id"] == 3
+
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_get_last_messages_by_conversations(self, MockDBC):
+        rows = [
+            {"id_message": 1, "id_conversation": 10, "id_user": 2, "timestamp": datetime(2025,1,1,10), "message": "a", "is_from_agent": False},
+            {"id_message": 3, "id_conversation": 10, "id_user": 6, "timestamp": datetime(2025,1,1,11), "message": "b", "is_from_agent": True},
+            {"id_message": 2, "id_conversation": 20, "id_user": 4, "timestamp": datetime(2025,1,1,10), "message": "c", "is_from_agent": False},
+        ]
+        conn_mgr, _, cur = self._mk_conn_cursor(fetchall_ret=rows)
+        MockDBC.return_value.connection = conn_mgr
+
+        out = self.dao.get_last_messages_by_conversations([10, 20, 30], per_conversation=2)
+        assert [m.id_message for m in out[10]] == [1, 3]
+        assert [m.id_message for m in out[20]] == [2]
+        assert out[30] == []
+
+        # une seule requête pour toutes les conversations
+        cur.execute.assert_called_once()
+        args, kwargs = cur.execute.call_args
+        assert "CROSS JOIN LATERAL" in args[0] and "ROW_NUMBER()" not in args[0]
+        assert args[1] == {"ids": [10, 20, 30], "limit": 2}
+
     @patch("DAO.MessageDAO.DBConnection")
     def test_count_messages_by_conversation(self, MockDBC):
         conn_mgr, _, _ = self._mk_conn_cursor(fetchone_ret={"n": 42})
@@ -146,6 +296,7 @@ class TestMessageDAOUnit(unittest.TestCase):
         assert params["ids"] == (101, 102, 103)
         assert params["kw"] == "%arch%"
 
+    @patch.dict("os.environ", {"APP_TIMEZONE": "UTC"})
     @patch("DAO.MessageDAO.DBConnection")
     def test_search_by_date(self, MockDBC):
         rows = [
@@ -161,8 +312,172 @@ class TestMessageDAOUnit(unittest.TestCase):
         args, kwargs = cur.execute.call_args
         params = args[1]
         assert params["ids"] == (101,)
-        assert params["start"].date() == target.date()
-        assert params["end"].date() == target.date()
+        assert params["start"] == datetime(2025, 1, 4, tzinfo=timezone.utc)
+        assert params["end"] - params["start"] == timedelta(days=1)
+        sql = args[0]
+        assert '"timestamp" >= %(start)s AND "timestamp" < %(end)s' in sql
+
+    # --- LECTURE EN FLUX (curseur serveur nommé) ---
+
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_iter_messages_by_conversation_uses_named_cursor(self, MockDBC):
+        ts = datetime(2025, 1, 1, 12)
+        rows = [(i, 10, 2, ts + timedelta(seconds=i), f"m{i}", False) for i in range(5)]
+        conn_mgr, conn, cur = self._mk_conn_cursor()
+        cur.__iter__.return_value = iter(rows)
+        MockDBC.return_value.connection = conn_mgr
+
+        it = self.dao.iter_messages_by_conversation(10, itersize=2)
+        conn.cursor.assert_not_called()  # paresseux : rien n'est exécuté avant la 1re lecture
+        first = next(it)
+        assert first.id_message == 0 and first.message == "m0"
+        assert [m.id_message for m in it] == [1, 2, 3, 4]
+
+        kwargs = conn.cursor.call_args.kwargs
+        assert kwargs["name"].startswith("msg_iter_")
+        assert cur.itersize == 2
+        sql, params = cur.execute.call_args[0]
+        assert 'ORDER BY "timestamp", id_message' in sql
+        assert params == {"id_conversation": 10}
+        cur.fetchall.assert_not_called()
+
+    def test_iterator_outlives_unit_of_work_on_its_own_connection(self):
+        """Créé dans unit_of_work() et consommé après : jamais sur la connexion rendue par l'unité."""
+        from DAO import DBConnector
+
+        ts = datetime(2025, 1, 1, 12)
+        uow_conn, iter_conn = MagicMock(name="uow_conn"), MagicMock(name="iter_conn")
+        uow_conn.closed = iter_conn.closed = 0
+        cur = iter_conn.cursor.return_value.__enter__.return_value
+        cur.__iter__.return_value = iter([(1, 10, 2, ts, "m1", False), (2, 10, 2, ts, "m2", True)])
+        pool = MagicMock()
+        pool.getconn.side_effect = [uow_conn, iter_conn]
+
+        with patch.object(DBConnector, "_get_pool", return_value=pool):
+            with DBConnector.unit_of_work():
+                with DBConnector.DBConnection().connection as conn:
+                    conn.cursor()  # un DAO rejoint l'unité : sa connexion est empruntée
+                it = self.dao.iter_messages_by_conversation(10)
+                assert next(it).id_message == 1
+            pool.putconn.assert_called_once_with(uow_conn)
+            assert [m.id_message for m in it] == [2]
+
+        assert iter_conn.cursor.call_args.kwargs["name"].startswith("msg_iter_")
+        uow_conn.cursor.assert_called_once_with()
+        assert pool.putconn.call_args_list[-1].args == (iter_conn,)
+
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_iter_search_by_keyword_and_date_range(self, MockDBC):
+        assert list(self.dao.iter_search_by_keyword("x", [])) == []
+        MockDBC.assert_not_called()
+
+        row = (1, 10, 2, datetime(2025, 1, 5, 9), "hello", False)
+        conn_mgr, conn, cur = self._mk_conn_cursor()
+        cur.__iter__.side_effect = lambda: iter([row])
+        MockDBC.return_value.connection = conn_mgr
+
+        msgs = list(self.dao.iter_search_by_keyword("hel", [10, 11]))
+        assert [m.message for m in msgs] == ["hello"]
+        _, params = cur.execute.call_args[0]
+        assert params == {"ids": (10, 11), "kw": "%hel%"}
+        assert cur.itersize == MessageDAO.DEFAULT_ITERSIZE
+
+        s, e = datetime(2025, 1, 5), datetime(2025, 1, 6)
+        msgs = list(self.dao.iter_messages_by_date_range(10, s, e, itersize=500))
+        assert len(msgs) == 1 and cur.itersize == 500
+        _, params = cur.execute.call_args[0]
+        assert params == {"id_conversation": 10, "start": s, "end": e}
+
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_search_fulltext_ranked_with_snippets(self, MockDBC):
+        ts = datetime(2025, 1, 2, 9)
+        rows = [
+            (7, 10, 2, ts, "Réunion sur l'architecture", False, 0.42, "Réunion sur l'**architecture**"),
+            (3, 11, 2, ts, "architectures", False, 0.1, "**architectures**"),
+        ]
+        conn_mgr, _, cur = self._mk_conn_cursor(fetchall_ret=rows)
+        MockDBC.return_value.connection = conn_mgr
+
+        hits = self.dao.search_fulltext("architecture", [10, 11], limit=20)
+
+        assert [(m.id_message, rank, snip) for m, rank, snip in hits] == [
+            (7, 0.42, "Réunion sur l'**architecture**"),
+            (3, 0.1, "**architectures**"),
+        ]
+        sql, params = cur.execute.call_args[0]
+        assert "message_tsv @@ q" in sql and "ts_rank" in sql and "ts_headline" in sql
+        assert "websearch_to_tsquery('french', %(kw)s)" in sql
+        assert params["ids"] == (10, 11) and params["kw"] == "architecture" and params["limit"] == 20
+
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_search_fulltext_short_circuits_and_swallows_errors(self, MockDBC):
+        assert self.dao.search_fulltext("x", []) == []
+        assert self.dao.search_fulltext("  ", [1]) == []
+        MockDBC.assert_not_called()
+
+        MockDBC.return_value.connection.__enter__.side_effect = RuntimeError("db down")
+        assert self.dao.search_fulltext("x", [1]) == []
+
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_search_fulltext_scoped_by_user(self, MockDBC):
+        conn_mgr, _, cur = self._mk_conn_cursor(fetchall_ret=[])
+        MockDBC.return_value.connection = conn_mgr
+
+        self.dao.search_fulltext("architecture", limit=5, user_id=42)
+
+        sql, params = cur.execute.call_args[0]
+        assert "FROM collaboration c" in sql and "c.id_user = %(user_id)s" in sql
+        assert "IN %(ids)s" not in sql
+        assert params["user_id"] == 42 and "ids" not in params
+
+        self.dao.search_fulltext("architecture", limit=5, user_id=42, before=(0.3, 7))
+        sql, params = cur.execute.call_args[0]
+        assert "(ts_rank(message_tsv, q), id_message) < (%(before_rank)s::real, %(before_id)s)" in sql
+        assert "ORDER BY rank DESC, id_message DESC" in sql
+        assert params["before_rank"] == 0.3 and params["before_id"] == 7
+
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_search_by_keyword_for_user_single_query_with_keyset(self, MockDBC):
+        ts = datetime(2025, 1, 2, 9)
+        conn_mgr, _, cur = self._mk_conn_cursor(fetchall_ret=[(7, 10, 2, ts, "archi", False)])
+        MockDBC.return_value.connection = conn_mgr
+
+        msgs = self.dao.search_by_keyword_for_user(42, "archi", limit=20)
+        assert [m.id_message for m in msgs] == [7]
+        sql, params = cur.execute.call_args[0]
+        assert "c.role IN ('admin', 'writer', 'viewer')" in sql
+        assert "message ILIKE %(kw)s" in sql
+        assert 'ORDER BY "timestamp" DESC, id_message DESC' in sql and "LIMIT %(limit)s" in sql
+        assert params == {"kw": "%archi%", "user_id": 42, "limit": 20}
+
+        self.dao.search_by_keyword_for_user(42, "archi", before=(ts, 7), fulltext=True)
+        sql, params = cur.execute.call_args[0]
+        assert "message_tsv @@" in sql and "ILIKE" not in sql
+        assert '("timestamp", id_message) < (%(before_ts)s, %(before_id)s)' in sql
+        assert params["kw"] == "archi" and (params["before_ts"], params["before_id"]) == (ts, 7)
+
+    @patch.dict("os.environ", {"APP_TIMEZONE": "UTC"})
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_search_by_date_for_user(self, MockDBC):
+        conn_mgr, _, cur = self._mk_conn_cursor(fetchall_ret=[])
+        MockDBC.return_value.connection = conn_mgr
+        assert self.dao.search_by_keyword_for_user(42, "  ") == []
+
+        day = datetime(2025, 1, 5, 15, 30)
+        self.dao.search_by_date_for_user(42, day, limit=10)
+        sql, params = cur.execute.call_args[0]
+        assert "c.id_user = %(user_id)s" in sql and "BETWEEN" not in sql
+        assert '"timestamp" >= %(start)s AND "timestamp" < %(end)s' in sql
+        assert params["start"] == datetime(2025, 1, 5, tzinfo=timezone.utc)
+        assert params["end"] == datetime(2025, 1, 6, tzinfo=timezone.utc)
+        assert params["limit"] == 10
+
+        # date avec fuseau : la journée est celle de ce fuseau
+        tz = timezone(timedelta(hours=-5))
+        self.dao.search_by_date_for_user(42, datetime(2025, 1, 5, 23, tzinfo=tz))
+        _, params = cur.execute.call_args[0]
+        assert params["start"] == datetime(2025, 1, 5, 5, tzinfo=timezone.utc)
+        assert params["end"] == datetime(2025, 1, 6, 5, tzinfo=timezone.utc)
 
     # --- RANGE / UPDATE / DELETE / LAST ---
 
@@ -193,6 +508,104 @@ class TestMessageDAOUnit(unittest.TestCase):
         MockDBC.return_value.connection = conn_mgr
         assert self.dao.delete_by_id(123) is True
 
+    # --- COMPTEURS conversation_stats ---
+
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_count_and_last_message_read_conversation_stats(self, MockDBC):
+        conn_mgr, _, cur = self._mk_conn_cursor()
+        cur.fetchone.side_effect = [{"n": 3}, None]
+        MockDBC.return_value.connection = conn_mgr
+        assert self.dao.count_messages_by_conversation(10) == 3
+        assert self.dao.get_last_message(10) is None
+        for call in cur.execute.call_args_list:
+            sql = call.args[0]
+            assert "COUNT(" not in sql and "ORDER BY" not in sql
+        assert "conversation_stats" in cur.execute.call_args.args[0]
+
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_get_conversation_stats(self, MockDBC):
+        conn_mgr, _, _ = self._mk_conn_cursor(fetchone_ret=None)
+        MockDBC.return_value.connection = conn_mgr
+        assert self.dao.get_conversation_stats(404) is None
+
+        row = {"message_count": 0, "agent_message_count": 0, "last_message_id": None, "last_message_at": None}
+        conn_mgr, _, _ = self._mk_conn_cursor(fetchone_ret=row)
+        MockDBC.return_value.connection = conn_mgr
+        assert self.dao.get_conversation_stats(10) == row
+
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_reconcile_conversation_stats_walks_batches(self, MockDBC):
+        conn_mgr, _, cur = self._mk_conn_cursor()
+        MockDBC.return_value.connection = conn_mgr
+        # lot ]0, 2] : 1 correction ; lot ]2, 3] : aucune ; puis fin
+        cur.fetchone.side_effect = [(2,), (3,), (None,)]
+        cur.fetchall.side_effect = [[(1,)], []]
+
+        assert self.dao.reconcile_conversation_stats(batch_size=2) == 1
+
+        calls = cur.execute.call_args_list
+        locks = [c.args[1] for c in calls if "FOR UPDATE" in c.args[0]]
+        assert locks == [{"after": 0, "upto": 2}, {"after": 2, "upto": 3}]
+        repairs = [c.args[0] for c in calls if "INSERT INTO conversation_stats" in c.args[0]]
+        assert len(repairs) == 2 and "IS DISTINCT FROM" in repairs[0]
+
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_aggregates_are_single_sql_queries(self, MockDBC):
+        conn_mgr, _, cur = self._mk_conn_cursor(fetchone_ret=(7,))
+        MockDBC.return_value.connection = conn_mgr
+
+        assert self.dao.count_messages_by_user(2) == 7
+        assert self.dao.count_messages_user_in_conversation(2, 10) == 7
+        assert self.dao.count_conversations_by_user(2) == 7
+        sqls = [c.args[0] for c in cur.execute.call_args_list]
+        assert "COUNT(DISTINCT id_conversation)" in sqls[-1]
+        assert cur.execute.call_args_list[1].args[1] == {"id_user": 2, "id_conversation": 10}
+
+        cur.fetchone.return_value = (None,)  # AVG sur une table vide
+        assert self.dao.get_average_message_length() == 0.0
+        assert "AVG(length(message))" in cur.execute.call_args.args[0]
+
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_get_top_users_by_message_count(self, MockDBC):
+        conn_mgr, _, cur = self._mk_conn_cursor(fetchall_ret=[(3, 12), (1, 5)])
+        MockDBC.return_value.connection = conn_mgr
+
+        assert self.dao.get_top_users_by_message_count(2) == [(3, 12), (1, 5)]
+        sql, params = cur.execute.call_args.args
+        assert "GROUP BY id_user" in sql and params == {"limit": 2}
+
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_get_session_durations_splits_rollup_total(self, MockDBC):
+        rows = [(None, timedelta(minutes=19)), (10, timedelta(minutes=9)), (20, timedelta(minutes=10))]
+        conn_mgr, _, cur = self._mk_conn_cursor(fetchall_ret=rows)
+        MockDBC.return_value.connection = conn_mgr
+
+        total, per_conv = self.dao.get_session_durations(3, timedelta(minutes=10))
+        assert total == timedelta(minutes=19)
+        assert per_conv == {10: timedelta(minutes=9), 20: timedelta(minutes=10)}
+        sql, params = cur.execute.call_args.args
+        assert "LAG(\"timestamp\")" in sql and "ROLLUP" in sql
+        assert params == {"id_user": 3, "id_conversation": None, "idle": timedelta(minutes=10)}
+
+    @patch.dict("os.environ", {"APP_TIMEZONE": "UTC"})
+    @patch("DAO.MessageDAO.DBConnection")
+    def test_copy_messages_out_streams_copy_to_stdout(self, MockDBC):
+        conn_mgr, _, cur = self._mk_conn_cursor()
+        cur.mogrify.side_effect = lambda q, p: q.encode()
+        MockDBC.return_value.connection = conn_mgr
+        sink = MagicMock()
+
+        self.dao.copy_messages_out(sink, start=datetime(2025, 1, 1), end=datetime(2025, 2, 1), chunk_size=4096)
+
+        select, params = cur.mogrify.call_args.args
+        assert '"timestamp" < %(end)s' in select and ", message FROM" not in select
+        assert params["start"] == datetime(2025, 1, 1, tzinfo=timezone.utc)
+        sql, out = cur.copy_expert.call_args.args
+        assert sql.startswith("COPY (SELECT") and sql.endswith(") TO STDOUT")
+        assert out is sink and cur.copy_expert.call_args.kwargs == {"size": 4096}
+        with self.assertRaises(ValueError):
+            self.dao.copy_messages_out(sink, start=datetime(2025, 1, 1))
+
     @patch("DAO.MessageDAO.DBConnection")
     def test_get_last_message(self, MockDBC):
         row = {"id_message": 50, "id_conversation": 10, "id_user": 3,
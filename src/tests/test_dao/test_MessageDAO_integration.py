@@ -1,10 +1,13 @@
 from datetime import datetime, timedelta
+import random
 import time
+import uuid
 import pytest
 
 from DAO.DBConnector import DBConnection
 from DAO.MessageDAO import MessageDAO
 from ObjetMetier.Message import Message
+from Service.StatisticsService import StatisticsService
 
 
 def _table_exists(name: str) -> bool:
@@ -188,3 +191,57 @@ def test_crud_and_queries(infra_ok):
     # DELETE
     assert dao.delete_by_id(created.id_message) is True
     assert dao.get_by_id(created.id_message) is None
+
+
+def _new_conversation() -> int:
+    with DBConnection().connection as c:
+        with c.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO conversation (titre, created_at, settings_conversation, token_viewer, token_writter, is_active)
+                VALUES (%s, NOW(), %s, %s, %s, TRUE)
+                RETURNING id_conversation;
+                """,
+                ("IT sessions", "{}", f"tv-{uuid.uuid4().hex}", f"tw-{uuid.uuid4().hex}"),
+            )
+            cid = _read_returning_id(cur.fetchone(), "id_conversation")
+        c.commit()
+    return cid
+
+
+@pytest.mark.integration
+def test_session_durations_match_python_reference(infra_ok):
+    """Propriété : la version SQL (LAG) = _compute_sessions_duration, sur des horodatages aléatoires."""
+    user_id, _, _ = infra_ok
+    dao = MessageDAO()
+    rng = random.Random(2024)
+    t0 = datetime(2025, 3, 1, 8, 0, 0)
+    conv_ids = [_new_conversation() for _ in range(3)]
+    try:
+        for _ in range(5):
+            threshold = timedelta(minutes=rng.randint(1, 30))
+            expected = {}
+            messages = []
+            for cid in conv_ids:
+                # écarts aléatoires (doublons inclus) de part et d'autre du seuil
+                offsets = sorted(rng.randint(0, 240) for _ in range(rng.randint(0, 25)))
+                stamps = [t0 + timedelta(minutes=o, seconds=rng.randint(0, 59)) for o in offsets]
+                messages += [Message(None, cid, user_id, ts, "s", False) for ts in stamps]
+                reference = StatisticsService(message_dao=dao, idle_threshold=threshold)
+                expected[cid] = reference._compute_sessions_duration(stamps)
+            dao.create_many(messages)
+
+            for cid in conv_ids:
+                total, per_conv = dao.get_session_durations(user_id, threshold, cid)
+                assert total == expected[cid]
+                assert per_conv.get(cid, timedelta(0)) == expected[cid]
+
+            with DBConnection().connection as c:
+                with c.cursor() as cur:
+                    cur.execute("DELETE FROM message WHERE id_conversation = ANY(%s);", (conv_ids,))
+                c.commit()
+    finally:
+        with DBConnection().connection as c:
+            with c.cursor() as cur:
+                cur.execute("DELETE FROM conversation WHERE id_conversation = ANY(%s);", (conv_ids,))
+            c.commit()
@@ -0,0 +1,113 @@
+from datetime import date, timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from DAO.UsageRollupDAO import UsageRollupDAO
+
+
+def make_mock_db():
+    """Fausse connexion DB (context managers de connexion et de curseur)."""
+    cursor = MagicMock()
+    connection = MagicMock()
+    connection.cursor.return_value.__enter__.return_value = cursor
+    db = MagicMock()
+    db.connection.__enter__.return_value = connection
+    return db, cursor
+
+
+def _calls(cursor):
+    return [(c.args[0], c.args[1] if len(c.args) > 1 else None) for c in cursor.execute.call_args_list]
+
+
+@patch.dict("os.environ", {"APP_TIMEZONE": "Europe/Paris"})
+def test_refresh_recomputes_touched_keys_and_advances_watermark():
+    with patch("DAO.UsageRollupDAO.DBConnection") as MockDBC:
+        db, cur = make_mock_db()
+        MockDBC.return_value = db
+        # lot 1 : ids ]0, 40] (3 messages) ; lot 2 : plus rien
+        cur.fetchone.side_effect = [(0,), (40, 3), (40,), (None, 0)]
+        cur.fetchall.return_value = [(7, 10, date(2025, 3, 1)), (7, 10, date(2025, 3, 2))]
+
+        assert UsageRollupDAO().refresh(batch_size=100) == 3
+
+        calls = _calls(cur)
+        assert "FOR UPDATE" in calls[0][0]
+        touched = next(p for q, p in calls if "SELECT DISTINCT" in q)
+        assert touched["since"] == 0 and touched["upto"] == 40 and touched["tz"] == "Europe/Paris"
+        delete = next(p for q, p in calls if q.lstrip().startswith("DELETE FROM usage_daily"))
+        assert delete["users"] == [7, 7] and delete["days"] == [date(2025, 3, 1), date(2025, 3, 2)]
+        recompute = next(q for q, _ in calls if "INSERT INTO usage_daily" in q)
+        assert "LAG(" in recompute and "%(idle)s" in recompute
+        advance = [p for q, p in calls if "UPDATE rollup_watermark" in q]
+        assert advance == [{"upto": 40, "name": "usage_daily"}]
+
+
+def test_refresh_rereads_a_safety_window_below_the_watermark():
+    """Un message d'id < last_id validé après le lot précédent est recalculé au lot suivant."""
+    with patch("DAO.UsageRollupDAO.DBConnection") as MockDBC:
+        db, cur = make_mock_db()
+        MockDBC.return_value = db
+        cur.fetchone.side_effect = [(25000,), (25010, 10), (25010,), (None, 0)]
+        cur.fetchall.return_value = [(7, 10, date(2025, 3, 1))]
+
+        assert UsageRollupDAO(lookback_ids=1000).refresh() == 10
+
+        calls = _calls(cur)
+        touched = next(p for q, p in calls if "SELECT DISTINCT" in q)
+        assert touched["since"] == 24000 and touched["upto"] == 25010
+        # nouveaux messages seuls dans le compte et dans le lot suivant
+        batches = [p["after"] for q, p in calls if "LIMIT %(batch_size)s" in q]
+        assert batches == [25000, 25010]
+
+
+def test_refresh_requires_watermark_row():
+    with patch("DAO.UsageRollupDAO.DBConnection") as MockDBC:
+        db, cur = make_mock_db()
+        MockDBC.return_value = db
+        cur.fetchone.return_value = None
+        with pytest.raises(RuntimeError):
+            UsageRollupDAO().refresh()
+
+
+def test_rebuild_replaces_each_day():
+    with patch("DAO.UsageRollupDAO.DBConnection") as MockDBC:
+        db, cur = make_mock_db()
+        MockDBC.return_value = db
+        cur.fetchall.return_value = [(7, 10)]
+
+        dao = UsageRollupDAO(idle_threshold=timedelta(minutes=5))
+        assert dao.rebuild(date(2025, 3, 1), date(2025, 3, 2)) == 2
+
+        calls = _calls(cur)
+        # même verrou que refresh, pris en tête de chaque transaction journalière
+        locks = [i for i, (q, _) in enumerate(calls) if "rollup_watermark" in q and "FOR UPDATE" in q]
+        assert len(locks) == 2 and locks[0] == 0
+        deleted = [p["day"] for q, p in calls if q.startswith("DELETE FROM usage_daily WHERE day")]
+        assert deleted == [date(2025, 3, 1), date(2025, 3, 2)]
+        inserts = [p for q, p in calls if "INSERT INTO usage_daily" in q]
+        assert inserts[1]["days"] == [date(2025, 3, 2)] and inserts[1]["idle"] == timedelta(minutes=5)
+
+        with pytest.raises(ValueError):
+            dao.rebuild(date(2025, 3, 2), date(2025, 3, 1))
+
+        cur.fetchone.return_value = None
+        with pytest.raises(RuntimeError):
+            dao.rebuild(date(2025, 3, 1), date(2025, 3, 1))
+
+
+def test_reads_are_range_queries_on_the_rollup():
+    with patch("DAO.UsageRollupDAO.DBConnection") as MockDBC:
+        db, cur = make_mock_db()
+        MockDBC.return_value = db
+        dao = UsageRollupDAO()
+
+        cur.fetchall.return_value = [{"id_user": 3, "n": 12}, {"id_user": 1, "n": 5}]
+        assert dao.get_top_users(date(2025, 1, 1), date(2025, 3, 31), limit=2) == [(3, 12), (1, 5)]
+        query, params = cur.execute.call_args.args
+        assert "FROM usage_daily" in query and "FROM message" not in query
+        assert params == {"start": date(2025, 1, 1), "end": date(2025, 3, 31), "limit": 2}
+
+        cur.fetchall.return_value = [{"message_count": None, "session_time": None, "active_days": 0}]
+        totals = dao.get_user_totals(3, date(2025, 1, 1), date(2025, 1, 31))
+        assert totals["message_count"] == 0 and totals["session_time"] == timedelta(0)
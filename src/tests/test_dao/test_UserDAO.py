@@ -101,8 +101,11 @@ class TestUserDAOUnit:
         assert user is not None
         assert user.id == 7
         assert user.username == "alice"
+        # requête préparée : PREPARE (1er appel sur la connexion) puis EXECUTE
+        prepare_sql = mock_cur.execute.call_args_list[0][0][0]
+        assert "where id_user = $1" in prepare_sql.lower()
         sql, params = mock_cur.execute.call_args[0]
-        assert "where id_user = %(id)s" in sql.lower()
+        assert sql.startswith("EXECUTE ")
         assert params["id"] == 7
 
     @patch("DAO.UserDAO.DBConnection")
@@ -174,8 +177,10 @@ class TestUserDAOUnit:
         dao = UserDAO()
         u = dao.get_user_by_email("bob@example.com")
         assert u is not None and u.id == 9
+        prepare_sql = mock_cur.execute.call_args_list[0][0][0]
+        assert "where mail = $1" in prepare_sql.lower()
         sql, params = mock_cur.execute.call_args[0]
-        assert "where mail = %(email)s" in sql.lower()
+        assert sql.startswith("EXECUTE ")
         assert params["email"] == "bob@example.com"
 
     @patch("DAO.UserDAO.DBConnection")
@@ -0,0 +1,62 @@
+import datetime
+import random
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from Service.ColumnarStatistics import ColumnarStatistics  # noqa: E402
+from Service.StatisticsService import StatisticsService  # noqa: E402
+
+T0 = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _random_messages(rng, n):
+    return [
+        SimpleNamespace(
+            id_conversation=rng.randint(1, 4),
+            id_user=rng.randint(1, 5),
+            datetime=T0 + datetime.timedelta(seconds=rng.randint(0, 6 * 3600)),
+            message="x" * rng.randint(0, 50),
+        )
+        for _ in range(n)
+    ]
+
+
+def _columns(messages):
+    return {
+        "id_conversation": np.array([m.id_conversation for m in messages]),
+        "id_user": np.array([m.id_user for m in messages]),
+        "timestamp": np.array([(m.datetime - EPOCH) // datetime.timedelta(microseconds=1) for m in messages]),
+        "message_length": np.array([len(m.message) for m in messages]),
+    }
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_columnar_metrics_match_python_reference(seed):
+    rng = random.Random(seed)
+    messages = _random_messages(rng, rng.randint(0, 200))
+    threshold = datetime.timedelta(minutes=rng.randint(1, 30))
+
+    message_dao = SimpleNamespace(
+        get_messages_by_conversation_and_user=lambda cid, uid: [
+            m for m in messages if m.id_conversation == cid and m.id_user == uid
+        ],
+        get_messages_by_user=lambda uid: [m for m in messages if m.id_user == uid],
+        get_all_messages=lambda: messages,
+    )
+    reference = StatisticsService(message_dao=message_dao, idle_threshold=threshold)
+    stats = ColumnarStatistics(_columns(messages), idle_threshold=threshold)
+
+    assert stats.average_message_length() == pytest.approx(reference.average_message_length())
+    expected_top = sorted(reference.top_active_users(3), key=lambda r: (-r[1], r[0]))
+    assert [c for _, c in stats.top_active_users(3)] == [c for _, c in expected_top]
+    per_user = stats.temps_passe_par_user()
+    for uid in range(1, 6):
+        assert stats.nb_messages(uid) == reference.nb_messages(uid)
+        assert stats.nb_conv(uid) == reference.nb_conv(uid)
+        expected = reference.temps_passe(uid)
+        assert stats.temps_passe(uid) == expected
+        assert per_user.get(uid, datetime.timedelta(0)) == expected
@@ -225,6 +225,33 @@ def test_create_conversation_success(dao, fixed_tokens, fixed_datetime):
     assert user_service.lookups == [1]
 
 
+def test_create_conversation_runs_in_one_unit_of_work(dao, fixed_tokens, fixed_datetime):
+    from DAO import DBConnector
+
+    seen = []
+
+    class RecordingCollab(DummyCollaborationService):
+        def create_collab(self, user_id, conversation_id, role):
+            seen.append(DBConnector._current_uow.get())
+            return super().create_collab(user_id, conversation_id, role)
+
+    service = ConversationService(dao, collaboration_service=RecordingCollab())
+    service.create_conversation("Projet", user_id=1)
+
+    assert len(seen) == 1 and seen[0] is not None  # collab créée dans la transaction ambiante
+    assert DBConnector._current_uow.get() is None
+
+
+def test_create_conversation_fails_when_admin_not_added(dao, fixed_tokens, fixed_datetime):
+    class FailingCollab(DummyCollaborationService):
+        def create_collab(self, user_id, conversation_id, role):
+            return False
+
+    service = ConversationService(dao, collaboration_service=FailingCollab())
+    with pytest.raises(ValueError, match="admin"):
+        service.create_conversation("Projet", user_id=1)
+
+
 def test_create_conversation_unknown_user(dao, fixed_tokens):
     user_service = DummyUserService({})
     service = ConversationService(dao, user_service=user_service)
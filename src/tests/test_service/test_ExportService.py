@@ -217,5 +217,117 @@ class TestExportService(unittest.TestCase):
         self.assertIn("01/01/2025 10h00", out)
 
 
+    # --- DAO en flux : itérateur consommé paresseusement, sans tri Python ---
+    def test_export_consumes_streaming_iterator(self):
+        self.collaboration_service.is_viewer.side_effect = lambda uid, cid: (uid, cid) == (1, 10)
+        ordered = sorted(self.msgs, key=lambda m: m.datetime)
+        consumed = []
+
+        def stream(conv_id):
+            for m in ordered:
+                consumed.append(m)
+                yield m
+
+        stream_dao = Mock(name="MessageDAO", spec=["iter_messages_by_conversation", "get_messages_by_conversation"])
+        stream_dao.iter_messages_by_conversation.side_effect = stream
+        self.svc.message_dao = stream_dao
+
+        out = self.svc.export_conversation(10, 1, fmt="plain")
+        self.assertEqual(len(consumed), 4)
+        stream_dao.get_messages_by_conversation.assert_not_called()
+        self.assertTrue(0 <= out.find("bob (user)") < out.find("alice (user)"))
+        self.assertIn("Agent (agent)", out)
+        # un seul appel au UserDAO par auteur
+        self.assertEqual(sorted(c.args[0] for c in self.user_dao.get_user_by_id.call_args_list), [0, 1, 2])
+
+
+    # --- Export en flux : blocs bornés, gzip, JSONL ---
+    def _stream_dao(self, consumed):
+        ordered = sorted(self.msgs, key=lambda m: m.datetime)
+
+        def stream(conv_id):
+            for m in ordered:
+                consumed.append(m)
+                yield m
+
+        dao = Mock(name="MessageDAO", spec=["iter_messages_by_conversation"])
+        dao.iter_messages_by_conversation.side_effect = stream
+        return dao
+
+    def test_stream_conversation_matches_string_export_and_is_lazy(self):
+        self.collaboration_service.is_viewer.return_value = True
+        for fmt in ("markdown", "plain"):
+            expected = self.svc.export_conversation(10, 1, fmt=fmt)
+            consumed = []
+            self.svc.message_dao = self._stream_dao(consumed)
+            chunks = self.svc.stream_conversation(10, 1, fmt=fmt, chunk_size=10)
+            first = next(chunks)
+            self.assertLess(len(consumed), 4)  # rien n'est lu d'avance
+            self.assertEqual(first + "".join(chunks), expected)
+            self.assertEqual(len(consumed), 4)
+            self.svc.message_dao = self.message_dao
+
+    def test_stream_conversation_checks_access_before_iterating(self):
+        with self.assertRaises(PermissionError):
+            self.svc.stream_conversation(10, 99)
+
+    def test_export_conversation_to_gzip_and_jsonl(self):
+        import gzip, io, json
+
+        self.collaboration_service.is_viewer.return_value = True
+        buf = io.BytesIO()
+        written = self.svc.export_conversation_to(buf, 10, 1, fmt="markdown", compress=True, chunk_size=16)
+        self.assertEqual(written, len(buf.getvalue()))
+        self.assertEqual(gzip.decompress(buf.getvalue()).decode("utf-8"), self.svc.export_conversation(10, 1))
+
+        text = io.StringIO()
+        self.svc.export_conversation_to(text, 10, 1, fmt="jsonl")
+        records = [json.loads(line) for line in text.getvalue().splitlines()]
+        self.assertEqual(records[0]["type"], "conversation")
+        self.assertEqual([r["message"] for r in records[1:]], ["Bonjour", "Salut", "Je suis l'agent", "OK pour moi"])
+        self.assertEqual(records[1]["author"], "bob")
+
+    # --- Export analytique en colonnes (COPY TO STDOUT -> Parquet) ---
+    def test_export_messages_columnar_requires_copy_capable_dao(self):
+        with self.assertRaises(RuntimeError):
+            self.svc.export_messages_columnar("/tmp/inutilise.parquet")
+
+    def test_export_messages_columnar_streams_copy_into_row_groups(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest("pyarrow non installé")
+        import tempfile, os
+
+        def copy_out(sink, start=None, end=None, include_text=False):
+            for i in range(5):  # blocs tels que les renvoie COPY
+                sink.write(f"{i}\t10\t1\t{1735725600000000 + i}\tf\t3\n".encode())
+
+        self.svc.message_dao = Mock(name="MessageDAO", spec=["copy_messages_out"])
+        self.svc.message_dao.copy_messages_out.side_effect = copy_out
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "messages.parquet")
+            self.assertEqual(self.svc.export_messages_columnar(path, row_group_size=2), 5)
+            self.assertEqual(pq.ParquetFile(path).metadata.num_row_groups, 3)
+
+    def test_export_messages_columnar_copy_failure_removes_file_and_propagates(self):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            self.skipTest("pyarrow non installé")
+        import tempfile, os
+
+        def copy_out(sink, start=None, end=None, include_text=False):
+            sink.write(b"1\t10\t1\t1735725600000000\tf\t3\n2\t10")  # ligne coupée en plein flux
+            raise RuntimeError("connexion perdue")
+
+        self.svc.message_dao = Mock(name="MessageDAO", spec=["copy_messages_out"])
+        self.svc.message_dao.copy_messages_out.side_effect = copy_out
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "messages.parquet")
+            with self.assertRaisesRegex(RuntimeError, "connexion perdue"):
+                self.svc.export_messages_columnar(path)
+            self.assertFalse(os.path.exists(path))
+
 if __name__ == "__main__":  # pragma: no cover
     unittest.main()
@@ -1,5 +1,6 @@
 # src/tests/test_service/test_LLMService_HTTP.py
 import json
+import requests
 import datetime
 import pytest
 from unittest.mock import MagicMock
@@ -270,3 +271,648 @@ def test_generate_agent_reply_http_error_propagates():
     with pytest.raises(requests.HTTPError):
         svc.generate_agent_reply(1, 1)
 
+
+
+# ---------------------------------------------------------------------
+# Tests fenêtre d'historique / budget de tokens / résumé glissant
+# ---------------------------------------------------------------------
+def _msgs_desc(n, id_conversation=1):
+    """n messages avec ids 1..n, renvoyés du plus récent au plus ancien (comme le DAO keyset)."""
+    out = []
+    for i in range(n, 0, -1):
+        m = make_msg(
+            id_conversation=id_conversation,
+            id_user=7,
+            text=f"m{i}",
+            is_from_agent=(i % 2 == 0),
+            dt=datetime.datetime(2025, 1, 1, 10, 0, i),
+        )
+        m.id_message = i
+        out.append(m)
+    return out
+
+
+def test_history_window_uses_bounded_reverse_query():
+    dao = MagicMock()
+    dao.get_messages_by_conversation_keyset.return_value = _msgs_desc(3)
+
+    svc = LLMService(dao, history_window=3, default_system_prompt="S")
+    history = svc._build_history_for_conversation(1)
+
+    dao.get_messages_by_conversation_keyset.assert_called_once_with(1, 3)
+    dao.get_messages_by_conversation.assert_not_called()
+    # ordre chronologique restauré
+    assert [h["content"] for h in history] == ["S", "<user id=7>\nm1", "m2", "<user id=7>\nm3"]
+
+
+def test_history_without_window_reads_full_conversation():
+    dao = MagicMock()
+    dao.get_messages_by_conversation.return_value = list(reversed(_msgs_desc(2)))
+
+    svc = LLMService(dao, history_window=None)
+    history = svc._build_history_for_conversation(1)
+
+    dao.get_messages_by_conversation.assert_called_once_with(1)
+    assert len(history) == 3
+
+
+def test_history_token_budget_keeps_most_recent_turns():
+    dao = MagicMock()
+    msgs = _msgs_desc(4)
+    for m in msgs:
+        m.message = "x" * 40  # ~14 tokens estimés par tour
+    dao.get_messages_by_conversation_keyset.return_value = msgs
+
+    svc = LLMService(dao, history_window=10, history_token_budget=40, default_system_prompt="S")
+    history = svc._build_history_for_conversation(1, extra_context="ctx")
+
+    assert history[0] == {"role": "system", "content": "S"}
+    assert history[-1]["role"] == "system" and "ctx" in history[-1]["content"]
+    turns = history[1:-1]
+    assert len(turns) == 1
+    assert turns[0] == {"role": "assistant", "content": "x" * 40}  # le plus récent (id 4)
+
+
+def _msgs_asc(first, last):
+    return list(reversed(_msgs_desc(last)))[first - 1:]
+
+
+def test_rolling_summary_walks_forward_from_oldest_evicted():
+    dao = MagicMock()
+    window = _msgs_desc(8)[:2]  # ids 8, 7 ; ids 1..6 hors fenêtre
+    pages = [_msgs_asc(1, 2), _msgs_asc(3, 4), _msgs_asc(5, 6)]
+    dao.get_messages_by_conversation_keyset.side_effect = [window] + pages + [[]]
+
+    svc = LLMService(dao, history_window=2, summarize_history=True, summary_batch_size=2,
+                     summary_batches_per_reply=3, default_system_prompt="S")
+    svc._call_llm = MagicMock(side_effect=[{"content": f"R{i}"} for i in (1, 2, 3)])
+
+    history = svc._build_history_for_conversation(1)
+    assert "R3" in history[1]["content"]
+
+    calls = dao.get_messages_by_conversation_keyset.call_args_list[1:]
+    assert [c.kwargs["after"] for c in calls] == [
+        None, (pages[0][-1].datetime, 2), (pages[1][-1].datetime, 4), (pages[2][-1].datetime, 6)
+    ]
+    assert all(c.kwargs["oldest_first"] and c.kwargs["before"] == (window[-1].datetime, 7) for c in calls)
+    # chaque paquet est replié dans l'ordre, avec le résumé précédent
+    prompts = [c.args[0][-1]["content"] for c in svc._call_llm.call_args_list]
+    assert "m1" in prompts[0] and "Résumé précédent:\nR1" in prompts[1] and "m5" in prompts[2]
+
+
+def test_rolling_summary_folds_a_bounded_number_of_batches_per_reply():
+    dao = MagicMock()
+    window = _msgs_desc(8)[:2]  # ids 8, 7 ; ids 1..6 hors fenêtre
+    dao.get_messages_by_conversation_keyset.side_effect = [
+        window, _msgs_asc(1, 2), _msgs_asc(3, 4),  # 1er tour : un paquet, le reste attend
+        window, _msgs_asc(3, 4), _msgs_asc(5, 6),  # 2e tour : paquet suivant
+    ]
+
+    svc = LLMService(dao, history_window=2, summarize_history=True, summary_batch_size=2,
+                     default_system_prompt="S")
+    svc._call_llm = MagicMock(side_effect=[{"content": "R1"}, {"content": "R2"}])
+
+    assert "R1" in svc._build_history_for_conversation(1)[1]["content"]
+    svc._call_llm.assert_called_once()
+    assert "R2" in svc._build_history_for_conversation(1)[1]["content"]
+    assert "m3" in svc._call_llm.call_args.args[0][-1]["content"]
+
+
+def test_rolling_summary_sends_partial_tail_unsummarized():
+    dao = MagicMock()
+    dao.get_messages_by_conversation_keyset.side_effect = [
+        _msgs_desc(4)[:2], _msgs_asc(1, 2), [],  # 1er tour : premier résumé (ids 1, 2)
+        _msgs_desc(5)[:2], _msgs_asc(3, 3),  # 2e tour : id 3 évincé, paquet incomplet
+    ]
+
+    svc = LLMService(dao, history_window=2, summarize_history=True, summary_batch_size=2,
+                     default_system_prompt="S")
+    svc._call_llm = MagicMock(return_value={"content": "RESUME", "usage": {}})
+
+    svc._build_history_for_conversation(1)
+    history = svc._build_history_for_conversation(1)
+
+    svc._call_llm.assert_called_once()
+    assert "RESUME" in history[1]["content"]
+    # ni dans la fenêtre ni dans le résumé : id 3 est renvoyé tel quel, avant la fenêtre
+    assert [h["content"].split("\n")[-1] for h in history[2:]] == ["m3", "m4", "m5"]
+    assert dao.get_messages_by_conversation_keyset.call_args.kwargs["after"][1] == 2
+
+
+def test_summary_cache_is_lru_bounded():
+    svc = LLMService(MagicMock(), summary_cache_size=2)
+    for cid in (1, 2):
+        svc._summary_cache_put(cid, ((None, cid), f"r{cid}"))
+    svc._summary_cache_get(1)
+    svc._summary_cache_put(3, ((None, 3), "r3"))
+    assert list(svc._summary_cache) == [1, 3]
+
+
+# ---------------------------------------------------------------------
+# Tests streaming
+# ---------------------------------------------------------------------
+class FakeStreamResponse:
+    def __init__(self, content_type, lines=None, chunks=None, payload=None, status_code=200):
+        self.status_code = status_code
+        self.headers = {"Content-Type": content_type}
+        self._lines = lines or []
+        self._chunks = chunks or []
+        self._payload = payload
+        self.text = ""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        return None
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self._lines)
+
+    def iter_content(self, chunk_size=None, decode_unicode=False):
+        return iter(self._chunks)
+
+    def json(self):
+        return self._payload
+
+
+def _raw_stream_response(content_type, body: bytes):
+    """Vraie requests.Response lue depuis des octets (encodage déduit des en-têtes comme par HTTPAdapter)."""
+    import io
+    from requests.structures import CaseInsensitiveDict
+    from requests.utils import get_encoding_from_headers
+
+    resp = requests.models.Response()
+    resp.status_code = 200
+    resp.headers = CaseInsensitiveDict({"Content-Type": content_type})
+    resp.encoding = get_encoding_from_headers(resp.headers)
+    resp.raw = io.BytesIO(body)
+    return resp
+
+
+@pytest.mark.parametrize("content_type, body", [
+    ("text/event-stream", 'data: {"choices": [{"delta": {"content": "Réponse élégante"}}]}\n\ndata: [DONE]\n'),
+    ("text/plain", "Réponse élégante"),
+])
+def test_stream_without_charset_decodes_utf8(content_type, body):
+    dao, svc, _ = _stream_service(_raw_stream_response(content_type, body.encode("utf-8")))
+    assert "".join(svc._stream_llm([{"role": "user", "content": "q"}])) == "Réponse élégante"
+
+
+def _stream_service(response):
+    dao = MagicMock()
+    dao.get_messages_by_conversation_keyset.return_value = [make_msg(text="Salut", id_user=3)]
+    dao.create.side_effect = lambda m: m
+    session = MagicMock()
+    session.post.return_value = response
+    return dao, LLMService(dao, requests_session=session), session.post
+
+
+def test_stream_agent_reply_sse_yields_tokens_and_persists_once():
+    lines = [
+        'data: {"choices": [{"delta": {"content": "Bon"}}]}',
+        "",
+        'data: {"choices": [{"delta": {"content": "jour"}}]}',
+        "data: [DONE]",
+    ]
+    dao, svc, post = _stream_service(FakeStreamResponse("text/event-stream", lines=lines))
+
+    gen = svc.stream_agent_reply(1, 3)
+    chunks = []
+    with pytest.raises(StopIteration) as stop:
+        while True:
+            chunks.append(next(gen))
+            # rien n'est persisté tant que le flux n'est pas terminé
+            dao.create.assert_not_called()
+
+    assert chunks == ["Bon", "jour"]
+    dao.create.assert_called_once()
+    created = stop.value.value
+    assert created.message == "Bonjour" and created.is_from_agent is True
+    assert post.call_args.kwargs["stream"] is True
+    assert post.call_args.kwargs["json"]["stream"] is True
+
+
+def test_stream_agent_reply_chunked_plain_text():
+    dao, svc, _ = _stream_service(FakeStreamResponse("text/plain", chunks=["a", "b", "c"]))
+    assert list(svc.stream_agent_reply(1, 3)) == ["a", "b", "c"]
+    assert dao.create.call_args.args[0].message == "abc"
+
+
+def test_stream_agent_reply_falls_back_when_server_returns_json():
+    payload = {"choices": [{"message": {"role": "assistant", "content": "Tout d'un bloc"}}]}
+    dao, svc, _ = _stream_service(FakeStreamResponse("application/json", payload=payload))
+    assert list(svc.stream_agent_reply(1, 3)) == ["Tout d'un bloc"]
+    dao.create.assert_called_once()
+
+
+def test_stream_agent_reply_falls_back_to_blocking_call_on_422():
+    dao, svc, _ = _stream_service(FakeStreamResponse("application/json", status_code=422))
+    svc._call_llm = MagicMock(return_value={"content": "bloquant", "usage": {}})
+    assert list(svc.stream_agent_reply(1, 3)) == ["bloquant"]
+    svc._call_llm.assert_called_once()
+
+
+# ---------------------------------------------------------------------
+# Tests client HTTP persistant (serveur local de test)
+# ---------------------------------------------------------------------
+class _StubLLMServer:
+    """Petit serveur HTTP/1.1 local qui imite /generate et note les connexions reçues."""
+
+    def __init__(self, statuses=None, delay=0.0):
+        import http.server
+        import threading
+        import time
+
+        self.client_ports = []
+        self.delay = delay
+        self.statuses = list(statuses or [])
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                time.sleep(stub.delay)
+                stub.client_ports.append(self.client_address[1])
+                status = stub.statuses.pop(0) if stub.statuses else 200
+                body = json.dumps({"choices": [{"message": {"content": f"ok {status}"}}]}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_http_client_reuses_one_connection_across_calls():
+    import requests
+
+    with _StubLLMServer() as stub:
+        svc = LLMService(MagicMock(), base_url=stub.url, requests_session=requests.Session())
+        for _ in range(5):
+            assert svc.simple_complete("ping") == "ok 200"
+
+    assert len(stub.client_ports) == 5
+    # keep-alive : une seule connexion TCP pour tous les appels
+    assert len(set(stub.client_ports)) == 1
+
+
+def test_http_client_retries_on_503_then_succeeds():
+    import requests
+
+    with _StubLLMServer(statuses=[503, 429]) as stub:
+        svc = LLMService(
+            MagicMock(),
+            base_url=stub.url,
+            requests_session=requests.Session(),
+            max_retries=2,
+            backoff_factor=0.0,
+        )
+        assert svc.simple_complete("ping") == "ok 200"
+    assert len(stub.client_ports) == 3
+
+
+def test_http_client_gives_up_after_max_retries():
+    import requests
+
+    with _StubLLMServer(statuses=[503, 503]) as stub:
+        svc = LLMService(
+            MagicMock(),
+            base_url=stub.url,
+            requests_session=requests.Session(),
+            max_retries=1,
+            backoff_factor=0.0,
+        )
+        with pytest.raises(RuntimeError, match="HTTP 503"):
+            svc.simple_complete("ping")
+
+
+def test_requete_invitee_uses_shared_client(monkeypatch):
+    session = MagicMock()
+    session.post.return_value = FakeResponseOK({"choices": [{"message": {"content": "salut"}}]})
+    monkeypatch.setattr(LLMService, "_guest_instance", LLMService(None, requests_session=session))
+
+    out = LLMService.requete_invitee("Bonjour")
+    assert out["content"] == "salut"
+    body = session.post.call_args.kwargs["json"]
+    assert body["history"][-1] == {"role": "user", "content": "Bonjour"}
+
+
+# ---------------------------------------------------------------------
+# Tests cache de réponses
+# ---------------------------------------------------------------------
+def _ok(content):
+    return FakeResponseOK({"choices": [{"message": {"content": content}}]})
+
+
+def test_simple_complete_deterministic_is_cached():
+    from Utils.ResponseCache import ResponseCache
+
+    session = MagicMock()
+    session.post.return_value = _ok("42")
+    cache = ResponseCache()
+    svc = LLMService(MagicMock(), requests_session=session, response_cache=cache)
+
+    assert svc.simple_complete("Combien ?", temperature=0) == "42"
+    assert svc.simple_complete("  Combien ? ", temperature=0) == "42"
+    assert session.post.call_count == 1
+    assert cache.hits == 1 and cache.misses == 1
+
+
+def test_simple_complete_sampled_not_cached_without_opt_in():
+    from Utils.ResponseCache import ResponseCache
+
+    session = MagicMock()
+    session.post.return_value = _ok("au hasard")
+    svc = LLMService(MagicMock(), requests_session=session, response_cache=ResponseCache())
+
+    svc.simple_complete("Une idée ?", temperature=0.7)
+    svc.simple_complete("Une idée ?", temperature=0.7)
+    assert session.post.call_count == 2
+
+
+def test_simple_complete_sampled_cached_with_opt_in():
+    from Utils.ResponseCache import ResponseCache
+
+    session = MagicMock()
+    session.post.return_value = _ok("au hasard")
+    svc = LLMService(
+        MagicMock(),
+        requests_session=session,
+        response_cache=ResponseCache(),
+        cache_sampled_responses=True,
+    )
+
+    svc.simple_complete("Une idée ?", temperature=0.7)
+    svc.simple_complete("Une idée ?", temperature=0.7)
+    # des paramètres différents donnent une autre clé
+    svc.simple_complete("Une idée ?", temperature=0.7, max_tokens=10)
+    assert session.post.call_count == 2
+
+
+# ---------------------------------------------------------------------
+# Tests front asynchrone
+# ---------------------------------------------------------------------
+def test_agenerate_agent_reply_concurrent_throughput():
+    import asyncio
+    import time
+    import requests
+
+    n, delay = 8, 0.2
+    dao = MagicMock()
+    dao.get_messages_by_conversation_keyset.side_effect = lambda cid, n: [make_msg(id_conversation=cid, text=f"c{cid}")]
+    dao.create.side_effect = lambda m: m
+
+    with _StubLLMServer(delay=delay) as stub:
+        svc = LLMService(dao, base_url=stub.url, requests_session=requests.Session(), max_concurrency=n)
+
+        async def run_all():
+            return await asyncio.gather(*(svc.agenerate_agent_reply(cid, 1) for cid in range(1, n + 1)))
+
+        start = time.perf_counter()
+        replies = asyncio.run(run_all())
+        elapsed = time.perf_counter() - start
+
+    assert sorted(m.id_conversation for m in replies) == list(range(1, n + 1))
+    assert dao.create.call_count == n
+    # en série : n * delay ; en parallèle : ~delay
+    assert elapsed < n * delay / 2
+
+
+def test_async_concurrency_is_bounded_by_semaphore():
+    import asyncio
+    import threading
+    import time
+
+    svc = LLMService(MagicMock(), requests_session=MagicMock(), max_concurrency=2)
+    lock = threading.Lock()
+    state = {"current": 0, "peak": 0}
+
+    def slow_call(history, **kwargs):
+        with lock:
+            state["current"] += 1
+            state["peak"] = max(state["peak"], state["current"])
+        time.sleep(0.05)
+        with lock:
+            state["current"] -= 1
+        return {"content": history[-1]["content"], "usage": {}}
+
+    svc._call_llm = slow_call
+
+    async def run_all():
+        return await asyncio.gather(*(svc.asimple_complete(f"p{i}") for i in range(6)))
+
+    assert asyncio.run(run_all()) == [f"p{i}" for i in range(6)]
+    assert state["peak"] == 2
+
+
+def test_async_identical_inflight_prompts_are_coalesced():
+    import asyncio
+    import time
+
+    svc = LLMService(MagicMock(), requests_session=MagicMock())
+    calls = []
+
+    def slow_call(history, **kwargs):
+        calls.append(history)
+        time.sleep(0.05)
+        return {"content": "unique", "usage": {}}
+
+    svc._call_llm = slow_call
+
+    async def run_all():
+        return await asyncio.gather(*(svc.asimple_complete("même question") for _ in range(5)))
+
+    assert asyncio.run(run_all()) == ["unique"] * 5
+    assert len(calls) == 1
+
+
+def test_async_coalescing_keys_on_use_cache_and_event_loop():
+    import asyncio
+    import threading
+    import time
+
+    svc = LLMService(MagicMock(), requests_session=MagicMock())
+    calls = []
+
+    def slow(kind):
+        def call(history, **kwargs):
+            calls.append(kind)
+            time.sleep(0.05)
+            return {"content": kind, "usage": {}}
+        return call
+
+    svc._call_llm, svc._cached_call = slow("direct"), slow("cache")
+    history = [{"role": "user", "content": "même question"}]
+
+    async def both():
+        return await asyncio.gather(svc._acall_llm(history), svc._acall_llm(history, use_cache=True))
+
+    # même requête, use_cache différent : pas de fusion (l'appel direct ne lit pas le cache)
+    assert [r["content"] for r in asyncio.run(both())] == ["direct", "cache"]
+    assert sorted(calls) == ["cache", "direct"]
+
+    # instance partagée par plusieurs threads, chacun avec sa boucle : chacun son appel
+    calls.clear()
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(asyncio.run(svc._acall_llm(history))["content"])
+        except Exception as e:  # pragma: no cover - échec du test
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == [] and results == ["direct"] * 4
+    assert len(calls) == 4
+    assert svc._inflight == {}
+
+
+def test_async_timeout_raises_runtime_error():
+    import asyncio
+    import time
+
+    svc = LLMService(MagicMock(), requests_session=MagicMock(), async_timeout=0.05)
+    svc._call_llm = lambda history, **kwargs: time.sleep(0.3) or {"content": "trop tard"}
+
+    with pytest.raises(RuntimeError, match="Timeout"):
+        asyncio.run(svc.asimple_complete("lent"))
+
+
+def test_async_timeout_is_passed_to_requests_and_close_stops_pool():
+    import asyncio
+
+    session = MagicMock()
+    session.post.return_value.status_code = 200
+    session.post.return_value.json.return_value = {"choices": [{"message": {"content": "ok"}}]}
+    svc = LLMService(MagicMock(), requests_session=session, timeout=20.0, async_timeout=2.0)
+
+    assert asyncio.run(svc.asimple_complete("q")) == "ok"
+    # le thread du pool est borné par le délai asynchrone, pas par timeout * tentatives
+    assert 0 < session.post.call_args.kwargs["timeout"] <= 2.0
+
+    executor = svc._executor
+    asyncio.run(svc.aclose())
+    assert svc._executor is None and executor._shutdown
+
+
+def test_post_stops_retrying_once_deadline_passed():
+    import time
+
+    session = MagicMock()
+    session.post.side_effect = requests.exceptions.ConnectionError("refusé")
+    svc = LLMService(MagicMock(), requests_session=session, max_retries=5)
+
+    with pytest.raises(requests.exceptions.Timeout):
+        svc._post("http://x/generate", {}, {}, deadline=time.monotonic() - 1)
+    session.post.assert_not_called()
+
+
+# ---------------------------------------------------------------------
+# Tests génération par lot
+# ---------------------------------------------------------------------
+def test_generate_agent_replies_batch_reports_per_conversation():
+    dao = MagicMock()
+    dao.get_last_messages_by_conversations.return_value = {
+        1: [make_msg(id_conversation=1, text="q1")],
+        2: [make_msg(id_conversation=2, text="q2")],
+        3: [make_msg(id_conversation=3, text="q3")],
+    }
+
+    def fake_create_many(msgs):
+        for i, m in enumerate(msgs):
+            m.id_message = 100 + i
+        return msgs
+
+    dao.create_many.side_effect = fake_create_many
+
+    svc = LLMService(dao, requests_session=MagicMock(), history_window=5)
+
+    def fake_call(history, **kwargs):
+        last = history[-1]["content"]
+        if last.endswith("q2"):
+            raise RuntimeError("[LLM] HTTP 500")
+        return {"content": f"re:{last[-2:]}", "usage": {}}
+
+    svc._call_llm = fake_call
+
+    results = svc.generate_agent_replies([1, 2, 3])
+
+    dao.get_last_messages_by_conversations.assert_called_once_with([1, 2, 3], 5)
+    dao.create_many.assert_called_once()
+    assert len(dao.create_many.call_args.args[0]) == 2
+    dao.create.assert_not_called()
+
+    assert results[1]["ok"] is True and results[1]["message"].message == "re:q1"
+    assert results[3]["ok"] is True and results[3]["message"].is_from_agent is True
+    assert results[2] == {"ok": False, "message": None, "error": "[LLM] HTTP 500"}
+
+
+def test_generate_agent_replies_write_failure_retries_each_row():
+    dao = MagicMock()
+    dao.get_last_messages_by_conversations.return_value = {
+        1: [make_msg(id_conversation=1, text="q1")],
+        2: [make_msg(id_conversation=2, text="q2")],
+    }
+    dao.create_many.side_effect = ValueError("violation de clé étrangère")
+
+    def fake_create(msg):
+        if msg.id_conversation == 2:
+            raise ValueError("conversation 2 supprimée")
+        msg.id_message = 500
+        return msg
+
+    dao.create.side_effect = fake_create
+
+    svc = LLMService(dao, requests_session=MagicMock())
+    svc._call_llm = lambda history, **kwargs: {"content": "ok", "usage": {}}
+
+    results = svc.generate_agent_replies([1, 2])
+    assert dao.create.call_count == 2
+    assert results[1]["ok"] is True and results[1]["message"].id_message == 500
+    assert results[2] == {"ok": False, "message": None, "error": "conversation 2 supprimée"}
+
+
+def test_generate_agent_replies_skips_conversations_without_history():
+    dao = MagicMock()
+    dao.get_last_messages_by_conversations.return_value = {
+        1: [make_msg(id_conversation=1, text="q1")],
+        2: [],
+    }
+    dao.create_many.side_effect = lambda msgs: msgs
+
+    svc = LLMService(dao, requests_session=MagicMock())
+    svc._call_llm = MagicMock(return_value={"content": "ok", "usage": {}})
+
+    results = svc.generate_agent_replies([1, 2])
+    svc._call_llm.assert_called_once()
+    assert results[1]["ok"] is True
+    assert results[2]["ok"] is False and "sans historique" in results[2]["error"]
+    assert [m.id_conversation for m in dao.create_many.call_args.args[0]] == [1]
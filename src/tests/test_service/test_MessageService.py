@@ -147,11 +147,15 @@ def test_delete_all_messages_by_conversation_invalid():
         svc.delete_all_messages_by_conversation(-1)
 
 
-def test_check_conversation_exists_true_when_count_nonnegative():
+def test_check_conversation_exists_reads_stats_not_count():
     dao = MagicMock()
-    dao.count_messages_by_conversation.return_value = 0
+    dao.get_conversation_stats.return_value = {"message_count": 0}
     svc = MessageService(dao)
     assert svc.check_conversation_exists(1) is True
+    dao.count_messages_by_conversation.assert_not_called()
+
+    dao.get_conversation_stats.return_value = None
+    assert svc.check_conversation_exists(404) is False
 
 
 # =========================
@@ -237,6 +241,32 @@ def test_get_messages_paginated_invalid_page():
         svc.get_messages_paginated(3, page=0, per_page=50)
 
 
+def test_get_messages_paginated_first_page_uses_keyset():
+    dao = MagicMock()
+    svc = MessageService(dao)
+    svc.get_messages_paginated(3, per_page=20)
+    dao.get_messages_by_conversation_keyset.assert_called_once_with(3, 20, None)
+    dao.get_messages_by_conversation_paginated.assert_not_called()
+
+
+def test_get_messages_paginated_with_cursor_uses_keyset():
+    dao = MagicMock()
+    svc = MessageService(dao)
+    page = [
+        make_message(id_message=9, dt=datetime.datetime(2025, 1, 2)),
+        make_message(id_message=8, dt=datetime.datetime(2025, 1, 1)),
+    ]
+    cursor = svc.next_page_cursor(page)
+    assert cursor == (datetime.datetime(2025, 1, 1), 8)
+
+    svc.get_messages_paginated(3, per_page=2, before=cursor)
+    dao.get_messages_by_conversation_keyset.assert_called_once_with(3, 2, cursor)
+
+
+def test_next_page_cursor_empty_page():
+    assert MessageService.next_page_cursor([]) is None
+
+
 def test_count_messages_delegates():
     dao = MagicMock()
     dao.count_messages_by_conversation.return_value = 12
@@ -301,3 +331,35 @@ def test_delete_message_ok_and_invalid():
 
     with pytest.raises(ValueError):
         svc.delete_message(-1)
+
+
+# =========================
+# import_messages
+# =========================
+def test_import_messages_uses_bulk_insert():
+    dao = MagicMock()
+    svc = MessageService(dao)
+    msgs = [make_message(text="a"), make_message(text="b")]
+    dao.create_many.return_value = msgs
+
+    assert svc.import_messages(msgs) is msgs
+    dao.create_many.assert_called_once_with(msgs, use_copy=False)
+    dao.create.assert_not_called()
+
+
+def test_import_messages_switches_to_copy_for_large_batches():
+    dao = MagicMock()
+    svc = MessageService(dao)
+    svc.COPY_THRESHOLD = 3
+    msgs = [make_message(text=str(i)) for i in range(3)]
+    svc.import_messages(msgs)
+    dao.create_many.assert_called_once_with(msgs, use_copy=True)
+
+
+def test_import_messages_validates_before_writing():
+    dao = MagicMock()
+    svc = MessageService(dao)
+    with pytest.raises(ValueError):
+        svc.import_messages([make_message(text="ok"), make_message(text="   ")])
+    dao.create_many.assert_not_called()
+    assert svc.import_messages([]) == []
@@ -0,0 +1,103 @@
+from datetime import date, datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from Service.SearchService import SearchService
+from ObjetMetier.Message import Message
+
+USER_ID = 42
+
+
+def _service(**kwargs):
+    collab_dao = MagicMock()
+    message_dao = MagicMock()
+    svc = SearchService(message_dao, MagicMock(), collab_dao, **kwargs)
+    return svc, message_dao, collab_dao
+
+
+def _hit(i, rank):
+    m = Message(id_message=i, id_conversation=101, message=f"architecture {i}", datetime=datetime(2025, 1, 1))
+    return (m, rank, f"**architecture** {i}")
+
+
+def test_keyword_search_is_one_authorized_dao_call():
+    svc, message_dao, collab_dao = _service()
+    svc.search_messages_by_keyword(USER_ID, "archi")
+
+    message_dao.search_by_keyword_for_user.assert_called_once_with(
+        USER_ID, "archi", limit=SearchService.PAGE_SIZE, before=None
+    )
+    collab_dao.find_by_user.assert_not_called()  # plus de liste d'ids côté Python
+    message_dao.search_by_keyword.assert_not_called()
+
+
+def test_fulltext_mode_returns_messages_in_rank_order():
+    svc, message_dao, _ = _service(keyword_mode="fulltext")
+    message_dao.search_fulltext.return_value = [_hit(2, 0.9), _hit(1, 0.3)]
+
+    result = svc.search_messages_by_keyword(USER_ID, "architecture")
+
+    assert [m.id_message for m in result] == [2, 1]
+    message_dao.search_fulltext.assert_called_once_with(
+        "architecture", limit=SearchService.PAGE_SIZE, user_id=USER_ID, before=None
+    )
+    message_dao.search_by_keyword_for_user.assert_not_called()
+
+
+def test_fulltext_mode_pages_on_rank_cursor():
+    svc, message_dao, _ = _service(keyword_mode="fulltext")
+    message_dao.search_fulltext.return_value = []
+    svc.search_messages_by_keyword(USER_ID, "architecture", limit=20, before=(0.3, 1))
+    message_dao.search_fulltext.assert_called_once_with(
+        "architecture", limit=20, user_id=USER_ID, before=(0.3, 1)
+    )
+
+
+def test_mode_can_be_overridden_per_call_and_is_validated():
+    svc, message_dao, _ = _service(keyword_mode="fulltext")
+    svc.search_messages_by_keyword(USER_ID, "archi", mode="substring")
+    message_dao.search_by_keyword_for_user.assert_called_once()
+    message_dao.search_fulltext.assert_not_called()
+
+    with pytest.raises(ValueError):
+        svc.search_messages_by_keyword(USER_ID, "archi", mode="regex")
+    with pytest.raises(ValueError):
+        SearchService(MagicMock(), MagicMock(), MagicMock(), keyword_mode="regex")
+    assert svc.search_messages_by_keyword(USER_ID, "") == []
+
+
+def test_search_messages_ranked_returns_snippets():
+    svc, message_dao, _ = _service()
+    message_dao.search_fulltext.return_value = [_hit(2, 0.9)]
+
+    hits = svc.search_messages_ranked(USER_ID, "architecture", limit=10)
+
+    assert hits[0][1] == 0.9 and hits[0][2] == "**architecture** 2"
+    message_dao.search_fulltext.assert_called_once_with("architecture", limit=10, user_id=USER_ID, before=None)
+    assert svc.search_messages_ranked(USER_ID, "") == []
+
+
+def test_date_search_is_one_authorized_dao_call():
+    svc, message_dao, collab_dao = _service()
+    day = datetime(2025, 11, 5)
+    svc.search_messages_by_date(USER_ID, day)
+    message_dao.search_by_date_for_user.assert_called_once_with(
+        USER_ID, day, limit=SearchService.PAGE_SIZE, before=None
+    )
+    collab_dao.find_by_user.assert_not_called()
+
+
+def test_date_range_searches_delegate_to_range_queries():
+    svc, message_dao, collab_dao = _service()
+    start, end = date(2025, 11, 1), date(2025, 11, 30)
+
+    svc.search_messages_by_date_range(USER_ID, start, end, limit=20)
+    message_dao.search_by_date_range_for_user.assert_called_once_with(
+        USER_ID, start, end, limit=20, before=None
+    )
+    svc.search_conversations_by_date_range(USER_ID, start, end)
+    svc.conversation_dao.get_conversations_by_date_range.assert_called_once_with(
+        USER_ID, start, end
+    )
+    collab_dao.find_by_user.assert_not_called()
@@ -38,8 +38,16 @@ def test_nb_conv_prefers_count_then_fallback_list_len_set():
     assert svc.nb_conv(7) == 2
     collaboration_dao.get_by_user_id.assert_called_once_with(7)
 
+def test_nb_conv_uses_message_dao_sql_count_when_no_collab():
+    message_dao = Mock()
+    message_dao.count_conversations_by_user.return_value = 4
+    svc = StatisticsService(message_dao=message_dao, collaboration_dao=None)
+    assert svc.nb_conv(1) == 4
+    message_dao.get_messages_by_user.assert_not_called()
+
 def test_nb_conv_fallback_messages_when_no_collab():
     message_dao = Mock()
+    message_dao.count_conversations_by_user = None
     message_dao.get_messages_by_user.return_value = [
         msg(0, 10, 1),
         msg(1, 11, 1),
@@ -51,7 +59,7 @@ def test_nb_conv_fallback_messages_when_no_collab():
 
 def test_nb_conv_raises_when_no_compatible_methods():
     message_dao = Mock()
-    for name in ["get_messages_by_user", "get_by_user", "get_messages_for_user"]:
+    for name in ["count_conversations_by_user", "get_messages_by_user", "get_by_user", "get_messages_for_user"]:
         setattr(message_dao, name, None)
     svc = StatisticsService(message_dao=message_dao, collaboration_dao=None)
     with pytest.raises(RuntimeError):
@@ -126,6 +134,7 @@ def test_nb_messages_de_user_par_conv_all_paths_and_raises():
     message_dao.count_by_user_in_conversation = None
     message_dao.get_messages_by_conversation_and_user = None
     message_dao.get_by_conversation_and_user = None
+    message_dao.iter_messages_by_conversation = None
     message_dao.get_messages_by_conversation.return_value = [
         msg(0, 10, 7), msg(1, 10, 8), msg(2, 10, 7)
     ]
@@ -136,20 +145,26 @@ def test_nb_messages_de_user_par_conv_all_paths_and_raises():
     message_dao = Mock()
     for name in ["count_messages_user_in_conversation", "count_by_user_in_conversation",
                  "get_messages_by_conversation_and_user", "get_by_conversation_and_user",
+                 "iter_messages_by_conversation",
                  "get_messages_by_conversation", "get_by_conversation"]:
         setattr(message_dao, name, None)
     svc = StatisticsService(message_dao=message_dao)
     with pytest.raises(RuntimeError):
         svc.nb_messages_de_user_par_conv(7, 10)
 
+def _dao_without_sql_sessions():
+    message_dao = Mock()
+    message_dao.get_session_durations = None
+    return message_dao
+
 def test_temps_passe_simple_window_uses_helper():
-    svc = StatisticsService(message_dao=Mock())
+    svc = StatisticsService(message_dao=_dao_without_sql_sessions())
     svc._get_sorted_timestamps_for_user = Mock(return_value=[T0, T0 + datetime.timedelta(minutes=60)])
     assert svc.temps_passe(1, simple_window=True) == datetime.timedelta(minutes=60)
     svc._get_sorted_timestamps_for_user.assert_called_once_with(1)
 
 def test_temps_passe_sums_sessions_by_conv_with_threshold():
-    svc = StatisticsService(message_dao=Mock(), idle_threshold=datetime.timedelta(minutes=10))
+    svc = StatisticsService(message_dao=_dao_without_sql_sessions(), idle_threshold=datetime.timedelta(minutes=10))
     svc._get_conversation_ids_of_user = Mock(return_value=[10, 20])
     svc._get_sorted_timestamps_for_user_in_conv = Mock(side_effect=[
         [T0, T0 + datetime.timedelta(minutes=5), T0 + datetime.timedelta(minutes=9),
@@ -159,7 +174,7 @@ def test_temps_passe_sums_sessions_by_conv_with_threshold():
     assert svc.temps_passe(1) == datetime.timedelta(minutes=19)
 
 def test_temps_passe_fallback_to_global_when_no_conversations():
-    svc = StatisticsService(message_dao=Mock(), idle_threshold=datetime.timedelta(minutes=10))
+    svc = StatisticsService(message_dao=_dao_without_sql_sessions(), idle_threshold=datetime.timedelta(minutes=10))
     svc._get_conversation_ids_of_user = Mock(return_value=[])
     svc._get_sorted_timestamps_for_user = Mock(
         return_value=[T0, T0 + datetime.timedelta(minutes=5), T0 + datetime.timedelta(minutes=30)]
@@ -167,7 +182,7 @@ def test_temps_passe_fallback_to_global_when_no_conversations():
     assert svc.temps_passe(1) == datetime.timedelta(minutes=5)
 
 def test_temps_passe_par_conv_paths_simple_and_sessions():
-    svc = StatisticsService(message_dao=Mock(), idle_threshold=datetime.timedelta(minutes=10))
+    svc = StatisticsService(message_dao=_dao_without_sql_sessions(), idle_threshold=datetime.timedelta(minutes=10))
     svc._get_sorted_timestamps_for_user_in_conv = Mock(
         return_value=[T0, T0 + datetime.timedelta(minutes=9), T0 + datetime.timedelta(minutes=25)]
     )
@@ -175,6 +190,32 @@ def test_temps_passe_par_conv_paths_simple_and_sessions():
     svc._get_sorted_timestamps_for_user_in_conv.return_value = [T0, T0 + datetime.timedelta(minutes=60)]
     assert svc.temps_passe_par_conv(1, 10, simple_window=True) == datetime.timedelta(minutes=60)
 
+def test_temps_passe_uses_single_sql_query_when_available():
+    message_dao = Mock()
+    per_conv = {10: datetime.timedelta(minutes=9), 20: datetime.timedelta(minutes=10)}
+    message_dao.get_session_durations.return_value = (datetime.timedelta(minutes=19), per_conv)
+    svc = StatisticsService(message_dao=message_dao, idle_threshold=datetime.timedelta(minutes=10))
+
+    assert svc.temps_passe(1) == datetime.timedelta(minutes=19)
+    message_dao.get_session_durations.assert_called_once_with(1, datetime.timedelta(minutes=10), None)
+    assert svc.temps_passe_detail(1) == (datetime.timedelta(minutes=19), per_conv)
+    message_dao.get_messages_by_conversation.assert_not_called()
+
+    message_dao.get_session_durations.return_value = (datetime.timedelta(minutes=9), {10: per_conv[10]})
+    assert svc.temps_passe_par_conv(1, 10) == datetime.timedelta(minutes=9)
+    message_dao.get_session_durations.assert_called_with(1, datetime.timedelta(minutes=10), 10)
+
+def test_temps_passe_detail_falls_back_to_python_sessions():
+    svc = StatisticsService(message_dao=_dao_without_sql_sessions(), idle_threshold=datetime.timedelta(minutes=10))
+    svc._get_conversation_ids_of_user = Mock(return_value=[10, 20])
+    svc._get_sorted_timestamps_for_user_in_conv = Mock(side_effect=[
+        [T0, T0 + datetime.timedelta(minutes=5)],
+        [T0, T0 + datetime.timedelta(minutes=30)],
+    ])
+    total, per_conv = svc.temps_passe_detail(1)
+    assert total == datetime.timedelta(minutes=5)
+    assert per_conv == {10: datetime.timedelta(minutes=5), 20: datetime.timedelta(0)}
+
 def test_top_active_users_direct_and_fallback_and_validation():
     message_dao = Mock()
     message_dao.get_top_users_by_message_count.return_value = [
@@ -252,6 +293,7 @@ def test_get_sorted_timestamps_for_user_in_conv_filters_and_orders_both_paths():
     mdao = Mock()
     mdao.get_messages_by_conversation_and_user = None
     mdao.get_by_conversation_and_user = None
+    mdao.iter_messages_by_conversation = None
     mdao.get_messages_by_conversation.return_value = [
         msg(5, 10, 7),
         msg(0, 10, 7),
@@ -278,3 +320,40 @@ def test_get_conversation_ids_via_conversation_dao_then_messages_fallback():
     svc = StatisticsService(message_dao=message_dao, conversation_dao=None, collaboration_dao=None)
     ids2 = svc._get_conversation_ids_of_user(1)
     assert set(ids2) == {5, 7}
+
+def test_conversation_fallbacks_prefer_streaming_iterator():
+    mdao = Mock()
+    mdao.count_messages_user_in_conversation = None
+    mdao.count_by_user_in_conversation = None
+    mdao.get_messages_by_conversation_and_user = None
+    mdao.get_by_conversation_and_user = None
+    mdao.iter_messages_by_conversation.side_effect = lambda cid: iter(
+        [msg(5, cid, 7), msg(0, cid, 7), msg(2, cid, 8)]
+    )
+    svc = StatisticsService(message_dao=mdao)
+
+    assert svc.nb_messages_de_user_par_conv(7, 10) == 2
+    assert svc._get_sorted_timestamps_for_user_in_conv(7, 10) == [T0, T0 + datetime.timedelta(minutes=5)]
+    mdao.iter_messages_by_conversation.assert_called_with(10)
+    mdao.get_messages_by_conversation.assert_not_called()
+
+def test_usage_range_methods_read_the_daily_rollup():
+    usage_dao = Mock()
+    d1, d2 = datetime.date(2025, 1, 1), datetime.date(2025, 3, 31)
+    usage_dao.get_user_daily.return_value = [{"day": d1, "message_count": 4}]
+    usage_dao.get_top_users.return_value = [(3, 12)]
+    usage_dao.get_user_totals.return_value = {"message_count": 4, "session_time": datetime.timedelta(minutes=7)}
+    message_dao = Mock()
+    svc = StatisticsService(message_dao=message_dao, usage_dao=usage_dao)
+
+    assert svc.usage_par_jour(7, d1, d2) == [{"day": d1, "message_count": 4}]
+    usage_dao.get_user_daily.assert_called_once_with(7, d1, d2)
+    assert svc.top_active_users_periode(d1, d2, limit=5) == [(3, 12)]
+    usage_dao.get_top_users.assert_called_once_with(d1, d2, 5)
+    assert svc.usage_periode(7, d1, d2)["session_time"] == datetime.timedelta(minutes=7)
+    assert message_dao.method_calls == []
+
+    with pytest.raises(ValueError):
+        svc.usage_par_jour(7, d2, d1)
+    with pytest.raises(RuntimeError):
+        StatisticsService(message_dao=message_dao).usage_conversation_par_jour(10, d1, d2)